@@ -1,25 +1,48 @@
 # app/api/v1/agent_router.py
 
-from fastapi import APIRouter, Depends, HTTPException, status, Request
+import asyncio
+from contextlib import aclosing
+from fastapi import APIRouter, Depends, HTTPException, status, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Optional, List, AsyncIterator, Tuple, Literal
 from sqlmodel import Session, select
 from datetime import datetime
 
 # --- IMPORTS ---
 # Replaced 'create_rag_chain' with 'create_agent_system' for Tool Usage
 from rag_pipeline.agent_setup import create_agent_system 
-from app.database.database import get_session
-from app.services.memory_service import save_message, get_or_create_session_id, load_message_history
+from rag_pipeline.retrieval_chain import create_rag_chain
+from rag_pipeline.llm_models import (
+    get_llm_scheduler, llm_request_context, LLMOverloadedError, PRIORITY_FAST, PRIORITY_NORMAL
+)
+from rag_pipeline.ollama_pool import get_ollama_pool
+from rag_pipeline.run_budget import RunBudget, RunBudgetExceeded, RunCancelledError
+from app.database.database import get_session, engine
+from app.services.memory_service import (
+    save_message, get_or_create_session_id, load_message_history, load_conversation_memory, schedule_summary_update
+)
+from app.services.stream_service import stream_agent_events, stream_rag_events, format_sse
+from app.services.answer_cache_service import (
+    get_answer_cache, is_cacheable_question, can_use_answer_cache, used_side_effect_tools
+)
+from app.services.intent_router import get_intent_router, FastPathResult
+from app.services.single_flight_service import get_single_flight, coalescing_key
 from app.core.security import get_current_user_role
 from app.database.models import ConversationHistory, UnansweredQuery
-from app.core.limiter import limiter
+from app.core.limiter import limiter, hit_rate_limit
 
 # --- SCHEMAS ---
 class QueryRequest(BaseModel):
     """Schema for the incoming chat query request."""
     question: str = Field(..., description="The user's query.")
     session_id: Optional[str] = Field(None, description="Current chat session ID.")
+    mode: Literal["auto", "agent", "rag"] = Field(
+        "auto",
+        description="'agent': ReAct agent with tools. 'rag': one retrieval + one LLM call. "
+                    "'auto': 'rag' for knowledge-only questions, otherwise 'agent'."
+    )
 
 class QueryResponse(BaseModel):
     answer: str
@@ -34,6 +57,12 @@ class SessionInfo(BaseModel):
 # --- ROUTER INIT ---
 router = APIRouter()
 
+# Queries per client: per IP on the HTTP endpoints, per user on the WebSocket
+QUERY_RATE_LIMIT = "10/second"
+
+# Shown to the user whenever the agent itself fails
+AGENT_UNAVAILABLE_MESSAGE = "I apologize, but I am currently unable to access my tools. Please try again later."
+
 # --- HELPER: Detect & Log Gaps ---
 def check_and_log_gap(db_session: Session, user_id: str, role: str, question: str, session_id: str, answer: str):
     """
@@ -58,10 +87,138 @@ def check_and_log_gap(db_session: Session, user_id: str, role: str, question: st
         db_session.add(gap_entry)
         db_session.commit()
 
+# --- HELPER: Fast-Path Router ---
+def route_fast_path(user_id: str, question: str) -> Optional[FastPathResult]:
+    """Answers greetings and runs well-formed commands without the agent (None = use the agent)."""
+    result = get_intent_router().route(user_id, question)
+    if result is not None:
+        print(f"[FAST PATH] Handled '{result.intent}' without the agent.")
+    return result
+
+def answer_without_agent(user_id: str, user_role: str, question: str,
+                         chat_history: str = "") -> Tuple[Optional[str], Optional[object]]:
+    """Fast path first, then the semantic cache. Returns (answer, question_vector) like lookup_cached_answer."""
+    fast_path = route_fast_path(user_id, question)
+    if fast_path is not None:
+        return fast_path.answer, None
+    return lookup_cached_answer(user_role, question, chat_history)
+
+def resolve_query_mode(mode: str, question: str) -> str:
+    """Turns the requested mode into 'agent' or 'rag'."""
+    if mode != "auto":
+        return mode
+    return get_intent_router().choose_mode(question)
+
+def prefetch_question(question: str) -> Optional[str]:
+    """The question to prefetch retrieval for; commands never search the knowledge base."""
+    return question if is_cacheable_question(question) else None
+
+# --- HELPER: Answer Generation (RAG or Agent) ---
+def generate_answer(user_id: str, session_id: str, user_role: str, chat_history: str,
+                    question: str, requested_mode: str, budget: RunBudget) -> Tuple[str, List[str]]:
+    """
+    Runs single-shot RAG or the agent for one question. Returns (answer, tools_used).
+    `budget` limits the run's time and tokens (a partial answer is returned when
+    it runs out) and raises RunCancelledError once the run is cancelled.
+    """
+    mode = resolve_query_mode(requested_mode, question)
+    config = {"callbacks": [budget]}
+    try:
+        # Generations queue fairly per user; single-shot RAG is served first
+        with llm_request_context(user_id, PRIORITY_FAST if mode == "rag" else PRIORITY_NORMAL) as llm_request:
+            # Time spent queued for a generation slot is not charged to the run
+            budget.queued_seconds = lambda: llm_request.queued_seconds
+            if mode == "rag":
+                # Single-shot RAG: one retrieval + exactly one LLM call
+                budget.answer_marker = None
+                rag_chain = create_rag_chain(user_id, session_id, user_role, chat_history)
+                return rag_chain.invoke({"question": question}, config=config), []
+
+            # Create Agent Executor (Reasoning Engine)
+            # Retrieval on the raw question starts now and overlaps the first LLM step
+            agent_executor = create_agent_system(user_id, session_id, user_role, chat_history,
+                                                 prefetch_question=prefetch_question(question))
+
+            # Invoke Agent
+            # The agent uses "input" key standard for React agents
+            result = agent_executor.invoke({"input": question}, config=config)
+
+            # Extract the final string answer from the agent's result dictionary
+            tools_used = [action.tool for action, _ in result.get("intermediate_steps", [])]
+            return budget.finish(result["output"]), tools_used
+    except RunBudgetExceeded as e:
+        print(f"[BUDGET] Run stopped at its {e}; returning a partial answer.")
+        return budget.partial_answer(), budget.tools_used
+
+def generate_answer_coalesced(user_id: str, session_id: str, user_role: str, chat_history: str,
+                              question: str, requested_mode: str, budget: RunBudget) -> Tuple[str, List[str], bool]:
+    """
+    generate_answer, but identical questions (same role, mode and session history)
+    that arrive while one run is in flight wait for that run.
+    Returns (answer, tools_used, shared).
+    """
+    # Resolved once: the key must tell an agent run from a single-shot RAG run
+    mode = resolve_query_mode(requested_mode, question)
+
+    def run():
+        return generate_answer(user_id, session_id, user_role, chat_history, question, mode, budget)
+
+    single_flight = get_single_flight()
+    key = coalescing_key(user_role, question, mode, chat_history)
+    if single_flight is None or key is None:
+        return (*run(), False)
+
+    def lead():
+        # The shared run keeps going after its client left while others still wait for it
+        budget.keep_alive = lambda: single_flight.waiting(key) > 0
+        return run()
+
+    try:
+        # budget.check raises once this caller's own client has left (nothing is generated yet)
+        (answer, tools_used), shared = single_flight.do(key, lead, fallback=run, check=budget.check)
+    except RunCancelledError:
+        if budget.cancelled:
+            raise
+        # The shared run was cancelled by its own client: run this one separately
+        return (*run(), False)
+    if shared and used_side_effect_tools(tools_used):
+        # The shared run changed state on its caller's behalf: run this one separately
+        return (*run(), False)
+    return answer, tools_used, shared
+
+# --- HELPER: Semantic Answer Cache ---
+def lookup_cached_answer(user_role: str, question: str,
+                         chat_history: str = "") -> Tuple[Optional[str], Optional[object]]:
+    """
+    Returns (cached_answer, question_vector).
+    The vector is None when the question must not use the cache at all
+    (cache disabled, the question may trigger a side-effecting tool, or session
+    memory shapes the answer); store_cached_answer then skips it too.
+    """
+    answer_cache = get_answer_cache()
+    if answer_cache is None or not can_use_answer_cache(question, chat_history):
+        return None, None
+    question_vector = answer_cache.embed(question)
+    return answer_cache.lookup(user_role, question_vector), question_vector
+
+def store_cached_answer(user_role: str, question_vector, answer: str, tools_used: List[str]):
+    """Caches the answer unless the run used a tool with side effects."""
+    if question_vector is None or used_side_effect_tools(tools_used):
+        return
+    get_answer_cache().store(user_role, question_vector, answer)
+
+# --- HELPER: Client Disconnect ---
+async def cancel_on_disconnect(request: Request, budget: RunBudget, poll_seconds: float = 0.5):
+    """Cancels the run as soon as the HTTP client goes away (closed tab, frontend retry)."""
+    while not await request.is_disconnected():
+        await asyncio.sleep(poll_seconds)
+    print("[CANCELLED] Client disconnected; stopping its run.")
+    budget.cancel()
+
 # --- ENDPOINT 1: CHAT (Protected + Rate Limited + Agentic) ---
 @router.post("/query", response_model=QueryResponse)
-@limiter.limit("10/second")  # Limit: 5 requests per minute per IP
-def chat_with_agent(
+@limiter.limit(QUERY_RATE_LIMIT)  # Per IP
+async def chat_with_agent(
     request: Request,  # Required by slowapi to check IP
     query_data: QueryRequest,  # Renamed to avoid name conflict
     db_session: Session = Depends(get_session),
@@ -70,10 +227,27 @@ def chat_with_agent(
     """
     Secure Chat Endpoint.
     1. Checks Rate Limit & Auth.
-    2. Spinning up the AGENT (Decides between Tools).
-    3. Saves History & Logs Gaps.
+    2. Answers greetings / well-formed commands directly (fast path),
+       and near-duplicate questions from the semantic cache.
+    3. Otherwise answers via single-shot RAG or spins up the AGENT
+       (Decides between Tools), depending on `mode`. Identical questions
+       already in flight for the same role share that run's answer.
+    4. Saves History & Logs Gaps (per caller, also for shared answers).
+    Returns 503 + Retry-After when the LLM queue is full (nothing is saved then).
+    The run is cancelled if the client disconnects, and stops early with a
+    partial answer when it exceeds its time or token budget.
     """
-    
+    budget = RunBudget()
+    watcher = asyncio.create_task(cancel_on_disconnect(request, budget))
+    try:
+        # The blocking work runs in the threadpool, like a sync endpoint
+        return await run_in_threadpool(answer_query, db_session, current_user, query_data, budget)
+    finally:
+        watcher.cancel()
+
+
+def answer_query(db_session: Session, current_user: dict, query_data: QueryRequest, budget: RunBudget) -> QueryResponse:
+    """Body of chat_with_agent (runs in a worker thread)."""
     # 1. Extract verified info from Token
     user_id = current_user["username"]
     user_role = current_user["role"]
@@ -81,34 +255,215 @@ def chat_with_agent(
     # 2. Get or Create Session ID
     session_id = get_or_create_session_id(query_data.session_id)
     
-    # 3. Save User Message
-    save_message(db_session, user_id, session_id, "user", query_data.question)
+    # 3. Load bounded memory (the question itself is stored together with the answer)
+    chat_history = load_conversation_memory(db_session, session_id)
 
     try:
-        # 4. Create Agent Executor (Reasoning Engine)
-        agent_executor = create_agent_system(user_id, session_id, user_role)
-        
-        # 5. Invoke Agent
-        # The agent uses "input" key standard for React agents
-        result = agent_executor.invoke({"input": query_data.question})
-        
-        # Extract the final string answer from the agent's result dictionary
-        agent_answer = result["output"]
-
-        # 6. Check for Knowledge Gaps (Logging)
+        # 4. Fast path, then the Semantic Answer Cache
+        agent_answer, question_vector = answer_without_agent(user_id, user_role, query_data.question, chat_history)
+
+        if agent_answer is None:
+            # 5-6. Single-shot RAG or the Agent (coalesced with identical in-flight questions)
+            agent_answer, tools_used, shared = generate_answer_coalesced(
+                user_id, session_id, user_role, chat_history, query_data.question, query_data.mode, budget
+            )
+            # A shared answer was already cached by its run; partial answers never are
+            if not shared and not budget.stopped_early:
+                store_cached_answer(user_role, question_vector, agent_answer, tools_used)
+
+        # 7. Check for Knowledge Gaps (Logging)
         check_and_log_gap(db_session, user_id, user_role, query_data.question, session_id, agent_answer)
 
+    except RunCancelledError:
+        # Nobody is waiting for this answer: save nothing
+        print(f"[CANCELLED] Dropped the run for {user_id}.")
+        return QueryResponse(answer="", session_id=session_id)
+    except LLMOverloadedError as e:
+        print(f"[OVERLOAD] Rejected query from {user_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="The assistant is busy. Please retry shortly.",
+            headers={"Retry-After": str(e.retry_after)}
+        )
     except Exception as e:
         print(f"[FATAL AGENT ERROR]: {e}")
         # Graceful fallback so the UI doesn't crash
-        agent_answer = "I apologize, but I am currently unable to access my tools. Please try again later."
+        agent_answer = AGENT_UNAVAILABLE_MESSAGE
 
-    # 7. Save Agent Response
+    # 8. Save User Message & Agent Response (older turns are summarized in the background)
+    save_message(db_session, user_id, session_id, "user", query_data.question)
     save_message(db_session, user_id, session_id, "agent", agent_answer)
+    schedule_summary_update(session_id)
     
     return QueryResponse(answer=agent_answer, session_id=session_id)
 
 
+# --- HELPER: Shared async agent run for the streaming endpoints ---
+async def run_agent_stream(user_id: str, user_role: str, question: str, session_id: str,
+                           mode: str = "auto") -> AsyncIterator[dict]:
+    """
+    Async counterpart of chat_with_agent.
+    Yields tool/token events while the agent runs, then a final 'done' event.
+    History saving and gap logging are identical to the sync endpoint.
+    Blocking DB calls are pushed to the threadpool so the event loop stays free.
+    When the LLM queue is full an 'error' event (status 503, retry_after) ends the stream.
+    A run that exceeds its budget emits a 'stopped' event and ends with a partial answer.
+    Closing this generator (client disconnect) cancels the run and its LLM calls.
+    """
+    budget = RunBudget()
+    config = {"callbacks": [budget]}
+    with Session(engine) as db_session:
+        chat_history = await run_in_threadpool(load_conversation_memory, db_session, session_id)
+
+        agent_answer = None
+        try:
+            agent_answer, question_vector = await run_in_threadpool(answer_without_agent, user_id, user_role,
+                                                                    question, chat_history)
+
+            if agent_answer is None:
+                tools_used = []
+                mode = await run_in_threadpool(resolve_query_mode, mode, question)
+                with llm_request_context(user_id, PRIORITY_FAST if mode == "rag" else PRIORITY_NORMAL) as llm_request:
+                    budget.queued_seconds = lambda: llm_request.queued_seconds
+                    if mode == "rag":
+                        budget.answer_marker = None
+                        rag_chain = await run_in_threadpool(create_rag_chain, user_id, session_id, user_role, chat_history)
+                        events = stream_rag_events(rag_chain, question, config)
+                    else:
+                        agent_executor = await run_in_threadpool(create_agent_system, user_id, session_id, user_role,
+                                                                 chat_history, prefetch_question(question))
+                        events = stream_agent_events(agent_executor, question, config)
+                    # aclosing: a disconnect also stops the underlying run right away
+                    async with aclosing(events):
+                        async for event in events:
+                            if event["type"] == "final":
+                                agent_answer = budget.finish(event["answer"])
+                                continue
+                            if event["type"] == "tool_start":
+                                tools_used.append(event["tool"])
+                            yield event
+                if not budget.stopped_early:
+                    store_cached_answer(user_role, question_vector, agent_answer, tools_used)
+
+            await run_in_threadpool(check_and_log_gap, db_session, user_id, user_role, question, session_id, agent_answer)
+        except RunBudgetExceeded as e:
+            print(f"[BUDGET] Streamed run stopped at its {e}; returning a partial answer.")
+            agent_answer = budget.partial_answer()
+            yield {"type": "stopped", "reason": str(e)}
+        except LLMOverloadedError as e:
+            print(f"[OVERLOAD] Rejected streamed query from {user_id}: {e}")
+            yield {"type": "error", "status": 503, "detail": "The assistant is busy. Please retry shortly.",
+                   "retry_after": e.retry_after}
+            return
+        except Exception as e:
+            print(f"[FATAL AGENT ERROR]: {e}")
+            agent_answer = AGENT_UNAVAILABLE_MESSAGE
+
+        await run_in_threadpool(save_message, db_session, user_id, session_id, "user", question)
+        await run_in_threadpool(save_message, db_session, user_id, session_id, "agent", agent_answer)
+        schedule_summary_update(session_id)
+        yield {"type": "done", "answer": agent_answer, "session_id": session_id}
+
+
+# --- ENDPOINT 1b: STREAMING CHAT (Server-Sent Events) ---
+@router.post("/query/stream")
+@limiter.limit(QUERY_RATE_LIMIT)
+async def stream_chat_with_agent(
+    request: Request,  # Required by slowapi to check IP
+    query_data: QueryRequest,
+    current_user: dict = Depends(get_current_user_role)
+):
+    """
+    Streaming Chat Endpoint (SSE).
+    Emits 'tool_start', 'tool_end' and 'token' events while the agent works,
+    and a final 'done' event with the full answer and session ID.
+    When the client disconnects, Starlette cancels the stream and with it the run.
+    Returns 503 + Retry-After up front when the LLM queue is already full.
+    """
+    try:
+        get_llm_scheduler().check_admission()
+    except LLMOverloadedError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="The assistant is busy. Please retry shortly.",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    session_id = get_or_create_session_id(query_data.session_id)
+
+    async def event_source():
+        async for event in run_agent_stream(current_user["username"], current_user["role"], query_data.question,
+                                            session_id, query_data.mode):
+            yield format_sse(event)
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+# --- ENDPOINT 1c: STREAMING CHAT (WebSocket) ---
+@router.websocket("/ws/query")
+async def websocket_chat_with_agent(websocket: WebSocket):
+    """
+    Streaming Chat over WebSocket.
+    1. First message must be {"token": "<JWT>"} (browsers can't set auth headers on WS).
+    2. Each following message is {"question": ..., "session_id": ..., "mode": ...}.
+    3. The same events as the SSE endpoint are sent back as JSON.
+    Questions count against QUERY_RATE_LIMIT per user; excess ones get an 'error' event.
+    """
+    await websocket.accept()
+
+    try:
+        auth_message = await websocket.receive_json()
+        current_user = get_current_user_role(auth_message.get("token") or "")
+    except (HTTPException, ValueError, AttributeError):
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.send_json({"type": "ready"})
+
+    try:
+        while True:
+            payload = await websocket.receive_json()
+            # Each message is a query: same limit as the HTTP endpoints, per user
+            retry_after = hit_rate_limit(QUERY_RATE_LIMIT, "ws_query", current_user["username"])
+            if retry_after:
+                await websocket.send_json({"type": "error", "detail": "Too many requests. Please slow down.",
+                                           "retry_after": retry_after})
+                continue
+
+            question = (payload.get("question") or "").strip()
+            if not question:
+                await websocket.send_json({"type": "error", "detail": "Field 'question' is required."})
+                continue
+
+            mode = payload.get("mode") or "auto"
+            if mode not in ("auto", "agent", "rag"):
+                await websocket.send_json({"type": "error", "detail": "Field 'mode' must be 'auto', 'agent' or 'rag'."})
+                continue
+
+            session_id = get_or_create_session_id(payload.get("session_id"))
+            # If a send fails (client gone), closing the stream cancels the run
+            async with aclosing(run_agent_stream(current_user["username"], current_user["role"],
+                                                 question, session_id, mode)) as events:
+                async for event in events:
+                    await websocket.send_json(event)
+    except WebSocketDisconnect:
+        pass
+
+
+# --- ENDPOINT 1d: LLM QUEUE METRICS ---
+@router.get("/metrics/llm")
+def get_llm_metrics(current_user: dict = Depends(get_current_user_role)):
+    """Queue depth, wait-time percentiles and admission counters of this worker's LLM scheduler."""
+    stats = get_llm_scheduler().stats()
+    stats["backends"] = get_ollama_pool().stats()
+    single_flight = get_single_flight()
+    stats["single_flight"] = single_flight.stats() if single_flight else None
+    return stats
+
+
 # --- ENDPOINT 2: GET SESSIONS (Sidebar History) ---
 @router.get("/sessions", response_model=List[SessionInfo])
 def get_user_sessions(
@@ -27,6 +27,56 @@ class Settings(BaseSettings):
     # Used for initializing the LLM/Embedding models
     EMBEDDING_MODEL_NAME: str = "all-MiniLM-L6-v2"
     CHROMA_PERSIST_DIR: str = "./chroma_data"
+    # HNSW index of the Chroma collections. M and EF_CONSTRUCTION apply when a collection
+    # is created (re-ingest to change them); SEARCH_EF is applied on every start.
+    # Tune with: python -m benchmarks.hnsw_tuning
+    HNSW_M: int = 16
+    HNSW_EF_CONSTRUCTION: int = 100
+    HNSW_SEARCH_EF: int = 10
+    # Seconds between background LLM health probes (0 disables the monitor)
+    LLM_HEALTH_CHECK_INTERVAL_SECONDS: float = 30.0
+
+    # --- Ollama Backends ---
+    # Comma-separated Ollama hosts; requests go to the one with the fewest in flight
+    OLLAMA_BASE_URLS: str = "http://localhost:11434"
+    # Keep-alive connections kept open per host
+    OLLAMA_CONNECTIONS_PER_HOST: int = 8
+    # A host that hangs fails after these timeouts instead of holding the worker
+    OLLAMA_CONNECT_TIMEOUT_SECONDS: float = 2.0
+    OLLAMA_READ_TIMEOUT_SECONDS: float = 120.0
+    # Consecutive failures that open a host's circuit, and how long it stays open
+    OLLAMA_CIRCUIT_FAILURE_THRESHOLD: int = 3
+    OLLAMA_CIRCUIT_RESET_SECONDS: float = 30.0
+
+    # --- Semantic Answer Cache ---
+    # Near-duplicate questions (same role, cosine >= threshold) reuse a stored answer
+    SEMANTIC_CACHE_ENABLED: bool = True
+    SEMANTIC_CACHE_THRESHOLD: float = 0.92
+    SEMANTIC_CACHE_MAX_ENTRIES_PER_ROLE: int = 500
+    SEMANTIC_CACHE_TTL_SECONDS: float = 86400.0
+
+    # --- Fast-Path Router ---
+    # Greetings and well-formed leave/password commands skip the ReAct agent
+    FAST_PATH_ENABLED: bool = True
+    # Minimum cosine to an intent prototype for the embedding classifier to decide
+    FAST_PATH_INTENT_THRESHOLD: float = 0.75
+    # Auto mode picks single-shot RAG when a question is closest to a non-tool prototype
+    # with at least this cosine (lower than the fast path's: a miss only costs an agent run)
+    AUTO_MODE_RAG_THRESHOLD: float = 0.4
+
+    # --- Conversation Memory ---
+    # The last N turns are injected verbatim; older turns are folded into a rolling summary
+    MEMORY_RECENT_TURNS: int = 3
+    # Upper bound (approximate tokens) on the history injected into a prompt
+    MEMORY_TOKEN_BUDGET: int = 600
+    MEMORY_SUMMARY_ENABLED: bool = True
+    MEMORY_SUMMARY_MAX_WORDS: int = 120
+
+    # --- Request Coalescing ---
+    # Identical in-flight questions (same role) wait for one run instead of starting their own
+    SINGLE_FLIGHT_ENABLED: bool = True
+    # A waiting request runs on its own after this many seconds
+    SINGLE_FLIGHT_WAIT_SECONDS: float = 120.0
     
     # Pydantic configuration class to specify where to find the .env file
     model_config = SettingsConfigDict(
@@ -1,8 +1,27 @@
 # app/core/limiter.py
 
+import math
+import time
+
+from limits import parse
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 
 # Initialize the Limiter
 # key_func=get_remote_address means we identify users by their IP address
-limiter = Limiter(key_func=get_remote_address)
\ No newline at end of file
+limiter = Limiter(key_func=get_remote_address)
+
+
+def hit_rate_limit(limit: str, scope: str, key: str) -> int:
+    """
+    Counts one hit against `limit` (e.g. "10/second") for `key`, using the same
+    storage as the decorators. For traffic they never see, such as messages on
+    an open WebSocket. Returns 0 when allowed, else the seconds until the window resets.
+    """
+    if not limiter.enabled:
+        return 0
+    item = parse(limit)
+    if limiter.limiter.hit(item, scope, key):
+        return 0
+    reset_time = limiter.limiter.get_window_stats(item, scope, key).reset_time
+    return max(1, math.ceil(reset_time - time.time()))
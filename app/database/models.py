@@ -12,6 +12,16 @@ class ConversationHistory(SQLModel, table=True):
     sender: str  # "user" or "agent"
     timestamp: datetime = Field(default_factory=datetime.utcnow)
 
+
+class ConversationSummary(SQLModel, table=True):
+    """Rolling summary of the older turns of one session, updated incrementally."""
+    id: Optional[int] = Field(default=None, primary_key=True)
+    session_id: str = Field(index=True, unique=True)
+    summary: str = ""
+    # ID of the newest ConversationHistory row already folded into the summary
+    last_message_id: int = 0
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
 # --- NEW USER MODEL ---
 class User(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
@@ -3,6 +3,7 @@
 from fastapi import FastAPI
 from app.core.config import settings
 import uvicorn
+import asyncio
 from contextlib import asynccontextmanager
 from fastapi.middleware.cors import CORSMiddleware 
 
@@ -15,19 +16,35 @@ from app.core.limiter import limiter
 from app.database.database import create_db_and_tables
 from app.api.v1.agent_router import router as agent_router 
 from app.api.v1.auth_router import router as auth_router
+from rag_pipeline.component_registry import get_component_registry
 
 # --- Application Lifespan Context ---
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """
     Handles startup and shutdown events.
-    Startup: Ensures database tables are created.
+    Startup: Ensures database tables are created, builds the shared
+    agent components and starts the background LLM health monitor.
     """
     print("[STARTUP] Checking database tables...")
     create_db_and_tables() 
     print("[STARTUP] Database readiness complete.")
+
+    print("[STARTUP] Warming agent components...")
+    registry = get_component_registry()
+    registry.check_llm_health()
+
+    monitor_task = None
+    if settings.LLM_HEALTH_CHECK_INTERVAL_SECONDS > 0:
+        monitor_task = asyncio.create_task(
+            registry.run_health_monitor(settings.LLM_HEALTH_CHECK_INTERVAL_SECONDS)
+        )
     yield
 
+    # Shutdown: stop the background monitor
+    if monitor_task:
+        monitor_task.cancel()
+
 # --- FastAPI Application Initialization ---
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -0,0 +1,130 @@
+# app/services/answer_cache_service.py
+
+import re
+import time
+import threading
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from app.core.config import settings
+from app.tools.agent_tools import SIDE_EFFECT_TOOLS
+from rag_pipeline.chroma_db_manager import get_kb_version
+from rag_pipeline.component_registry import get_component_registry
+
+# Requests that ask the agent to DO something (not just explain it) always run the agent
+SIDE_EFFECT_PATTERN = re.compile(
+    r"\b(change|reset|update|set)\b.*\bpassword\b"
+    r"|\b(apply|request|book|submit|take)\b.*\bleave\b",
+    re.IGNORECASE
+)
+
+
+def is_cacheable_question(question: str) -> bool:
+    """False for questions that may trigger a side-effecting tool."""
+    return not SIDE_EFFECT_PATTERN.search(question)
+
+
+def can_use_answer_cache(question: str, chat_history: str = "") -> bool:
+    """
+    False when the answer may depend on more than role + question: side-effecting
+    requests, and any question asked with session memory in the prompt.
+    """
+    return not chat_history and is_cacheable_question(question)
+
+
+def used_side_effect_tools(tool_names: List[str]) -> bool:
+    """True if the agent run called a tool that changes state."""
+    return any(name in SIDE_EFFECT_TOOLS for name in tool_names)
+
+
+class SemanticAnswerCache:
+    """
+    In-process cache of final answers keyed by question embedding.
+    Entries are partitioned by role (RBAC) and tagged with the knowledge-base
+    version, so a new ingestion run invalidates everything stored before it.
+    """
+
+    def __init__(self, embeddings: Embeddings, threshold: float, max_entries_per_role: int,
+                 ttl_seconds: float, version_fn: Callable[[], str] = get_kb_version):
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.max_entries_per_role = max_entries_per_role
+        self.ttl_seconds = ttl_seconds
+        self.version_fn = version_fn
+        self.hits = 0
+        self.misses = 0
+        self._entries: Dict[str, List[dict]] = {}
+        self._lock = threading.Lock()
+
+    def embed(self, question: str) -> np.ndarray:
+        """Unit-normalized embedding, so a dot product is the cosine similarity."""
+        vector = np.asarray(self.embeddings.embed_query(question), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _live_entries(self, user_role: str) -> List[dict]:
+        """Drops stale (old KB version or expired) entries for a role. Caller holds the lock."""
+        version = self.version_fn()
+        now = time.time()
+        entries = [
+            e for e in self._entries.get(user_role, [])
+            if e["version"] == version and now - e["created_at"] <= self.ttl_seconds
+        ]
+        self._entries[user_role] = entries
+        return entries
+
+    def lookup(self, user_role: str, question_vector: np.ndarray) -> Optional[str]:
+        """Returns the stored answer of the closest earlier question, if it is close enough."""
+        with self._lock:
+            entries = self._live_entries(user_role)
+            if entries:
+                matrix = np.stack([e["vector"] for e in entries])
+                scores = matrix @ question_vector
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    self.hits += 1
+                    entries[best]["last_hit"] = time.time()
+                    return entries[best]["answer"]
+            self.misses += 1
+        return None
+
+    def store(self, user_role: str, question_vector: np.ndarray, answer: str):
+        with self._lock:
+            entries = self._live_entries(user_role)
+            now = time.time()
+            entries.append({
+                "vector": question_vector,
+                "answer": answer,
+                "version": self.version_fn(),
+                "created_at": now,
+                "last_hit": now,
+            })
+            # Evict the least recently hit entries beyond the per-role cap
+            if len(entries) > self.max_entries_per_role:
+                entries.sort(key=lambda e: e["last_hit"], reverse=True)
+                del entries[self.max_entries_per_role:]
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": sum(len(v) for v in self._entries.values()),
+        }
+
+
+@lru_cache(maxsize=1)
+def get_answer_cache() -> Optional[SemanticAnswerCache]:
+    """Returns the process-wide answer cache, or None when disabled."""
+    if not settings.SEMANTIC_CACHE_ENABLED:
+        return None
+    return SemanticAnswerCache(
+        embeddings=get_component_registry().embeddings,
+        threshold=settings.SEMANTIC_CACHE_THRESHOLD,
+        max_entries_per_role=settings.SEMANTIC_CACHE_MAX_ENTRIES_PER_ROLE,
+        ttl_seconds=settings.SEMANTIC_CACHE_TTL_SECONDS,
+    )
@@ -1,12 +1,15 @@
 # app/services/memory_service.py
 
-from typing import List, Optional
+import threading
+from typing import Callable, List, Optional, Tuple
 from uuid import uuid4
 from sqlalchemy.orm import Session
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 
 # Import database components
-from app.database.models import ConversationHistory
+from app.database.models import ConversationHistory, ConversationSummary
+from rag_pipeline.context_packer import estimate_tokens
 # Removed unused import of ConversationHistoryBase
 # Removed unused import of get_session
 
@@ -56,4 +59,155 @@ def load_message_history(session: Session, session_id: str) -> List[dict]:
             "content": record.message_content
         })
         
-    return formatted_history
\ No newline at end of file
+    return formatted_history
+
+
+# --- Bounded conversation memory ---
+# Prompt history = rolling summary of older turns + the newest turns verbatim,
+# capped at a token budget. The summary lives in ConversationSummary and only
+# ever absorbs the turns added since its last update.
+
+SUMMARY_PROMPT_TEMPLATE = """Progressively summarize the conversation between a user and the company knowledge assistant.
+Extend the current summary with the new lines. Keep facts the user stated (names, dates, departments),
+the topics they asked about and the answers they were given. Use at most {max_words} words.
+
+Current summary:
+{summary}
+
+New lines of conversation:
+{new_lines}
+
+New summary:"""
+
+_summary_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="memory-summary")
+_pending_summaries = set()
+_pending_lock = threading.Lock()
+
+
+def _memory_settings():
+    # Imported lazily: rag_pipeline modules import this file without the app settings
+    from app.core.config import settings
+    return settings
+
+
+def format_message(sender: str, content: str) -> str:
+    return f"{'User' if sender == 'user' else 'Assistant'}: {content}"
+
+
+def _load_unsummarized(session: Session, session_id: str) -> Tuple[Optional[ConversationSummary], List[ConversationHistory]]:
+    """The session's summary row and every message not folded into it yet, oldest first."""
+    summary = session.query(ConversationSummary).filter(
+        ConversationSummary.session_id == session_id
+    ).first()
+    after = summary.last_message_id if summary else 0
+    records = session.query(ConversationHistory).filter(
+        ConversationHistory.session_id == session_id,
+        ConversationHistory.id > after
+    ).order_by(ConversationHistory.id).all()
+    return summary, records
+
+
+def load_conversation_memory(session: Session, session_id: str, token_budget: Optional[int] = None) -> str:
+    """
+    History string for a prompt: the rolling summary, then the newest messages
+    verbatim. Messages are added newest-first until the token budget is spent,
+    so long sessions never grow the prompt. Returns "" for a new session.
+    """
+    if token_budget is None:
+        token_budget = _memory_settings().MEMORY_TOKEN_BUDGET
+    summary, records = _load_unsummarized(session, session_id)
+
+    parts: List[str] = []
+    remaining = token_budget
+    if summary and summary.summary:
+        summary_text = f"Summary of earlier conversation: {summary.summary}"
+        # The summary may use at most half of the budget
+        summary_text = summary_text[:max(0, token_budget // 2) * 4]
+        parts.append(summary_text)
+        remaining -= estimate_tokens(summary_text)
+
+    recent: List[str] = []
+    for record in reversed(records):
+        line = format_message(record.sender, record.message_content)
+        cost = estimate_tokens(line)
+        if cost > remaining:
+            if not recent and remaining > 0:
+                recent.append(line[:remaining * 4])  # Always keep part of the latest message
+            break
+        recent.append(line)
+        remaining -= cost
+    parts.extend(reversed(recent))
+    return "\n".join(parts)
+
+
+def llm_summarizer(llm, max_words: Optional[int] = None) -> Callable[[str, List[str]], str]:
+    """Summarize callback backed by the shared LLM."""
+    if max_words is None:
+        max_words = _memory_settings().MEMORY_SUMMARY_MAX_WORDS
+
+    def summarize(current_summary: str, new_lines: List[str]) -> str:
+        prompt = SUMMARY_PROMPT_TEMPLATE.format(
+            max_words=max_words, summary=current_summary or "(empty)", new_lines="\n".join(new_lines)
+        )
+        result = llm.invoke(prompt)
+        return str(getattr(result, "content", result)).strip()
+
+    return summarize
+
+
+def update_rolling_summary(session: Session, session_id: str, summarize: Callable[[str, List[str]], str],
+                           recent_turns: Optional[int] = None) -> bool:
+    """
+    Folds the messages that dropped out of the last `recent_turns` turns into the
+    stored summary. Only those messages are sent to `summarize`, never the whole
+    session. Returns True if the summary changed.
+    """
+    if recent_turns is None:
+        recent_turns = _memory_settings().MEMORY_RECENT_TURNS
+    summary, records = _load_unsummarized(session, session_id)
+    keep = max(0, recent_turns) * 2  # A turn is a user message plus the answer
+    to_fold = records[:len(records) - keep] if len(records) > keep else []
+    if not to_fold:
+        return False
+
+    new_summary = summarize(summary.summary if summary else "",
+                            [format_message(r.sender, r.message_content) for r in to_fold])
+    if summary is None:
+        summary = ConversationSummary(session_id=session_id)
+    summary.summary = new_summary
+    summary.last_message_id = to_fold[-1].id
+    summary.updated_at = datetime.utcnow()
+    session.add(summary)
+    session.commit()
+    return True
+
+
+def _run_summary_update(session_id: str):
+    from sqlmodel import Session as DBSession
+    from app.database.database import engine
+    from rag_pipeline.component_registry import get_component_registry
+    from rag_pipeline.llm_models import llm_request_context, PRIORITY_BACKGROUND
+
+    try:
+        with DBSession(engine) as db_session, llm_request_context(f"summary:{session_id}", PRIORITY_BACKGROUND):
+            if update_rolling_summary(db_session, session_id, llm_summarizer(get_component_registry().llm)):
+                print(f"[MEMORY] Updated rolling summary for session {session_id}")
+    except Exception as e:
+        print(f"[WARN] Summary update failed for session {session_id}: {e}")
+    finally:
+        with _pending_lock:
+            _pending_summaries.discard(session_id)
+
+
+def schedule_summary_update(session_id: str):
+    """
+    Updates the session summary in the background after a response is saved,
+    so summarization never adds latency to the answer itself.
+    """
+    if not _memory_settings().MEMORY_SUMMARY_ENABLED:
+        return
+    with _pending_lock:
+        if session_id in _pending_summaries:
+            return
+        _pending_summaries.add(session_id)
+    _summary_executor.submit(_run_summary_update, session_id)
@@ -0,0 +1,135 @@
+# app/services/single_flight_service.py
+
+import hashlib
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from app.core.config import settings
+from app.services.answer_cache_service import is_cacheable_question
+from rag_pipeline.embedding_models import normalize_query_text
+
+# How often a waiting follower runs its `check` (e.g. notices its client left)
+_CHECK_INTERVAL_SECONDS = 0.1
+
+
+class _Flight:
+    """One in-flight computation and its outcome."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        # Followers still waiting, and all that ever joined (for the log line)
+        self.followers = 0
+        self.joined = 0
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent calls. The first caller for a key runs the
+    function; callers that arrive while it runs wait for its outcome (result
+    or exception) instead of running it again. Nothing is kept once the
+    flight lands: later callers start a new one (or hit the answer cache).
+    """
+
+    def __init__(self, wait_timeout: float):
+        self.wait_timeout = wait_timeout
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._lock = threading.Lock()
+        # Metrics
+        self.leaders = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any], fallback: Optional[Callable[[], Any]] = None,
+           check: Optional[Callable[[], None]] = None) -> Tuple[Any, bool]:
+        """
+        Returns (result, shared). `shared` is True when the result came from
+        another caller's run. A follower whose wait times out runs `fallback`
+        (default: `fn`) itself. While waiting, a follower calls `check`; an
+        exception it raises (e.g. the follower's own client left) ends the wait.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = _Flight()
+                self.leaders += 1
+                leader = True
+            else:
+                flight.followers += 1
+                flight.joined += 1
+                self.coalesced += 1
+                leader = False
+
+        if not leader:
+            try:
+                landed = self._wait(flight, check)
+            finally:
+                # Stop counting as a waiter however the wait ended
+                with self._lock:
+                    flight.followers -= 1
+            if landed:
+                if flight.error is not None:
+                    raise flight.error
+                return flight.result, True
+            print("[WARN] Timed out waiting for an identical in-flight request; running it separately.")
+            return (fallback or fn)(), False
+
+        try:
+            flight.result = fn()
+            return flight.result, False
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+            if flight.joined:
+                print(f"[INFO] Shared one answer with {flight.joined} identical request(s).")
+
+    def _wait(self, flight: _Flight, check: Optional[Callable[[], None]]) -> bool:
+        """True once the flight landed, False on timeout; exceptions from `check` propagate."""
+        if check is None:
+            return flight.done.wait(self.wait_timeout)
+        deadline = time.monotonic() + self.wait_timeout
+        while True:
+            check()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return flight.done.is_set()
+            if flight.done.wait(min(remaining, _CHECK_INTERVAL_SECONDS)):
+                return True
+
+    def waiting(self, key: Hashable) -> int:
+        """Number of callers currently waiting on the in-flight run for `key`."""
+        with self._lock:
+            flight = self._flights.get(key)
+            return flight.followers if flight else 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            in_flight = len(self._flights)
+        return {"in_flight": in_flight, "leaders": self.leaders, "coalesced": self.coalesced}
+
+
+def coalescing_key(user_role: str, question: str, mode: str,
+                   chat_history: str = "") -> Optional[Tuple[str, str, str, str]]:
+    """
+    (role, resolved mode, history digest, normalized question), or None when the
+    question may trigger a side-effecting tool. The session memory goes into the
+    prompt, so only requests with the same history (e.g. new sessions) share a run.
+    """
+    if not is_cacheable_question(question):
+        return None
+    history_digest = hashlib.sha256(chat_history.encode("utf-8")).hexdigest() if chat_history else ""
+    return user_role, mode, history_digest, normalize_query_text(question)
+
+
+@lru_cache(maxsize=1)
+def get_single_flight() -> Optional[SingleFlight]:
+    """Returns the process-wide coalescer, or None when SINGLE_FLIGHT_ENABLED is off."""
+    if not settings.SINGLE_FLIGHT_ENABLED:
+        return None
+    return SingleFlight(settings.SINGLE_FLIGHT_WAIT_SECONDS)
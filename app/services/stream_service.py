@@ -0,0 +1,104 @@
+# app/services/stream_service.py
+
+import json
+from typing import AsyncIterator, Dict, Any, Optional
+
+# The ReAct prompt makes the LLM write this marker before the user-facing text
+FINAL_ANSWER_MARKER = "Final Answer:"
+
+
+class FinalAnswerFilter:
+    """
+    Incrementally scans streamed LLM text and only lets through what comes
+    after 'Final Answer:'. Thoughts and Action lines are never shown to the user.
+    Call reset() whenever a new LLM generation starts.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self._buffer = ""
+        self._emitted = None  # Index into the buffer, None until the marker is seen
+
+    def feed(self, text: str) -> str:
+        """Adds a streamed chunk and returns the newly visible answer text (maybe empty)."""
+        self._buffer += text
+        if self._emitted is None:
+            marker_pos = self._buffer.find(FINAL_ANSWER_MARKER)
+            if marker_pos == -1:
+                return ""
+            self._emitted = marker_pos + len(FINAL_ANSWER_MARKER)
+            # Skip the space/newline right after the marker
+            while self._emitted < len(self._buffer) and self._buffer[self._emitted].isspace():
+                self._emitted += 1
+        new_text = self._buffer[self._emitted:]
+        self._emitted = len(self._buffer)
+        return new_text
+
+
+def _chunk_text(chunk: Any) -> str:
+    """Extracts text from a GenerationChunk / message chunk / plain string."""
+    if chunk is None:
+        return ""
+    if isinstance(chunk, str):
+        return chunk
+    text = getattr(chunk, "text", None)
+    if text is None:
+        text = getattr(chunk, "content", "")
+    return text or ""
+
+
+async def stream_agent_events(agent_executor, question: str,
+                              config: Optional[Dict[str, Any]] = None) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Runs the agent through its async event stream and yields UI-friendly events:
+    - {"type": "tool_start", "tool": ..., "input": ...}
+    - {"type": "tool_end", "tool": ...}
+    - {"type": "token", "content": ...}      (final-answer tokens only)
+    - {"type": "final", "answer": ...}       (authoritative full answer)
+    """
+    answer_filter = FinalAnswerFilter()
+    root_run_id: Optional[str] = None
+    final_answer = None
+
+    async for event in agent_executor.astream_events({"input": question}, config=config, version="v1"):
+        kind = event["event"]
+        if root_run_id is None:
+            root_run_id = event.get("run_id")
+
+        if kind == "on_llm_start":
+            answer_filter.reset()
+        elif kind == "on_llm_stream":
+            token = answer_filter.feed(_chunk_text(event["data"].get("chunk")))
+            if token:
+                yield {"type": "token", "content": token}
+        elif kind == "on_tool_start":
+            yield {"type": "tool_start", "tool": event["name"], "input": event["data"].get("input")}
+        elif kind == "on_tool_end":
+            yield {"type": "tool_end", "tool": event["name"]}
+        elif kind == "on_chain_end" and event.get("run_id") == root_run_id:
+            output = event["data"].get("output") or {}
+            final_answer = output.get("output") if isinstance(output, dict) else str(output)
+
+    yield {"type": "final", "answer": final_answer or ""}
+
+
+async def stream_rag_events(rag_chain, question: str,
+                            config: Optional[Dict[str, Any]] = None) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Single-shot RAG counterpart of stream_agent_events. There are no tools and
+    no Thought/Action text: every generated token is answer text.
+    """
+    parts = []
+    async for chunk in rag_chain.astream({"question": question}, config=config):
+        text = _chunk_text(chunk)
+        if text:
+            parts.append(text)
+            yield {"type": "token", "content": text}
+    yield {"type": "final", "answer": "".join(parts)}
+
+
+def format_sse(event: Dict[str, Any]) -> str:
+    """Serializes one event as a Server-Sent Events frame."""
+    return f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
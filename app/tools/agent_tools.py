@@ -5,10 +5,48 @@ from sqlmodel import Session, select
 from app.database.models import User
 from passlib.context import CryptContext
 from rag_pipeline.retrieval_chain import create_retriever
+from rag_pipeline.embedding_models import initialize_embedding_model
+from rag_pipeline.context_packer import pack_context, CONTEXT_PACKING_ENABLED
 import json # <--- New import for cleaning JSON
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# Tools that change state; their answers must never be cached or shared
+SIDE_EFFECT_TOOLS = {"change_my_password", "apply_for_leave"}
+
+# --- TOOL LOGIC (shared by the agent tools and the fast-path router) ---
+def update_user_password(current_user_email: str, new_password: str) -> str:
+    """Hashes and stores a new password for the user."""
+    from app.database.database import engine
+    
+    with Session(engine) as session:
+        statement = select(User).where(User.email == current_user_email)
+        user = session.exec(statement).first()
+        
+        if not user:
+            print(f"[DEBUG] ❌ User {current_user_email} not found.")
+            return "Error: User account not found."
+            
+        # Update Password
+        user.hashed_password = pwd_context.hash(new_password)
+        session.add(user)
+        session.commit()
+        print(f"[DEBUG] ✅ Database Updated Successfully for {current_user_email}")
+        
+    return f"Success: Password updated to '{new_password}'"
+
+def submit_leave_request(current_user_email: str, start: str, end: str, reason: str) -> str:
+    """Stores a pending leave request for the user."""
+    from app.database.models import LeaveRequest
+    from app.database.database import engine
+
+    with Session(engine) as session:
+        new_leave = LeaveRequest(user_id=current_user_email, start_date=start, end_date=end, reason=reason)
+        session.add(new_leave)
+        session.commit()
+        
+    return f"Success: Leave requested."
+
 # --- TOOL 1: PASSWORD CHANGE (DEBUG VERSION) ---
 def get_password_change_tool(current_user_email: str):
     
@@ -45,29 +83,16 @@ def get_password_change_tool(current_user_email: str):
         print(f"[DEBUG] Final Password to Save: '{clean_password}'")
 
         # 2. Database Update
-        from app.database.database import engine
-        
-        with Session(engine) as session:
-            statement = select(User).where(User.email == current_user_email)
-            user = session.exec(statement).first()
-            
-            if not user:
-                print(f"[DEBUG] ❌ User {current_user_email} not found.")
-                return "Error: User account not found."
-                
-            # Update Password
-            user.hashed_password = pwd_context.hash(clean_password)
-            session.add(user)
-            session.commit()
-            print(f"[DEBUG] ✅ Database Updated Successfully for {current_user_email}")
-            
-        return f"Success: Password updated to '{clean_password}'"
+        return update_user_password(current_user_email, clean_password)
     
     return change_my_password
 
-# --- TOOL 2: KNOWLEDGE BASE (Unchanged) ---
-def get_knowledge_tool(user_role: str):
-    retriever = create_retriever(user_role)
+# --- TOOL 2: KNOWLEDGE BASE ---
+def get_knowledge_tool(user_role: str, retriever=None, prefetch=None):
+    # Reuse the shared per-role retriever when one is provided.
+    # `prefetch` (RetrievalPrefetch) holds hits already retrieved for the raw question.
+    if retriever is None:
+        retriever = create_retriever(user_role)
     
     @tool
     def search_knowledge_base(query: str):
@@ -75,10 +100,15 @@ def get_knowledge_tool(user_role: str):
         Search for company policies, HR rules, IT guidelines, or procedures.
         Input should be the search query (e.g., "leave policy").
         """
-        docs = retriever.invoke(query)
+        docs = prefetch.take(query) if prefetch is not None else None
+        if docs is None:
+            docs = retriever.invoke(query)
         if not docs:
             return "No relevant documents found."
-        return "\n\n".join([d.page_content for d in docs])
+        if not CONTEXT_PACKING_ENABLED:
+            return "\n\n".join([d.page_content for d in docs])
+        # Deduplicated, stitched and trimmed to the context token budget
+        return pack_context(query, docs, initialize_embedding_model())
         
     return search_knowledge_base
 
@@ -92,9 +122,6 @@ def get_leave_tool(current_user_email: str):
         Submits a leave request.
         INPUT MUST BE A SINGLE STRING: "Start, End, Reason"
         """
-        from app.database.models import LeaveRequest
-        from app.database.database import engine
-        
         try:
             parts = leave_details.split(",")
             if len(parts) < 3: return "Error: Use 'Start, End, Reason'"
@@ -102,11 +129,6 @@ def get_leave_tool(current_user_email: str):
             reason = ",".join(parts[2:]).strip()
         except: return "Error: Format error."
 
-        with Session(engine) as session:
-            new_leave = LeaveRequest(user_id=current_user_email, start_date=start, end_date=end, reason=reason)
-            session.add(new_leave)
-            session.commit()
-            
-        return f"Success: Leave requested."
+        return submit_leave_request(current_user_email, start, end, reason)
     
     return apply_for_leave
\ No newline at end of file
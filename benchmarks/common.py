@@ -0,0 +1,141 @@
+# benchmarks/common.py
+
+import os
+import json
+import math
+import time
+import resource
+import platform
+import threading
+import subprocess
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+def _current_rss_bytes() -> Optional[int]:
+    """Resident set size of this process (Linux /proc), or None if unavailable."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _max_rss_bytes() -> int:
+    """Lifetime peak RSS (ru_maxrss is KiB on Linux, bytes on macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if platform.system() == "Darwin" else peak * 1024
+
+
+class StageTimer:
+    """
+    Context manager that times one benchmark stage and samples RSS in a
+    background thread, so each stage gets its own peak (not the process-lifetime one).
+    """
+
+    def __init__(self, name: str, sample_interval: float = 0.01):
+        self.name = name
+        self.sample_interval = sample_interval
+        self.items: Dict[str, int] = {}
+        self.elapsed = 0.0
+        self.peak_rss = 0
+        self._stop = threading.Event()
+
+    def _sample(self):
+        while not self._stop.is_set():
+            rss = _current_rss_bytes()
+            if rss is not None:
+                self.peak_rss = max(self.peak_rss, rss)
+            self._stop.wait(self.sample_interval)
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self._started
+        self._stop.set()
+        self._thread.join()
+        if self.peak_rss == 0:
+            self.peak_rss = _max_rss_bytes()
+
+    def count(self, **items: int):
+        """Records how many units (pages, chunks, ...) this stage processed."""
+        for key, value in items.items():
+            self.items[key] = self.items.get(key, 0) + value
+
+    def result(self) -> Dict[str, Any]:
+        elapsed = max(self.elapsed, 1e-9)
+        return {
+            "stage": self.name,
+            "seconds": round(self.elapsed, 4),
+            "peak_rss_mb": round(self.peak_rss / (1024 * 1024), 1),
+            **{key: value for key, value in self.items.items()},
+            **{f"{key}_per_s": round(value / elapsed, 2) for key, value in self.items.items()},
+        }
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile (pct in 0..100)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+# --- Retrieval Quality ---
+def first_relevant_rank(retrieved: List[Tuple[str, int]], expected: List[Tuple[str, int]]) -> Optional[int]:
+    """1-based rank of the first retrieved (source, page) that is in `expected`, or None."""
+    wanted = set(expected)
+    for rank, location in enumerate(retrieved, start=1):
+        if location in wanted:
+            return rank
+    return None
+
+
+def recall_at_k(ranks: List[Optional[int]], k: int) -> float:
+    """Share of questions with a relevant chunk in the top k."""
+    if not ranks:
+        return 0.0
+    return sum(1 for rank in ranks if rank is not None and rank <= k) / len(ranks)
+
+
+def mean_reciprocal_rank(ranks: List[Optional[int]]) -> float:
+    if not ranks:
+        return 0.0
+    return sum(1.0 / rank for rank in ranks if rank is not None) / len(ranks)
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def write_results(name: str, payload: Dict[str, Any], output_path: Optional[str] = None) -> str:
+    """Writes a JSON result file tagged with the git revision so runs can be compared."""
+    revision = git_revision()
+    payload = {
+        "benchmark": name,
+        "git_revision": revision,
+        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        **payload,
+    }
+    if output_path is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+        output_path = os.path.join(RESULTS_DIR, f"{name}-{revision}-{stamp}.json")
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2)
+    print(f"[INFO] Results written to {output_path}")
+    return output_path
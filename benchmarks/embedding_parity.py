@@ -0,0 +1,100 @@
+# benchmarks/embedding_parity.py
+#
+# Checks that the ONNX embedding backend agrees with the PyTorch model on the
+# data/ corpus (every chunk plus the golden questions), and times both.
+# Exits with status 1 if any cosine similarity falls below --min-cosine.
+#
+# Usage:
+#   python -m benchmarks.embedding_parity                   # fp32 ONNX vs PyTorch
+#   python -m benchmarks.embedding_parity --quantize        # int8 ONNX vs PyTorch
+#   python -m benchmarks.embedding_parity --min-cosine 0.98
+
+import io
+import sys
+import json
+import argparse
+import contextlib
+from typing import List
+
+import numpy as np
+
+from rag_pipeline.utils import iter_pdf_files, load_pdf_pages, create_text_splitter, split_pages
+from rag_pipeline.embedding_models import (
+    create_base_embeddings, OnnxEmbeddings, EMBEDDING_MODEL_NAME, EMBEDDING_ONNX_CACHE_DIR, EMBEDDING_ONNX_THREADS
+)
+from benchmarks.common import StageTimer, percentile, write_results
+
+DATA_PATH = "data"
+GOLDEN_SET_PATH = "benchmarks/golden_questions.json"
+
+
+def load_texts(data_path: str) -> List[str]:
+    splitter = create_text_splitter()
+    texts = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for file_path in iter_pdf_files(data_path):
+            texts.extend(c.page_content for c in split_pages(load_pdf_pages(file_path), file_path, splitter))
+    with open(GOLDEN_SET_PATH, "r", encoding="utf-8") as f:
+        texts.extend(item["question"] for item in json.load(f))
+    return texts
+
+
+def embed_timed(name: str, embeddings, texts: List[str]):
+    with StageTimer(name) as stage:
+        vectors = np.asarray(embeddings.embed_documents(texts), dtype=np.float32)
+        stage.count(texts=len(texts))
+    return vectors, stage.result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cosine parity of the ONNX embedding backend against PyTorch.")
+    parser.add_argument("--data-path", default=DATA_PATH)
+    parser.add_argument("--quantize", action="store_true", help="Compare the int8-quantized ONNX model.")
+    parser.add_argument("--min-cosine", type=float, default=None,
+                        help="Lowest acceptable cosine (default: 0.999 fp32, 0.98 int8).")
+    parser.add_argument("--output", default=None, help="JSON output path (default: benchmarks/results/).")
+    args = parser.parse_args()
+    min_cosine = args.min_cosine if args.min_cosine is not None else (0.98 if args.quantize else 0.999)
+
+    texts = load_texts(args.data_path)
+    if not texts:
+        print(f"[FATAL] No text found under '{args.data_path}'.")
+        sys.exit(1)
+    print(f"--- Embedding parity: {len(texts)} texts, onnx {'int8' if args.quantize else 'fp32'} vs torch ---")
+
+    reference, torch_stats = embed_timed("torch", create_base_embeddings("torch"), texts)
+    onnx_model = OnnxEmbeddings(EMBEDDING_MODEL_NAME, EMBEDDING_ONNX_CACHE_DIR,
+                                quantize=args.quantize, threads=EMBEDDING_ONNX_THREADS)
+    candidate, onnx_stats = embed_timed("onnx", onnx_model, texts)
+
+    def normalize(m):
+        return m / np.clip(np.linalg.norm(m, axis=1, keepdims=True), 1e-12, None)
+    cosines = (normalize(reference) * normalize(candidate)).sum(axis=1).tolist()
+
+    worst = int(np.argmin(cosines))
+    summary = {
+        "min": round(min(cosines), 6),
+        "p1": round(percentile(cosines, 1), 6),
+        "mean": round(float(np.mean(cosines)), 6),
+        "below_threshold": sum(1 for c in cosines if c < min_cosine),
+    }
+    print(f"[RESULT] cosine min={summary['min']} p1={summary['p1']} mean={summary['mean']} "
+          f"(threshold {min_cosine}, {summary['below_threshold']} below)")
+    print(f"[RESULT] torch {torch_stats['texts_per_s']} texts/s, {torch_stats['peak_rss_mb']} MB | "
+          f"onnx {onnx_stats['texts_per_s']} texts/s, {onnx_stats['peak_rss_mb']} MB")
+    print(f"[INFO] Least similar text: {texts[worst][:80]!r}")
+
+    write_results("embedding_parity", {
+        "params": {"texts": len(texts), "quantize": args.quantize, "min_cosine": min_cosine},
+        "cosine": summary,
+        "stages": [torch_stats, onnx_stats],
+    }, args.output)
+
+    if summary["below_threshold"]:
+        print("[ERROR] ONNX embeddings diverge from PyTorch; do not switch EMBEDDING_BACKEND.")
+        sys.exit(1)
+    print("[SUCCESS] ONNX backend matches PyTorch.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+# benchmarks/hnsw_tuning.py
+#
+# Rebuilds scratch Chroma collections from the vectors already in chroma_data/
+# for every combination of HNSW M / ef_construction / search ef and reports
+# build time, query latency, recall against exact search, and index memory.
+# No model is loaded: stored chunk vectors are re-used as queries.
+#
+# Usage:
+#   python -m benchmarks.hnsw_tuning
+#   python -m benchmarks.hnsw_tuning --m 8,16,32 --ef-construction 100,200 --search-ef 10,50,100
+#   python -m benchmarks.hnsw_tuning --queries 500 --k 5 --output hnsw.json
+#
+# Apply the chosen values through HNSW_M / HNSW_EF_CONSTRUCTION / HNSW_SEARCH_EF
+# (M and ef_construction only apply to new collections: delete chroma_data/ and re-run ingestion).
+
+import time
+import random
+import argparse
+import tempfile
+import itertools
+from typing import Dict, List, Optional
+
+import numpy as np
+import chromadb
+
+from rag_pipeline.chroma_db_manager import get_chroma_store, CHROMA_LAYOUT
+from benchmarks.common import StageTimer, percentile, write_results
+
+ADD_BATCH_SIZE = 1000
+
+
+def parse_int_list(value: str) -> List[int]:
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def load_vectors():
+    """All stored chunk vectors, grouped by role."""
+    store = get_chroma_store(None)
+    result = store.get(include=["embeddings", "metadatas"])
+    by_role: Dict[str, dict] = {}
+    for chunk_id, vector, meta in zip(result["ids"], result["embeddings"], result["metadatas"]):
+        role = (meta or {}).get("role", "General_Employee")
+        entry = by_role.setdefault(role, {"ids": [], "vectors": []})
+        entry["ids"].append(chunk_id)
+        entry["vectors"].append(vector)
+    return {role: {"ids": e["ids"], "vectors": np.asarray(e["vectors"], dtype=np.float32)}
+            for role, e in by_role.items()}
+
+
+def exact_top_k(vectors: np.ndarray, query: np.ndarray, k: int) -> List[int]:
+    """Ground truth: brute-force L2 (Chroma's default space)."""
+    distances = ((vectors - query) ** 2).sum(axis=1)
+    k = min(k, len(distances))
+    best = np.argpartition(distances, k - 1)[:k]
+    return best[np.argsort(distances[best])].tolist()
+
+
+def estimate_index_mb(n_vectors: int, dim: int, m: int) -> float:
+    """hnswlib footprint: the float32 vectors plus ~2*M neighbour links (4 bytes each) per vector."""
+    return round(n_vectors * (dim * 4 + 2 * m * 4) / (1024 * 1024), 2)
+
+
+def build_collection(client, name: str, metadata: dict, ids: List[str], vectors: np.ndarray,
+                     metadatas: Optional[List[dict]] = None):
+    collection = client.create_collection(name=name, metadata=metadata)
+    for start in range(0, len(ids), ADD_BATCH_SIZE):
+        end = start + ADD_BATCH_SIZE
+        collection.add(ids=ids[start:end], embeddings=vectors[start:end].tolist(),
+                       metadatas=metadatas[start:end] if metadatas else None)
+    return collection
+
+
+def run_setting(data: Dict[str, dict], queries: list, k: int, m: int, ef_construction: int, search_ef: int) -> dict:
+    metadata = {"hnsw:M": m, "hnsw:construction_ef": ef_construction, "hnsw:search_ef": search_ef}
+    with tempfile.TemporaryDirectory() as scratch_dir:
+        client = chromadb.PersistentClient(path=scratch_dir)
+
+        # One scratch collection per role mirrors the partitioned layout;
+        # for the single layout the role filter is applied at query time instead.
+        with StageTimer("build") as build_stage:
+            if CHROMA_LAYOUT == "partitioned":
+                collections = {role: build_collection(client, f"tune_{i}", metadata, d["ids"], d["vectors"])
+                               for i, (role, d) in enumerate(sorted(data.items()))}
+            else:
+                collection = build_collection(
+                    client, "tune", metadata,
+                    [chunk_id for d in data.values() for chunk_id in d["ids"]],
+                    np.concatenate([d["vectors"] for d in data.values()]),
+                    [{"role": role} for role, d in data.items() for _ in d["ids"]]
+                )
+                collections = {role: collection for role in data}
+            build_stage.count(vectors=sum(len(d["ids"]) for d in data.values()))
+
+        latencies, recalls = [], []
+        for role, row in queries:
+            query = data[role]["vectors"][row]
+            where = None if CHROMA_LAYOUT == "partitioned" else {"role": role}
+            started = time.perf_counter()
+            result = collections[role].query(query_embeddings=[query.tolist()], n_results=k, where=where)
+            latencies.append((time.perf_counter() - started) * 1000)
+
+            truth = {data[role]["ids"][i] for i in exact_top_k(data[role]["vectors"], query, k)}
+            recalls.append(len(truth & set(result["ids"][0])) / len(truth))
+
+    n_vectors = sum(len(d["ids"]) for d in data.values())
+    dim = next(iter(data.values()))["vectors"].shape[1]
+    return {
+        "m": m, "ef_construction": ef_construction, "search_ef": search_ef,
+        "build_seconds": build_stage.result()["seconds"],
+        f"recall_at_{k}": round(float(np.mean(recalls)), 4),
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "index_mb_estimate": estimate_index_mb(n_vectors, dim, m),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report the HNSW recall/latency/memory tradeoff on the current vectors.")
+    parser.add_argument("--m", default="8,16,32")
+    parser.add_argument("--ef-construction", default="100,200")
+    parser.add_argument("--search-ef", default="10,50,100")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=200, help="Stored vectors sampled as queries.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="JSON output path (default: benchmarks/results/).")
+    args = parser.parse_args()
+
+    data = load_vectors()
+    if not data:
+        print("[FATAL] The Chroma store is empty. Run the ingestion script first.")
+        raise SystemExit(1)
+    population = [(role, row) for role, d in data.items() for row in range(len(d["ids"]))]
+    queries = random.Random(args.seed).sample(population, min(args.queries, len(population)))
+    print(f"--- HNSW tuning: {len(population)} vectors, {len(queries)} queries, k={args.k}, layout={CHROMA_LAYOUT} ---")
+
+    settings = []
+    for m, ef_construction, search_ef in itertools.product(
+        parse_int_list(args.m), parse_int_list(args.ef_construction), parse_int_list(args.search_ef)
+    ):
+        row = run_setting(data, queries, args.k, m, ef_construction, search_ef)
+        print(f"[RESULT] M={m:<3} ef_construction={ef_construction:<4} ef={search_ef:<4} "
+              f"recall@{args.k}={row[f'recall_at_{args.k}']:.3f} p50={row['p50_ms']}ms p95={row['p95_ms']}ms "
+              f"build={row['build_seconds']}s index~{row['index_mb_estimate']}MB")
+        settings.append(row)
+
+    write_results("hnsw_tuning", {
+        "params": {"k": args.k, "queries": len(queries), "vectors": len(population), "layout": CHROMA_LAYOUT},
+        "settings": settings,
+    }, args.output)
+
+
+if __name__ == "__main__":
+    main()
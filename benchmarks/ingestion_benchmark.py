@@ -0,0 +1,130 @@
+# benchmarks/ingestion_benchmark.py
+#
+# Times each stage of ingestion separately (parse, split, embed, Chroma write)
+# over the PDFs in data/, optionally scaled up N times.
+#
+# Usage:
+#   python -m benchmarks.ingestion_benchmark                        # real MiniLM model
+#   python -m benchmarks.ingestion_benchmark --embedder fake --scale 10
+#   python -m benchmarks.ingestion_benchmark --output run.json
+
+import os
+import io
+import sys
+import argparse
+import tempfile
+import contextlib
+from typing import List
+
+from langchain_core.documents import Document
+from langchain_community.document_loaders import PyPDFLoader
+from langchain_chroma import Chroma
+
+from rag_pipeline.utils import iter_pdf_files, create_text_splitter, split_pages, get_splitter_signature
+from rag_pipeline.ingestion_pipeline import iter_batches, embed_and_upsert
+from benchmarks.common import StageTimer, write_results
+
+DATA_PATH = "data"
+
+
+def get_benchmark_embeddings(embedder: str):
+    """
+    'minilm' uses the production model; 'fake' is a deterministic offline
+    stand-in with the same dimension (384) so the suite runs without downloads.
+    """
+    if embedder == "fake":
+        from langchain_community.embeddings import DeterministicFakeEmbedding
+        return DeterministicFakeEmbedding(size=384)
+    from rag_pipeline.embedding_models import initialize_embedding_model
+    return initialize_embedding_model()
+
+
+def run_benchmark(data_path: str, scale: int, embedder: str, batch_size: int) -> dict:
+    file_paths = list(iter_pdf_files(data_path))
+    if not file_paths:
+        print(f"[FATAL] No PDFs found in '{data_path}'.")
+        sys.exit(1)
+    print(f"--- Ingestion benchmark: {len(file_paths)} files x{scale}, embedder={embedder}, batch={batch_size} ---")
+
+    # 1. Parse (the real parser every time, no page cache)
+    parsed: List[tuple] = []
+    with StageTimer("parse") as parse_stage:
+        for copy in range(scale):
+            for file_path in file_paths:
+                pages = PyPDFLoader(file_path).load()
+                # Synthetic copies get their own source name so chunk IDs stay unique
+                name = os.path.basename(file_path)
+                source_path = file_path if copy == 0 else os.path.join(data_path, f"copy{copy}_{name}")
+                parsed.append((source_path, pages))
+                parse_stage.count(files=1, pages=len(pages))
+
+    # 2. Split
+    chunks: List[Document] = []
+    splitter = create_text_splitter()
+    with StageTimer("split") as split_stage:
+        with contextlib.redirect_stdout(io.StringIO()):
+            for source_path, pages in parsed:
+                chunks.extend(split_pages(pages, source_path, splitter))
+        split_stage.count(chunks=len(chunks))
+    del parsed
+
+    embeddings = get_benchmark_embeddings(embedder)
+
+    # 3. Embed
+    vectors = []
+    with StageTimer("embed") as embed_stage:
+        for batch in iter_batches(chunks, batch_size):
+            vectors.extend(embeddings.embed_documents([c.page_content for c in batch]))
+            embed_stage.count(embeddings=len(batch))
+
+    # 4. Chroma write (scratch collection, never the real one)
+    with tempfile.TemporaryDirectory() as scratch_dir:
+        store = Chroma(collection_name="ingestion_benchmark", embedding_function=embeddings,
+                       persist_directory=scratch_dir)
+
+        class _Precomputed:
+            """Feeds the vectors from stage 3 so this stage only measures writes."""
+            def __init__(self):
+                self.offset = 0
+            def embed_documents(self, texts):
+                start, self.offset = self.offset, self.offset + len(texts)
+                return vectors[start:self.offset]
+
+        precomputed = _Precomputed()
+        with StageTimer("chroma_write") as write_stage:
+            for batch in iter_batches(chunks, batch_size):
+                write_stage.count(chunks=embed_and_upsert(store, precomputed, batch))
+
+    stages = [s.result() for s in (parse_stage, split_stage, embed_stage, write_stage)]
+    for stage in stages:
+        print(f"[RESULT] {stage}")
+
+    return {
+        "params": {
+            "data_path": data_path,
+            "files": len(file_paths),
+            "scale": scale,
+            "embedder": embedder,
+            "batch_size": batch_size,
+            "splitter": get_splitter_signature(),
+        },
+        "stages": stages,
+        "total_seconds": round(sum(s["seconds"] for s in stages), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark each ingestion stage.")
+    parser.add_argument("--data-path", default=DATA_PATH)
+    parser.add_argument("--scale", type=int, default=1, help="Replicate the corpus N times.")
+    parser.add_argument("--embedder", choices=["minilm", "fake"], default="minilm")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--output", default=None, help="JSON output path (default: benchmarks/results/).")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.data_path, args.scale, args.embedder, args.batch_size)
+    write_results("ingestion", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
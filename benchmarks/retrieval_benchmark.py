@@ -0,0 +1,216 @@
+# benchmarks/retrieval_benchmark.py
+#
+# Measures retrieval latency (p50/p95/p99) and quality (recall@k, MRR) per role
+# against the checked-in golden set (benchmarks/golden_questions.json).
+# Each golden question lists the (source, page) locations that answer it; a
+# retrieval counts as a hit when any returned chunk comes from one of them.
+#
+# Usage:
+#   python -m benchmarks.retrieval_benchmark                            # scratch index, current settings
+#   python -m benchmarks.retrieval_benchmark --k 3,5,8 --chunk-sizes 300,400,600
+#   python -m benchmarks.retrieval_benchmark --hnsw-m 8,16,32 --search-ef 10,50,100
+#   python -m benchmarks.retrieval_benchmark --retrieval vector,hybrid  # BM25 fusion on/off
+#   python -m benchmarks.retrieval_benchmark --index existing           # the live chroma_data collection
+#   python -m benchmarks.retrieval_benchmark --embedder fake            # offline plumbing check
+
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import itertools
+import contextlib
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from langchain_chroma import Chroma
+
+from rag_pipeline.utils import (
+    iter_pdf_files, load_pdf_pages, create_text_splitter, split_pages, CHUNK_SIZE, CHUNK_OVERLAP
+)
+from rag_pipeline.embedding_models import CachedQueryEmbeddings
+from rag_pipeline.retrieval_chain import CachedRoleRetriever, retrieval_cache
+from rag_pipeline.lexical_index import LexicalIndex, get_lexical_index
+from rag_pipeline.ingestion_pipeline import iter_batches, embed_and_upsert
+from benchmarks.common import (
+    StageTimer, percentile, first_relevant_rank, recall_at_k, mean_reciprocal_rank, write_results
+)
+from benchmarks.ingestion_benchmark import get_benchmark_embeddings
+
+DATA_PATH = "data"
+GOLDEN_SET_PATH = "benchmarks/golden_questions.json"
+
+
+def load_golden_set(path: str) -> List[dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def parse_int_list(value: str) -> List[int]:
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def build_scratch_index(pages_by_file: Dict[str, list], embeddings, chunk_size: int,
+                        collection_metadata: Optional[dict], persist_dir: str):
+    """
+    Indexes the corpus into a throwaway collection (plus a matching BM25 index)
+    with the given chunking/HNSW settings.
+    """
+    # Overlap keeps the production ratio (~12.5%) as the chunk size changes
+    overlap = round(chunk_size * CHUNK_OVERLAP / CHUNK_SIZE)
+    splitter = create_text_splitter(chunk_size, overlap)
+    store = Chroma(collection_name=f"retrieval_benchmark_{chunk_size}", embedding_function=embeddings,
+                   persist_directory=persist_dir, collection_metadata=collection_metadata)
+    lexical_index = LexicalIndex(os.path.join(persist_dir, "lexical_index.sqlite3"))
+
+    with StageTimer("index") as index_stage:
+        chunks = []
+        with contextlib.redirect_stdout(io.StringIO()):
+            for file_path, pages in pages_by_file.items():
+                chunks.extend(split_pages(pages, file_path, splitter))
+        for batch in iter_batches(chunks, 64):
+            index_stage.count(chunks=embed_and_upsert(store, embeddings, batch))
+            lexical_index.upsert(batch)
+    return store, lexical_index, index_stage.result()
+
+
+def evaluate(store, lexical_index, golden: List[dict], k: int) -> dict:
+    """
+    Runs every golden question through the production retriever class for its role
+    (hybrid when `lexical_index` is given, vector-only otherwise).
+    """
+    retrievers = {}
+    latencies = defaultdict(list)
+    ranks = defaultdict(list)
+
+    for item in golden:
+        role = item["role"]
+        if role not in retrievers:
+            retrievers[role] = CachedRoleRetriever(vector_store=store, user_role=role, k=k,
+                                                   lexical_index=lexical_index)
+            retrievers[role].invoke(item["question"])  # Warm-up, excluded from timings
+        # Measure the uncached search path, not a retrieval-cache hit
+        retrieval_cache.clear()
+
+        started = time.perf_counter()
+        docs = retrievers[role].invoke(item["question"])
+        latencies[role].append((time.perf_counter() - started) * 1000)
+
+        retrieved = [(d.metadata.get("source"), int(d.metadata.get("page", -1))) for d in docs]
+        expected = [(e["source"], int(e["page"])) for e in item["expected"]]
+        ranks[role].append(first_relevant_rank(retrieved, expected))
+
+    def summarize(role_latencies: List[float], role_ranks: List[Optional[int]]) -> dict:
+        return {
+            "questions": len(role_ranks),
+            f"recall_at_{k}": round(recall_at_k(role_ranks, k), 4),
+            "mrr": round(mean_reciprocal_rank(role_ranks), 4),
+            "p50_ms": round(percentile(role_latencies, 50), 2),
+            "p95_ms": round(percentile(role_latencies, 95), 2),
+            "p99_ms": round(percentile(role_latencies, 99), 2),
+        }
+
+    all_latencies = [ms for values in latencies.values() for ms in values]
+    all_ranks = [rank for values in ranks.values() for rank in values]
+    return {
+        "overall": summarize(all_latencies, all_ranks),
+        "roles": {role: summarize(latencies[role], ranks[role]) for role in sorted(ranks)},
+    }
+
+
+def print_run(label: str, k: int, metrics: dict):
+    overall = metrics["overall"]
+    print(f"[RESULT] {label} k={k}: recall@{k}={overall[f'recall_at_{k}']:.3f} mrr={overall['mrr']:.3f} "
+          f"p50={overall['p50_ms']}ms p95={overall['p95_ms']}ms p99={overall['p99_ms']}ms")
+    for role, row in metrics["roles"].items():
+        print(f"         {role:<18} recall@{k}={row[f'recall_at_{k}']:.3f} mrr={row['mrr']:.3f} p95={row['p95_ms']}ms")
+
+
+def run_benchmark(args) -> dict:
+    golden = load_golden_set(args.golden)
+    ks = parse_int_list(args.k)
+    modes = [m.strip() for m in args.retrieval.split(",") if m.strip()]
+    embeddings = get_benchmark_embeddings(args.embedder)
+    # Every question is asked once per configuration; a memoized query vector would hide the embedding cost
+    if isinstance(embeddings, CachedQueryEmbeddings):
+        embeddings = embeddings.base
+    print(f"--- Retrieval benchmark: {len(golden)} golden questions, embedder={args.embedder}, index={args.index} ---")
+
+    runs = []
+    if args.index == "existing":
+        from rag_pipeline.chroma_db_manager import get_vector_store
+        store = get_vector_store(embeddings)
+        for mode, k in itertools.product(modes, ks):
+            metrics = evaluate(store, get_lexical_index() if mode == "hybrid" else None, golden, k)
+            print_run(f"existing {mode}", k, metrics)
+            runs.append({"index": "existing", "retrieval": mode, "k": k, **metrics})
+        return {"params": {"embedder": args.embedder, "index": "existing", "golden_questions": len(golden)},
+                "runs": runs}
+
+    file_paths = list(iter_pdf_files(args.data_path))
+    if not file_paths:
+        print(f"[FATAL] No PDFs found in '{args.data_path}'.")
+        sys.exit(1)
+    pages_by_file = {path: load_pdf_pages(path) for path in file_paths}
+
+    chunk_sizes = parse_int_list(args.chunk_sizes) if args.chunk_sizes else [CHUNK_SIZE]
+    hnsw_ms = parse_int_list(args.hnsw_m) if args.hnsw_m else [None]
+    search_efs = parse_int_list(args.search_ef) if args.search_ef else [None]
+
+    for chunk_size, hnsw_m, search_ef in itertools.product(chunk_sizes, hnsw_ms, search_efs):
+        collection_metadata = {}
+        if hnsw_m is not None:
+            collection_metadata["hnsw:M"] = hnsw_m
+        if search_ef is not None:
+            collection_metadata["hnsw:search_ef"] = search_ef
+
+        with tempfile.TemporaryDirectory() as scratch_dir:
+            store, lexical_index, index_stats = build_scratch_index(
+                pages_by_file, embeddings, chunk_size, collection_metadata or None, scratch_dir
+            )
+            label = f"chunk={chunk_size} M={hnsw_m or 'default'} ef={search_ef or 'default'}"
+            print(f"[INFO] {label}: indexed {index_stats.get('chunks', 0)} chunks in {index_stats['seconds']}s")
+            for mode, k in itertools.product(modes, ks):
+                metrics = evaluate(store, lexical_index if mode == "hybrid" else None, golden, k)
+                print_run(f"{label} {mode}", k, metrics)
+                runs.append({
+                    "chunk_size": chunk_size, "hnsw_m": hnsw_m, "search_ef": search_ef,
+                    "retrieval": mode, "k": k,
+                    "index_build": index_stats, **metrics
+                })
+
+    return {
+        "params": {
+            "embedder": args.embedder,
+            "index": "scratch",
+            "golden_questions": len(golden),
+            "files": len(file_paths),
+        },
+        "runs": runs,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark retrieval latency and recall on the golden set.")
+    parser.add_argument("--golden", default=GOLDEN_SET_PATH)
+    parser.add_argument("--data-path", default=DATA_PATH)
+    parser.add_argument("--index", choices=["scratch", "existing"], default="scratch",
+                        help="Build throwaway indexes from data/ (default) or query the live collection.")
+    parser.add_argument("--embedder", choices=["minilm", "fake"], default="minilm")
+    parser.add_argument("--retrieval", default="hybrid",
+                        help="Comma-separated retrieval modes to compare: vector, hybrid.")
+    parser.add_argument("--k", default="5", help="Comma-separated k values to sweep.")
+    parser.add_argument("--chunk-sizes", default="", help="Comma-separated chunk sizes (scratch index only).")
+    parser.add_argument("--hnsw-m", default="", help="Comma-separated HNSW M values (scratch index only).")
+    parser.add_argument("--search-ef", default="", help="Comma-separated HNSW search ef values (scratch index only).")
+    parser.add_argument("--output", default=None, help="JSON output path (default: benchmarks/results/).")
+    args = parser.parse_args()
+
+    results = run_benchmark(args)
+    write_results("retrieval", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
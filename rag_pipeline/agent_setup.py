@@ -7,10 +7,13 @@ from langchain.tools.render import render_text_description
 from langchain_core.prompts import PromptTemplate
 from langchain_core.runnables import RunnablePassthrough
 from datetime import date
+from typing import Dict, Optional, Tuple
 
 # Local imports
 from app.tools.agent_tools import get_password_change_tool, get_knowledge_tool, get_leave_tool
-from rag_pipeline.llm_models import initialize_llm
+from rag_pipeline.component_registry import get_component_registry
+from rag_pipeline.retrieval_prefetch import start_retrieval_prefetch
+from rag_pipeline.run_budget import AGENT_MAX_ITERATIONS
 
 # --- PROMPT WITH SINGLE-STRING INSTRUCTION ---
 AGENT_PROMPT_TEMPLATE = """
@@ -29,6 +32,10 @@ You are the KNAgent.
    - **CRITICAL:** The Action Input must be a SINGLE string separated by commas: "Start, End, Reason".
    - Example: "2025-12-01, 2025-12-05, Sick leave"
    - If the user says "one day", Start and End are the same date.
+5. **Follow-ups:** If the conversation so far already contains the answer, reply from it without searching again.
+
+**Conversation so far:**
+{chat_history}
 
 **Format:**
 Question: the input question
@@ -45,25 +52,49 @@ Question: {input}
 Thought:{agent_scratchpad}
 """
 
-def create_agent_system(user_id: str, session_id: str, user_role: str):
-    llm = initialize_llm()
+# --- PROMPT CACHE ---
+# Tool names/descriptions never change between requests, so the rendered
+# prompt is built once per tool set and only the date and history are filled per call.
+_PROMPT_CACHE: Dict[Tuple[str, ...], PromptTemplate] = {}
+
+def get_agent_prompt(tools, chat_history: str = "") -> PromptTemplate:
+    key = tuple(t.name for t in tools)
+    prompt = _PROMPT_CACHE.get(key)
+    if prompt is None:
+        prompt = PromptTemplate.from_template(AGENT_PROMPT_TEMPLATE).partial(
+            tools=render_text_description(tools),
+            tool_names=", ".join(key)
+        )
+        _PROMPT_CACHE[key] = prompt
+    return prompt.partial(
+        current_date=date.today().strftime("%Y-%m-%d"),
+        chat_history=chat_history or "(new conversation)"
+    )
+
+def create_agent_system(user_id: str, session_id: str, user_role: str, chat_history: str = "",
+                        prefetch_question: Optional[str] = None):
+    """
+    Builds the ReAct agent for one request.
+    `chat_history` is the bounded session memory (see load_conversation_memory).
+    With `prefetch_question`, retrieval for it starts right away and overlaps
+    the first LLM step (see RetrievalPrefetch).
+    """
+    registry = get_component_registry()
+    if registry.llm_healthy is False:
+        raise RuntimeError("LLM backend failed its last health check.")
+    llm = registry.llm
     
-    # 1. Initialize Tools
+    # 1. Initialize Tools (cheap per-user closures over shared components)
+    retriever = registry.get_retriever(user_role)
+    prefetch = start_retrieval_prefetch(prefetch_question, retriever, registry.embeddings) if prefetch_question else None
     password_tool = get_password_change_tool(user_id) 
-    knowledge_tool = get_knowledge_tool(user_role)
+    knowledge_tool = get_knowledge_tool(user_role, retriever=retriever, prefetch=prefetch)
     leave_tool = get_leave_tool(user_id)
     
     tools = [knowledge_tool, password_tool, leave_tool]
-    tool_names = ", ".join([t.name for t in tools])
     
     # 2. Build Prompt
-    prompt = PromptTemplate.from_template(AGENT_PROMPT_TEMPLATE).partial(
-        user_email=user_id,
-        current_date=date.today().strftime("%Y-%m-%d"),
-        tools=render_text_description(tools),
-        tool_names=tool_names,
-        user_role=user_role
-    )
+    prompt = get_agent_prompt(tools, chat_history)
     
     # 3. Create Agent
     agent = (
@@ -76,11 +107,16 @@ def create_agent_system(user_id: str, session_id: str, user_role: str):
     )
     
     # 4. Create Executor
+    # Step limit; time and tokens are enforced by the RunBudget callback passed to invoke
+    # (AgentExecutor's own max_execution_time would also count LLM queue waits)
     agent_executor = AgentExecutor(
         agent=agent, 
         tools=tools, 
         verbose=True, 
-        handle_parsing_errors=True
+        handle_parsing_errors=True,
+        return_intermediate_steps=True,  # Lets callers see which tools ran
+        max_iterations=AGENT_MAX_ITERATIONS,
+        early_stopping_method="force"
     )
     
     return agent_executor
\ No newline at end of file
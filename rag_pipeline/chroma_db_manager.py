@@ -1,10 +1,11 @@
 # rag_pipeline/chroma_db_manager.py
 
 import os
+import time
 from dotenv import load_dotenv
 from langchain_chroma import Chroma
 from langchain_core.embeddings import Embeddings
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Optional
 import sys
 
 # Load environment variables
@@ -14,12 +15,112 @@ load_dotenv()
 # These must match the variables set in your .env file
 CHROMA_PERSIST_DIR = os.getenv("CHROMA_PERSIST_DIR", "./chroma_data")
 CHROMA_COLLECTION_NAME = os.getenv("CHROMA_COLLECTION_NAME", "enterprise_knowledge_base")
+# "partitioned": one collection per RBAC role (default), "single": one shared collection + role filter
+CHROMA_LAYOUT = os.getenv("CHROMA_LAYOUT", "partitioned").lower()
+# Written by every ingestion run so caches can tell when the knowledge base changed
+KB_VERSION_FILE = os.path.join(CHROMA_PERSIST_DIR, "kb_version.txt")
+
+# --- Vector Search Backend ---
+# "chroma" (HNSW) or "numpy" (brute force over memory-mapped snapshots exported at ingestion)
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma").lower()
+NUMPY_SNAPSHOT_DIR = os.getenv("NUMPY_SNAPSHOT_DIR", os.path.join(CHROMA_PERSIST_DIR, "numpy_vectors"))
+# float16 halves memory and disk at a small precision cost
+NUMPY_VECTOR_DTYPE = os.getenv("NUMPY_VECTOR_DTYPE", "float32")
+
+def get_kb_version() -> str:
+    """Returns the current knowledge-base version ("0" if never ingested)."""
+    try:
+        with open(KB_VERSION_FILE, "r", encoding="utf-8") as f:
+            return f.read().strip() or "0"
+    except FileNotFoundError:
+        return "0"
+
+def bump_kb_version() -> str:
+    """Marks the knowledge base as changed. Call after every ingestion run."""
+    version = str(time.time_ns())
+    os.makedirs(CHROMA_PERSIST_DIR, exist_ok=True)
+    with open(KB_VERSION_FILE, "w", encoding="utf-8") as f:
+        f.write(version)
+    print(f"[INFO] Knowledge base version is now {version}")
+    return version
 
 def get_vector_store(embeddings: Embeddings):
     """
-    Initializes and returns the Chroma vector store client.
+    Returns the vector store used for retrieval, selected by VECTOR_BACKEND.
+    Ingestion always writes Chroma (see get_chroma_store); the NumPy backend
+    reads the snapshot exported from it.
+    """
+    if VECTOR_BACKEND == "numpy":
+        from .numpy_vector_store import NumpyVectorStore
+        print(f"[INFO] Using NumPy vector backend ({NUMPY_SNAPSHOT_DIR})")
+        return NumpyVectorStore(embeddings, NUMPY_SNAPSHOT_DIR)
+    if VECTOR_BACKEND != "chroma":
+        print(f"[WARN] Unknown VECTOR_BACKEND '{VECTOR_BACKEND}', falling back to chroma.")
+    return get_chroma_store(embeddings)
+
+def sync_numpy_snapshot(chroma_store, force: bool = False):
+    """
+    Re-exports the NumPy snapshot when the NumPy backend is selected and the
+    snapshot is older than the knowledge base. Called at the end of ingestion.
+    """
+    if VECTOR_BACKEND != "numpy":
+        return
+    from .numpy_vector_store import export_snapshot, snapshot_version
+    version = get_kb_version()
+    if force or snapshot_version(NUMPY_SNAPSHOT_DIR) != version:
+        export_snapshot(chroma_store, NUMPY_SNAPSHOT_DIR, version, dtype=NUMPY_VECTOR_DTYPE)
+
+# --- HNSW Index Parameters ---
+def get_hnsw_metadata(m: Optional[int] = None, ef_construction: Optional[int] = None,
+                      search_ef: Optional[int] = None) -> dict:
+    """
+    Chroma collection metadata for the HNSW index. Unspecified values come from
+    Settings (HNSW_M, HNSW_EF_CONSTRUCTION, HNSW_SEARCH_EF). M and ef_construction
+    only apply when a collection is created; search ef can change at any time.
+    """
+    from app.core.config import settings
+    return {
+        "hnsw:M": m or settings.HNSW_M,
+        "hnsw:construction_ef": ef_construction or settings.HNSW_EF_CONSTRUCTION,
+        "hnsw:search_ef": search_ef or settings.HNSW_SEARCH_EF,
+    }
+
+def _chroma_collections(vector_store) -> list:
+    if isinstance(vector_store, Chroma):
+        return [vector_store._collection]
+    return [vector_store.partition(role)._collection for role in vector_store.roles()]
+
+def set_search_ef(vector_store, search_ef: int):
+    """
+    Changes the query-time HNSW ef of existing collection(s) without a rebuild.
+    Higher ef = better recall, slower queries.
+    """
+    for collection in _chroma_collections(vector_store):
+        configuration = getattr(collection, "configuration", None)
+        if isinstance(configuration, dict) and configuration.get("hnsw") is not None:
+            # chromadb >= 1.0: the index reads its configuration; "hnsw:*" metadata is only a label
+            if configuration["hnsw"].get("ef_search") != search_ef:
+                collection.modify(configuration={"hnsw": {"ef_search": search_ef}})
+            continue
+
+        # chromadb 0.x: the index reads "hnsw:search_ef" from the metadata
+        metadata = dict(collection.metadata or {})
+        if metadata.get("hnsw:search_ef") == search_ef:
+            continue
+        # Chroma rejects "hnsw:space" in modify() and would fall back to l2 without it
+        if metadata.pop("hnsw:space", "l2") != "l2":
+            print(f"[WARN] Not changing search ef of '{collection.name}': it uses a non-default distance.")
+            continue
+        metadata["hnsw:search_ef"] = search_ef
+        collection.modify(metadata=metadata)
+
+def get_chroma_store(embeddings: Embeddings, layout: Optional[str] = None):
+    """
+    Initializes and returns the Chroma vector store client for the configured
+    layout (per-role partitions or one shared collection).
     Creates the store if it doesn't exist, otherwise loads from disk.
     """
+    layout = layout or CHROMA_LAYOUT
     if not os.path.exists(CHROMA_PERSIST_DIR):
         print(f"[INFO] Creating new persistent Chroma directory at {CHROMA_PERSIST_DIR}")
         try:
@@ -30,18 +131,49 @@ def get_vector_store(embeddings: Embeddings):
 
 
     # Use the Chroma client to connect to the persistent storage
+    hnsw_metadata = get_hnsw_metadata()
     try:
-        vector_store = Chroma(
-            collection_name=CHROMA_COLLECTION_NAME,
-            embedding_function=embeddings,
-            persist_directory=CHROMA_PERSIST_DIR
-        )
-        print(f"[INFO] Connected to ChromaDB collection: {CHROMA_COLLECTION_NAME}")
+        if layout == "partitioned":
+            from .partitioned_store import PartitionedChromaStore
+            vector_store = PartitionedChromaStore(embeddings, CHROMA_PERSIST_DIR, CHROMA_COLLECTION_NAME,
+                                                  collection_metadata=hnsw_metadata)
+            print(f"[INFO] Connected to ChromaDB role partitions of: {CHROMA_COLLECTION_NAME}")
+        else:
+            vector_store = Chroma(
+                collection_name=CHROMA_COLLECTION_NAME,
+                embedding_function=embeddings,
+                persist_directory=CHROMA_PERSIST_DIR,
+                collection_metadata=hnsw_metadata
+            )
+            print(f"[INFO] Connected to ChromaDB collection: {CHROMA_COLLECTION_NAME}")
+        # Collections created earlier keep their M/ef_construction, but pick up the configured search ef
+        set_search_ef(vector_store, hnsw_metadata["hnsw:search_ef"])
         return vector_store
     except Exception as e:
         print(f"[ERROR] Failed to connect to ChromaDB: {e}")
         raise
 
+# --- Layout-independent helpers (used by ingestion) ---
+def upsert_embeddings(vector_store, ids, embeddings, documents, metadatas):
+    """Writes precomputed vectors into either layout."""
+    if isinstance(vector_store, Chroma):
+        vector_store._collection.upsert(ids=ids, embeddings=embeddings, documents=documents, metadatas=metadatas)
+    else:
+        vector_store.upsert(ids=ids, embeddings=embeddings, documents=documents, metadatas=metadatas)
+
+def count_chunks(vector_store) -> int:
+    if isinstance(vector_store, Chroma):
+        return vector_store._collection.count()
+    return vector_store.count()
+
+def drop_layout(embeddings: Embeddings, layout: str):
+    """Removes the collection(s) of a layout that is no longer in use."""
+    store = get_chroma_store(embeddings, layout)
+    if layout == "partitioned":
+        store.drop()
+    else:
+        store.delete_collection()
+
 if __name__ == "__main__":
     # Corrected import using relative path (the dot)
     from .embedding_models import initialize_embedding_model
@@ -52,7 +184,7 @@ if __name__ == "__main__":
     embeddings = initialize_embedding_model()
     
     # 2. Get the vector store connection
-    db = get_vector_store(embeddings)
+    db = get_chroma_store(embeddings)
     
     # Check the count (should be 0 if the collection is new)
-    print(f"Current document count in collection: {db._collection.count()}")
\ No newline at end of file
+    print(f"Current document count in collection: {count_chunks(db)}")
\ No newline at end of file
@@ -0,0 +1,93 @@
+# rag_pipeline/component_registry.py
+
+import asyncio
+import threading
+from functools import lru_cache
+from typing import Dict, Optional
+
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models import BaseLanguageModel
+
+# Local imports
+from rag_pipeline.llm_models import initialize_llm, check_llm_health
+from rag_pipeline.ollama_pool import OllamaPool, get_ollama_pool
+from rag_pipeline.embedding_models import initialize_embedding_model
+from rag_pipeline.chroma_db_manager import get_vector_store
+from rag_pipeline.retrieval_chain import create_retriever
+
+
+class ComponentRegistry:
+    """
+    Process-wide holder for the expensive agent components.
+    Built ONCE (at startup) and shared by every request:
+    - the LLM client
+    - one vector store handle
+    - one retriever per role (created lazily, then reused)
+    """
+
+    def __init__(self, llm: BaseLanguageModel, embeddings: Embeddings, vector_store,
+                 probe_llm: Optional[BaseLanguageModel] = None, llm_pool: Optional[OllamaPool] = None):
+        self.llm = llm
+        # Health probes must bypass the completion cache
+        self.probe_llm = probe_llm or llm
+        # Ollama endpoints behind the LLM client; their /api/tags probes decide liveness
+        self.llm_pool = llm_pool
+        self.embeddings = embeddings
+        self.vector_store = vector_store
+        # None = not checked yet, True/False = result of the last probe
+        self.llm_healthy: Optional[bool] = None
+        self._retrievers: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def get_retriever(self, user_role: str):
+        """Returns the shared retriever for a role, creating it on first use."""
+        retriever = self._retrievers.get(user_role)
+        if retriever is None:
+            with self._lock:
+                retriever = self._retrievers.get(user_role)
+                if retriever is None:
+                    retriever = create_retriever(user_role, vector_store=self.vector_store)
+                    self._retrievers[user_role] = retriever
+        return retriever
+
+    def check_llm_health(self) -> bool:
+        """
+        Probes the LLM server(s) and records the result. With a pool, the cheap
+        per-endpoint probes are enough: a generation probe would compete with
+        admitted requests for the GPU, outside the scheduler, in every worker.
+        """
+        if self.llm_pool is not None:
+            healthy = self.llm_pool.probe_all()
+        else:
+            healthy = check_llm_health(self.probe_llm)
+        if healthy != self.llm_healthy:
+            state = "healthy" if healthy else "UNHEALTHY"
+            print(f"[HEALTH] LLM backend is {state}.")
+        self.llm_healthy = healthy
+        return healthy
+
+    async def run_health_monitor(self, interval_seconds: float):
+        """Background loop that re-probes the LLM every `interval_seconds`."""
+        while True:
+            await asyncio.sleep(interval_seconds)
+            # The probe is a blocking HTTP call, keep it off the event loop
+            await asyncio.to_thread(self.check_llm_health)
+
+
+@lru_cache(maxsize=1)
+def get_component_registry() -> ComponentRegistry:
+    """
+    Returns the process-wide component registry.
+    Uses @lru_cache so the LLM client and Chroma connection are built ONLY ONCE.
+    """
+    print("[INFO] Building agent component registry...")
+    embeddings = initialize_embedding_model()
+    registry = ComponentRegistry(
+        llm=initialize_llm(),
+        embeddings=embeddings,
+        vector_store=get_vector_store(embeddings),
+        probe_llm=initialize_llm(use_cache=False, scheduled=False),
+        llm_pool=get_ollama_pool(),
+    )
+    print("[SUCCESS] Agent component registry ready.")
+    return registry
@@ -0,0 +1,188 @@
+# rag_pipeline/context_packer.py
+
+import os
+import re
+import math
+from typing import List, Optional, Tuple
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from rag_pipeline.ttl_cache import TTLCache
+
+# --- Configuration ---
+CONTEXT_PACKING_ENABLED = os.getenv("CONTEXT_PACKING_ENABLED", "true").lower() == "true"
+# Approximate tokens of retrieved context handed to the LLM per search
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "384"))
+# Adaptive k: hits scoring below this fraction of the best hit are dropped
+CONTEXT_MIN_RELATIVE_SCORE = float(os.getenv("CONTEXT_MIN_RELATIVE_SCORE", "0.6"))
+# Chunks whose offsets are at most this far apart count as adjacent
+CONTEXT_STITCH_GAP = 5
+
+# Sentence vectors of popular chunks are reused across queries
+sentence_cache = TTLCache(int(os.getenv("CONTEXT_SENTENCE_CACHE_SIZE", "8192")), 3600)
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9\"'(•])")
+_NEW_LINE_UNIT = re.compile(r"^\s*([•\-*–]|\d+(\.\d+)*[.)]?\s|[A-Z])")
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per Llama token for English)."""
+    return max(1, len(text) // 4) if text else 0
+
+
+class Passage:
+    """A run of stitched chunks from one page, split into sentences."""
+
+    def __init__(self, doc: Document, rank: int):
+        self.source = doc.metadata.get("source")
+        self.page = doc.metadata.get("page")
+        self.start = doc.metadata.get("start_index")
+        self.text = doc.page_content
+        self.rank = rank
+        self.sentences: List[str] = []
+        self.scores: List[float] = []
+
+    @property
+    def end(self) -> int:
+        return self.start + len(self.text)
+
+    @property
+    def score(self) -> float:
+        return max(self.scores) if self.scores else 0.0
+
+    def absorb(self, doc: Document, rank: int) -> bool:
+        """
+        Merges a chunk that overlaps or directly follows this passage on the same
+        page, keeping the overlapping text once. Returns False if it is not adjacent.
+        """
+        start = doc.metadata.get("start_index")
+        if self.start is None or start is None or start > self.end + CONTEXT_STITCH_GAP:
+            return False
+        if (doc.metadata.get("source"), doc.metadata.get("page")) != (self.source, self.page):
+            return False
+        if start + len(doc.page_content) > self.end:
+            overlap = self.end - start
+            self.text += doc.page_content[overlap:] if overlap >= 0 else "\n" + doc.page_content
+        self.rank = min(self.rank, rank)
+        return True
+
+
+def dedupe_and_stitch(docs: List[Document]) -> List[Passage]:
+    """
+    Drops repeated hits and merges adjacent chunks of the same source and page.
+    Passages are returned in the order of their best-ranked chunk.
+    """
+    unique: List[Tuple[int, Document]] = []
+    seen = set()
+    for rank, doc in enumerate(docs):
+        key = getattr(doc, "id", None) or doc.metadata.get("chunk_id") or " ".join(doc.page_content.split())
+        if key not in seen:
+            seen.add(key)
+            unique.append((rank, doc))
+
+    # Walk each page in offset order so overlapping chunks meet their neighbours
+    def position(item):
+        rank, doc = item
+        start = doc.metadata.get("start_index")
+        if start is None:
+            return (1, rank, "", 0, 0)  # No offsets: never stitched
+        return (0, 0, str(doc.metadata.get("source")), str(doc.metadata.get("page")), start)
+
+    passages: List[Passage] = []
+    for rank, doc in sorted(unique, key=position):
+        previous = passages[-1] if passages else None
+        if previous is None or not previous.absorb(doc, rank):
+            passages.append(Passage(doc, rank))
+    return sorted(passages, key=lambda p: p.rank)
+
+
+def split_sentences(text: str) -> List[str]:
+    """
+    Sentence-like units. PDF text wraps lines mid-sentence, so a line only
+    starts a new unit when it looks like a bullet, a numbered item or a
+    capitalised line; units are then split again at sentence ends.
+    """
+    units: List[str] = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if units and not _NEW_LINE_UNIT.match(line):
+            units[-1] = f"{units[-1]} {line}"
+        else:
+            units.append(line)
+    return [s.strip() for unit in units for s in _SENTENCE_END.split(unit) if s.strip()]
+
+
+def _cosine(a: List[float], b: List[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+def _sentence_vectors(sentences: List[str], embeddings: Embeddings) -> List[List[float]]:
+    vectors: List[Optional[List[float]]] = [sentence_cache.get(s) for s in sentences]
+    missing = [i for i, v in enumerate(vectors) if v is None]
+    if missing:
+        fresh = embeddings.embed_documents([sentences[i] for i in missing])
+        for i, vector in zip(missing, fresh):
+            vectors[i] = vector
+            sentence_cache.put(sentences[i], vector)
+    return vectors
+
+
+def pack_context(query: str, docs: List[Document], embeddings: Optional[Embeddings],
+                 token_budget: int = CONTEXT_TOKEN_BUDGET,
+                 min_relative_score: float = CONTEXT_MIN_RELATIVE_SCORE) -> str:
+    """
+    Turns ranked retrieval hits into a compact context string:
+    1. drop duplicate hits and stitch adjacent chunks of one page,
+    2. score every sentence against the query with the embedding model,
+    3. adaptive k: drop passages whose best sentence is far below the top passage,
+    4. keep the best sentences until the token budget is spent.
+    Passages keep retrieval order and sentences keep document order.
+    """
+    passages = dedupe_and_stitch(docs)
+    if not passages:
+        return ""
+    if embeddings is None:
+        return "\n\n".join(p.text for p in passages)
+
+    for passage in passages:
+        passage.sentences = split_sentences(passage.text)
+    sentences = [s for p in passages for s in p.sentences]
+    try:
+        query_vector = embeddings.embed_query(query)
+        vectors = iter(_sentence_vectors(sentences, embeddings))
+    except Exception as e:
+        print(f"[WARN] Context packing skipped, embedding failed: {e}")
+        return "\n\n".join(p.text for p in passages)
+    for passage in passages:
+        passage.scores = [_cosine(query_vector, next(vectors)) for _ in passage.sentences]
+
+    # --- Adaptive k ---
+    best = max(p.score for p in passages)
+    if best > 0:
+        passages = [p for p in passages if p.score >= best * min_relative_score]
+
+    # --- Sentence selection under the budget ---
+    ranked: List[Tuple[float, int, int]] = sorted(
+        ((score, pi, si) for pi, p in enumerate(passages) for si, score in enumerate(p.scores)),
+        reverse=True
+    )
+    chosen = set()
+    used = 0
+    for score, pi, si in ranked:
+        cost = estimate_tokens(passages[pi].sentences[si])
+        if chosen and used + cost > token_budget:
+            continue  # A shorter, lower-ranked sentence may still fit
+        chosen.add((pi, si))
+        used += cost
+
+    blocks = []
+    for pi, passage in enumerate(passages):
+        kept = [s for si, s in enumerate(passage.sentences) if (pi, si) in chosen]
+        if kept:
+            blocks.append("\n".join(kept))
+    return "\n\n".join(blocks)
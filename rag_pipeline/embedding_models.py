@@ -1,31 +1,257 @@
 # rag_pipeline/embedding_models.py
 
 import os
+import json
+import socket
+import itertools
+import threading
 from dotenv import load_dotenv
 # --- CHANGED IMPORT ---
 # We switched from 'langchain_huggingface' to 'langchain_community'
 # This matches the stable LangChain 0.1.20 version we installed.
 from langchain_community.embeddings import HuggingFaceEmbeddings
-from functools import lru_cache 
+from langchain_core.embeddings import Embeddings
+from functools import lru_cache
+from typing import List, Optional
+
+from rag_pipeline.ttl_cache import TTLCache
 
 load_dotenv()
 
-EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2" 
+EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"
+
+# --- Embedding Backend ---
+# "torch": sentence-transformers via HuggingFaceEmbeddings
+# "onnx": the same model on ONNX Runtime (no PyTorch import), optionally int8-quantized
+# "sidecar": the shared embedding service (python -m rag_pipeline.embedding_service)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch").lower()
+EMBEDDING_ONNX_QUANTIZE = os.getenv("EMBEDDING_ONNX_QUANTIZE", "false").lower() == "true"
+EMBEDDING_ONNX_CACHE_DIR = os.getenv("EMBEDDING_ONNX_CACHE_DIR", "./cache/onnx")
+# 0 lets ONNX Runtime decide; set lower to leave cores for Ollama
+EMBEDDING_ONNX_THREADS = int(os.getenv("EMBEDDING_ONNX_THREADS", "0"))
+EMBEDDING_SOCKET_PATH = os.getenv("EMBEDDING_SOCKET_PATH", "./cache/embedding.sock")
+EMBEDDING_SIDECAR_TIMEOUT_SECONDS = float(os.getenv("EMBEDDING_SIDECAR_TIMEOUT_SECONDS", "30"))
+
+# --- Query Embedding Cache ---
+# Set the size to 0 to disable caching
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "2048"))
+QUERY_EMBEDDING_CACHE_TTL_SECONDS = float(os.getenv("QUERY_EMBEDDING_CACHE_TTL_SECONDS", "3600"))
+
+
+def normalize_query_text(text: str) -> str:
+    """
+    Canonical form of a search query used as a cache key.
+    MiniLM is uncased, so lower-casing and collapsing whitespace does not change the vector.
+    """
+    return " ".join(text.lower().split())
+
+
+class CachedQueryEmbeddings(Embeddings):
+    """
+    Wraps an Embeddings model with a bounded LRU+TTL cache for embed_query().
+    Document embedding (ingestion) is passed straight through.
+    """
+
+    def __init__(self, base: Embeddings, max_size: int, ttl_seconds: float):
+        self.base = base
+        self.cache = TTLCache(max_size, ttl_seconds)
+
+    def embed_query(self, text: str) -> List[float]:
+        key = normalize_query_text(text)
+        vector = self.cache.get(key)
+        if vector is None:
+            vector = self.base.embed_query(text)
+            self.cache.put(key, vector)
+        return vector
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.base.embed_documents(texts)
+
+
+class OnnxEmbeddings(Embeddings):
+    """
+    sentence-transformers model exported to ONNX, run with ONNX Runtime on CPU.
+    Reproduces the model's own pipeline (WordPiece tokenizer, mean pooling,
+    L2 normalization), so vectors match the PyTorch backend and the existing
+    index stays valid. With `quantize`, weights are dynamically quantized to
+    int8 once and the quantized file is reused.
+    """
+
+    def __init__(self, model_name: str, cache_dir: str, quantize: bool = False, threads: int = 0,
+                 batch_size: int = 32, max_length: int = 256):
+        try:
+            import onnxruntime as ort
+            from tokenizers import Tokenizer
+            from huggingface_hub import hf_hub_download
+        except ImportError as e:
+            raise ImportError(
+                "EMBEDDING_BACKEND=onnx needs 'onnxruntime', 'tokenizers' and 'huggingface_hub' "
+                "(pip install -r requirements-onnx.txt)."
+            ) from e
+
+        repo_id = model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+        model_path = hf_hub_download(repo_id, "onnx/model.onnx")
+        if quantize:
+            model_path = self._quantized_model(model_path, cache_dir, repo_id)
+
+        self.batch_size = batch_size
+        self.tokenizer = Tokenizer.from_file(hf_hub_download(repo_id, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.tokenizer.enable_padding()
+
+        options = ort.SessionOptions()
+        if threads > 0:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        output_names = [o.name for o in self.session.get_outputs()]
+        self.output_name = "last_hidden_state" if "last_hidden_state" in output_names else output_names[0]
+
+    @staticmethod
+    def _quantized_model(model_path: str, cache_dir: str, repo_id: str) -> str:
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+        quantized_path = os.path.join(cache_dir, f"{repo_id.replace('/', '__')}.int8.onnx")
+        if not os.path.exists(quantized_path):
+            os.makedirs(cache_dir, exist_ok=True)
+            print(f"[INFO] Quantizing {repo_id} to int8 (one-time)...")
+            tmp_path = f"{quantized_path}.tmp"
+            quantize_dynamic(model_path, tmp_path, weight_type=QuantType.QInt8)
+            os.replace(tmp_path, quantized_path)
+        return quantized_path
+
+    def _embed(self, texts: List[str]) -> List[List[float]]:
+        import numpy as np
+
+        vectors: List[List[float]] = []
+        for start in range(0, len(texts), self.batch_size):
+            encodings = self.tokenizer.encode_batch(texts[start:start + self.batch_size])
+            input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+            attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+            feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+            if "token_type_ids" in self.input_names:
+                feeds["token_type_ids"] = np.zeros_like(input_ids)
+            hidden = self.session.run([self.output_name], feeds)[0]
+
+            # Mean pooling over real tokens, then L2 normalization (as in the sentence-transformers model)
+            mask = attention_mask[..., None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            vectors.extend(pooled.tolist())
+        return vectors
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed(list(texts))
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed([text])[0]
+
+
+class SidecarEmbeddings(Embeddings):
+    """
+    Client of the embedding sidecar. Each thread keeps one Unix socket
+    connection open; the sidecar merges concurrent requests from all workers
+    into micro-batches. A dropped connection is re-opened once per call.
+    """
+
+    def __init__(self, socket_path: str, timeout: float = EMBEDDING_SIDECAR_TIMEOUT_SECONDS):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._ids = itertools.count(1)
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(self.socket_path)
+            except OSError as e:
+                sock.close()
+                raise ConnectionError(
+                    f"Embedding sidecar not reachable at {self.socket_path}. "
+                    "Start it with: python -m rag_pipeline.embedding_service"
+                ) from e
+            conn = (sock, sock.makefile("rb"))
+            self._local.conn = conn
+        return conn
+
+    def close(self):
+        """Closes the calling thread's connection."""
+        conn = getattr(self._local, "conn", None)
+        self._local.conn = None
+        if conn is not None:
+            conn[1].close()
+            conn[0].close()
+
+    def _call(self, payload: dict) -> dict:
+        payload = {"id": next(self._ids), **payload}
+        line = json.dumps(payload).encode("utf-8") + b"\n"
+        for attempt in range(2):
+            sock, reader = self._connection()
+            try:
+                sock.sendall(line)
+                raw = reader.readline()
+                if not raw:
+                    raise ConnectionResetError("Embedding sidecar closed the connection")
+                break
+            except (OSError, ConnectionError):
+                # Stale connection (e.g. the sidecar restarted): reconnect once
+                self.close()
+                if attempt:
+                    raise
+        response = json.loads(raw)
+        if response.get("error"):
+            raise RuntimeError(f"Embedding sidecar error: {response['error']}")
+        return response
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        return self._call({"texts": list(texts)})["vectors"]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._call({"texts": [text]})["vectors"][0]
+
+    def stats(self) -> dict:
+        """Batching counters reported by the sidecar."""
+        return self._call({"op": "stats"})["stats"]
+
+
+def create_base_embeddings(backend: Optional[str] = None) -> Embeddings:
+    """Builds the (uncached) embedding model for a backend ("torch", "onnx" or "sidecar")."""
+    backend = backend or EMBEDDING_BACKEND
+    if backend == "sidecar":
+        return SidecarEmbeddings(EMBEDDING_SOCKET_PATH)
+    if backend == "onnx":
+        return OnnxEmbeddings(
+            EMBEDDING_MODEL_NAME, EMBEDDING_ONNX_CACHE_DIR,
+            quantize=EMBEDDING_ONNX_QUANTIZE, threads=EMBEDDING_ONNX_THREADS
+        )
+    if backend != "torch":
+        print(f"[WARN] Unknown EMBEDDING_BACKEND '{backend}', falling back to torch.")
+    return HuggingFaceEmbeddings(
+        model_name=EMBEDDING_MODEL_NAME,
+        model_kwargs={'device': 'cpu'}
+    )
+
 
 @lru_cache(maxsize=1)
 def initialize_embedding_model():
     """
-    Initializes the HuggingFace Embedding Model.
+    Initializes the Embedding Model with the configured backend.
     Uses @lru_cache to ensure we load the model ONLY ONCE into memory.
+    Query embeddings are memoized through CachedQueryEmbeddings.
     """
     try:
-        print(f"[INFO] Loading embedding model: {EMBEDDING_MODEL_NAME}...")
-        embeddings = HuggingFaceEmbeddings(
-            model_name=EMBEDDING_MODEL_NAME,
-            model_kwargs={'device': 'cpu'} 
-        )
+        print(f"[INFO] Loading embedding model: {EMBEDDING_MODEL_NAME} (backend={EMBEDDING_BACKEND})...")
+        embeddings = create_base_embeddings()
         print(f"[SUCCESS] Embedding model loaded.")
+        if QUERY_EMBEDDING_CACHE_SIZE > 0:
+            embeddings = CachedQueryEmbeddings(
+                embeddings, QUERY_EMBEDDING_CACHE_SIZE, QUERY_EMBEDDING_CACHE_TTL_SECONDS
+            )
         return embeddings
     except Exception as e:
         print(f"[ERROR] Failed to initialize embedding model: {e}")
-        raise
\ No newline at end of file
+        raise
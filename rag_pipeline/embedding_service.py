@@ -0,0 +1,183 @@
+# rag_pipeline/embedding_service.py
+#
+# Shared embedding sidecar: ONE process owns the model and serves every
+# uvicorn worker over a Unix socket. Concurrent requests are merged into
+# micro-batches so the model runs one batched forward pass instead of many
+# single-text passes.
+#
+# Run:   python -m rag_pipeline.embedding_service
+# Use:   EMBEDDING_BACKEND=sidecar in the API workers (see SidecarEmbeddings)
+#
+# Protocol: one JSON object per line.
+#   -> {"id": 1, "texts": ["..."]}      <- {"id": 1, "vectors": [[...]]}
+#   -> {"id": 2, "op": "stats"}         <- {"id": 2, "stats": {...}}
+#   errors:                              <- {"id": n, "error": "..."}
+
+import os
+import json
+import time
+import asyncio
+from typing import Callable, List, Optional, Tuple
+
+# --- Configuration ---
+EMBEDDING_SOCKET_PATH = os.getenv("EMBEDDING_SOCKET_PATH", "./cache/embedding.sock")
+# Upper bound on texts per forward pass
+EMBEDDING_MAX_BATCH_SIZE = int(os.getenv("EMBEDDING_MAX_BATCH_SIZE", "64"))
+# How long the first request of a batch may wait for company
+EMBEDDING_MAX_WAIT_MS = float(os.getenv("EMBEDDING_MAX_WAIT_MS", "5"))
+# Model backend the sidecar itself runs ("torch" or "onnx")
+EMBEDDING_SIDECAR_MODEL_BACKEND = os.getenv("EMBEDDING_SIDECAR_MODEL_BACKEND", "torch")
+# Lines can hold a full ingestion batch of vectors
+_STREAM_LIMIT = 64 * 1024 * 1024
+
+
+class MicroBatcher:
+    """
+    Collects embed requests and runs them as one model call once either
+    `max_batch_size` texts are waiting or the oldest request has waited
+    `max_wait_ms`. The model runs in a worker thread, one batch at a time.
+    """
+
+    def __init__(self, embed_fn: Callable[[List[str]], List[List[float]]],
+                 max_batch_size: int = EMBEDDING_MAX_BATCH_SIZE, max_wait_ms: float = EMBEDDING_MAX_WAIT_MS):
+        self.embed_fn = embed_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait_seconds = max_wait_ms / 1000
+        self._queue: "asyncio.Queue[Tuple[List[str], asyncio.Future]]" = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+        self.batches = 0
+        self.texts = 0
+        self.requests = 0
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((texts, future))
+        return await future
+
+    async def _next_batch(self) -> List[Tuple[List[str], asyncio.Future]]:
+        batch = [await self._queue.get()]
+        size = len(batch[0][0])
+        deadline = time.monotonic() + self.max_wait_seconds
+        while size < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(self._queue.get(), remaining)
+            except asyncio.TimeoutError:
+                break
+            batch.append(item)
+            size += len(item[0])
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._next_batch()
+            texts = [text for request_texts, _ in batch for text in request_texts]
+            try:
+                vectors = await asyncio.to_thread(self.embed_fn, texts)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.texts += len(texts)
+            self.requests += len(batch)
+            offset = 0
+            for request_texts, future in batch:
+                if not future.done():
+                    future.set_result(vectors[offset:offset + len(request_texts)])
+                offset += len(request_texts)
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "requests": self.requests,
+            "texts": self.texts,
+            "avg_batch_size": round(self.texts / self.batches, 2) if self.batches else 0.0,
+            "queued": self._queue.qsize(),
+        }
+
+
+async def _handle_connection(batcher: MicroBatcher, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    """One client connection (a worker thread); requests on it are answered in order."""
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            request_id = None
+            try:
+                request = json.loads(line)
+                request_id = request.get("id")
+                if request.get("op") == "stats":
+                    response = {"id": request_id, "stats": batcher.stats()}
+                else:
+                    response = {"id": request_id, "vectors": await batcher.embed(list(request["texts"]))}
+            except Exception as e:
+                response = {"id": request_id, "error": f"{type(e).__name__}: {e}"}
+            writer.write(json.dumps(response).encode("utf-8") + b"\n")
+            await writer.drain()
+    except (ConnectionResetError, BrokenPipeError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(embed_fn: Callable[[List[str]], List[List[float]]], socket_path: str = EMBEDDING_SOCKET_PATH,
+                max_batch_size: int = EMBEDDING_MAX_BATCH_SIZE, max_wait_ms: float = EMBEDDING_MAX_WAIT_MS,
+                ready: Optional[asyncio.Event] = None):
+    """Serves until cancelled."""
+    directory = os.path.dirname(socket_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)  # Stale socket from a previous run
+
+    batcher = MicroBatcher(embed_fn, max_batch_size, max_wait_ms)
+    batcher.start()
+    server = await asyncio.start_unix_server(
+        lambda r, w: _handle_connection(batcher, r, w), path=socket_path, limit=_STREAM_LIMIT
+    )
+    print(f"[SUCCESS] Embedding sidecar listening on {socket_path} "
+          f"(max batch {max_batch_size}, max wait {max_wait_ms} ms)")
+    if ready is not None:
+        ready.set()
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await batcher.stop()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+
+def main():
+    from rag_pipeline.embedding_models import create_base_embeddings, EMBEDDING_MODEL_NAME
+
+    if EMBEDDING_SIDECAR_MODEL_BACKEND == "sidecar":
+        raise SystemExit("[FATAL] EMBEDDING_SIDECAR_MODEL_BACKEND must be 'torch' or 'onnx'.")
+    print(f"[INFO] Loading embedding model for the sidecar: {EMBEDDING_MODEL_NAME} "
+          f"(backend={EMBEDDING_SIDECAR_MODEL_BACKEND})...")
+    model = create_base_embeddings(EMBEDDING_SIDECAR_MODEL_BACKEND)
+    try:
+        asyncio.run(serve(model.embed_documents))
+    except KeyboardInterrupt:
+        print("[INFO] Embedding sidecar stopped.")
+
+
+if __name__ == "__main__":
+    main()
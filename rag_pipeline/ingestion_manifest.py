@@ -0,0 +1,109 @@
+# rag_pipeline/ingestion_manifest.py
+
+import os
+import json
+from typing import Dict, List, Optional, Tuple
+
+MANIFEST_VERSION = 1
+
+
+class IngestionManifest:
+    """
+    Records what is already in the vector store, per source file:
+    - the file's content hash (unchanged files are skipped without parsing)
+    - chunk_id -> chunk content hash (only new/changed chunks get re-embedded)
+    Stored as JSON next to the Chroma data.
+    """
+
+    def __init__(self, path: str, files: Optional[Dict[str, dict]] = None, exists: bool = False,
+                 splitter_signature: Optional[str] = None, layout: Optional[str] = None):
+        self.path = path
+        self.files: Dict[str, dict] = files or {}
+        self.exists = exists
+        # Chunking settings the recorded chunks were produced with
+        self.splitter_signature = splitter_signature
+        # Vector store layout the chunks were written to ("single" predates partitioning)
+        self.layout = layout
+
+    @classmethod
+    def load(cls, path: str) -> "IngestionManifest":
+        if not os.path.exists(path):
+            return cls(path)
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(path, files=data.get("files", {}), exists=True,
+                   splitter_signature=data.get("splitter_signature"), layout=data.get("layout", "single"))
+
+    def save(self):
+        """Atomic write, so a crash never leaves a half-written manifest."""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "version": MANIFEST_VERSION,
+                "splitter_signature": self.splitter_signature,
+                "layout": self.layout,
+                "files": self.files
+            }, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+        self.exists = True
+
+    def file_hash(self, source: str) -> Optional[str]:
+        entry = self.files.get(source)
+        return entry["file_hash"] if entry else None
+
+    def chunk_hashes(self, source: str) -> Dict[str, str]:
+        entry = self.files.get(source)
+        return dict(entry["chunks"]) if entry else {}
+
+    def set_file(self, source: str, file_hash: str, chunk_hashes: Dict[str, str]):
+        self.files[source] = {"file_hash": file_hash, "chunks": chunk_hashes}
+
+    def remove_file(self, source: str) -> List[str]:
+        """Forgets a file and returns the chunk IDs that must be deleted from the store."""
+        entry = self.files.pop(source, None)
+        return list(entry["chunks"]) if entry else []
+
+
+def diff_chunks(old: Dict[str, str], new: Dict[str, str]) -> Tuple[List[str], List[str]]:
+    """
+    Compares chunk_id -> hash maps of one file.
+    Returns (ids_to_upsert, ids_to_delete).
+    """
+    to_upsert = [chunk_id for chunk_id, chunk_hash in new.items() if old.get(chunk_id) != chunk_hash]
+    to_delete = [chunk_id for chunk_id in old if chunk_id not in new]
+    return to_upsert, to_delete
+
+
+class PendingFileUpdates:
+    """
+    Holds a file's new manifest entry until every one of its chunks has been
+    written. Batches mix chunks from several files, so an entry is committed
+    only when its last chunk is flushed; a crash never records unwritten chunks.
+    """
+
+    def __init__(self, manifest: IngestionManifest):
+        self.manifest = manifest
+        self._pending: Dict[str, list] = {}
+
+    def add(self, source: str, file_hash: str, chunk_hashes: Dict[str, str], outstanding: int):
+        if outstanding == 0:
+            self.manifest.set_file(source, file_hash, chunk_hashes)
+            self.manifest.save()
+        else:
+            self._pending[source] = [file_hash, chunk_hashes, outstanding]
+
+    def mark_written(self, sources: List[str]):
+        """Call after a batch is written, with the source of each chunk in it."""
+        committed = False
+        for source in sources:
+            entry = self._pending[source]
+            entry[2] -= 1
+            if entry[2] == 0:
+                del self._pending[source]
+                self.manifest.set_file(source, entry[0], entry[1])
+                committed = True
+        if committed:
+            self.manifest.save()
@@ -0,0 +1,128 @@
+# rag_pipeline/ingestion_pipeline.py
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+from .utils import create_text_splitter, load_pdf_pages, split_pages
+from .chroma_db_manager import upsert_embeddings
+
+# --- Configuration ---
+INGESTION_WORKERS = int(os.getenv("INGESTION_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+INGESTION_BATCH_SIZE = int(os.getenv("INGESTION_BATCH_SIZE", "64"))
+# Seconds between progress lines
+PROGRESS_INTERVAL_SECONDS = float(os.getenv("INGESTION_PROGRESS_INTERVAL", "5"))
+
+
+# --- Progress & Throughput Reporting ---
+class IngestionProgress:
+    """Counts pages/chunks/embeddings and prints throughput at a fixed interval."""
+
+    def __init__(self, interval_seconds: float = PROGRESS_INTERVAL_SECONDS):
+        self.interval_seconds = interval_seconds
+        self.started = time.perf_counter()
+        self._last_report = self.started
+        self.files = 0
+        self.pages = 0
+        self.chunks = 0
+        self.embeddings = 0
+
+    def add(self, files: int = 0, pages: int = 0, chunks: int = 0, embeddings: int = 0):
+        self.files += files
+        self.pages += pages
+        self.chunks += chunks
+        self.embeddings += embeddings
+        now = time.perf_counter()
+        if now - self._last_report >= self.interval_seconds:
+            self._last_report = now
+            self.report()
+
+    def rates(self) -> dict:
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        return {
+            "elapsed_s": elapsed,
+            "pages_per_s": self.pages / elapsed,
+            "chunks_per_s": self.chunks / elapsed,
+            "embeddings_per_s": self.embeddings / elapsed,
+        }
+
+    def report(self, final: bool = False):
+        r = self.rates()
+        tag = "[DONE]" if final else "[PROGRESS]"
+        print(f"{tag} {self.files} files, {self.pages} pages ({r['pages_per_s']:.1f}/s), "
+              f"{self.chunks} chunks ({r['chunks_per_s']:.1f}/s), "
+              f"{self.embeddings} embeddings ({r['embeddings_per_s']:.1f}/s) in {r['elapsed_s']:.1f}s")
+
+
+# --- Stage 1: Parse & Split (process pool) ---
+_worker_splitter = None
+
+def _parse_file_worker(file_path: str, file_hash: Optional[str] = None) -> Tuple[str, int, List[Document]]:
+    """Runs in a worker process. Returns (file_path, page_count, chunks)."""
+    global _worker_splitter
+    if _worker_splitter is None:
+        _worker_splitter = create_text_splitter()
+    pages = load_pdf_pages(file_path, file_hash)
+    chunks = split_pages(pages, file_path, _worker_splitter)
+    return file_path, len(pages), chunks
+
+def parse_files(file_paths: Iterable[str], workers: int = INGESTION_WORKERS,
+                file_hashes: Optional[Dict[str, str]] = None) -> Iterator[Tuple[str, int, List[Document]]]:
+    """
+    Parses and splits files in parallel, yielding results as they complete.
+    At most `2 * workers` files are in flight, so memory is bounded by a
+    handful of documents no matter how large the corpus is.
+    Known `file_hashes` (path -> hash) save the page cache from re-hashing.
+    """
+    file_hashes = file_hashes or {}
+    if workers <= 1:
+        for file_path in file_paths:
+            yield _parse_file_worker(file_path, file_hashes.get(file_path))
+        return
+
+    max_in_flight = workers * 2
+    pending = set()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for file_path in file_paths:
+            pending.add(pool.submit(_parse_file_worker, file_path, file_hashes.get(file_path)))
+            if len(pending) >= max_in_flight:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+
+
+def iter_batches(items: Iterable, batch_size: int) -> Iterator[list]:
+    """Groups a stream into lists of at most `batch_size` items."""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# --- Stage 2/3: Batched Embedding + Upsert ---
+def embed_and_upsert(vector_store, embeddings, chunks: List[Document]) -> int:
+    """
+    Embeds one batch with a single model call and writes it with a single
+    Chroma upsert (deterministic IDs make re-runs overwrite instead of duplicate).
+    """
+    texts = [c.page_content for c in chunks]
+    vectors = embeddings.embed_documents(texts)
+    upsert_embeddings(
+        vector_store,
+        ids=[c.metadata['chunk_id'] for c in chunks],
+        embeddings=vectors,
+        documents=texts,
+        metadatas=[c.metadata for c in chunks]
+    )
+    return len(chunks)
@@ -3,70 +3,199 @@
 import os
 import sys
 from dotenv import load_dotenv
+from langchain_core.documents import Document
 
 # Use relative imports to fetch our core components
-from .utils import load_and_split_documents
+from .utils import iter_pdf_files, compute_file_hash, compute_chunk_hash, get_splitter_signature
 from .embedding_models import initialize_embedding_model
-from .chroma_db_manager import get_vector_store
+from .chroma_db_manager import (
+    get_chroma_store, count_chunks, drop_layout, bump_kb_version, sync_numpy_snapshot,
+    CHROMA_PERSIST_DIR, CHROMA_LAYOUT
+)
+from .lexical_index import get_lexical_index
+from .ingestion_manifest import IngestionManifest, PendingFileUpdates, diff_chunks
+from .ingestion_pipeline import (
+    parse_files, iter_batches, embed_and_upsert, IngestionProgress,
+    INGESTION_WORKERS, INGESTION_BATCH_SIZE
+)
 
 # Load environment variables
 load_dotenv()
 
 # --- Configuration ---
 DATA_PATH = "data"
+MANIFEST_PATH = os.path.join(CHROMA_PERSIST_DIR, "ingestion_manifest.json")
+
+
+def _delete_ids(vector_store, ids):
+    lexical_index = get_lexical_index()
+    for batch in iter_batches(ids, INGESTION_BATCH_SIZE):
+        vector_store.delete(ids=batch)
+        lexical_index.delete(batch)
+
+def _reset_legacy_collection(vector_store):
+    """
+    Collections filled before the manifest existed have random chunk IDs,
+    which would be duplicated by a deterministic-ID run. Clear them once.
+    """
+    legacy_ids = vector_store.get(include=[])["ids"]
+    print(f"[WARN] No ingestion manifest found. Removing {len(legacy_ids)} legacy chunks before re-indexing.")
+    _delete_ids(vector_store, legacy_ids)
+    get_lexical_index().clear()
+
+def _switch_layout(embeddings, manifest, previous_layout):
+    """
+    Drops the collection(s) of the old layout and forgets every file, so all
+    chunks are re-written into the new layout on this run.
+    """
+    if manifest.exists:
+        print(f"[INFO] Vector store layout changed ({previous_layout} -> {CHROMA_LAYOUT}). Re-indexing all files.")
+    drop_layout(embeddings, previous_layout)
+    get_lexical_index().clear()
+    manifest.files = {}
+    manifest.layout = CHROMA_LAYOUT
+    if manifest.exists:
+        manifest.save()
+
+def _backfill_lexical_index(vector_store):
+    """
+    Builds the BM25 index from the chunks already in Chroma (e.g. the first run
+    after upgrading), since unchanged files are never re-chunked.
+    """
+    result = vector_store.get(include=["documents", "metadatas"])
+    chunks = [
+        Document(page_content=text, metadata={**(meta or {}), "chunk_id": chunk_id})
+        for chunk_id, text, meta in zip(result["ids"], result["documents"], result["metadatas"])
+    ]
+    print(f"[INFO] Building the lexical (BM25) index from {len(chunks)} existing chunks...")
+    lexical_index = get_lexical_index()
+    for batch in iter_batches(chunks, INGESTION_BATCH_SIZE):
+        lexical_index.upsert(batch)
+
 
 def run_ingestion():
     """
-    Executes the full RAG indexing pipeline:
-    1. Loads and splits documents with RBAC metadata.
-    2. Initializes the embedding model.
-    3. Connects to the ChromaDB vector store.
-    4. Adds all document chunks to the vector store.
+    Executes the incremental RAG indexing pipeline (safe to re-run unattended):
+    1. Initializes the embedding model and connects to ChromaDB (one collection
+       per role by default; switching CHROMA_LAYOUT re-indexes everything).
+    2. Deletes chunks of files that were removed from the data directory.
+    3. Skips files whose content hash is unchanged.
+    4. Streams changed/new files through a parallel parse/split stage and
+       batched embedding + upserts (deterministic IDs), deleting chunks that
+       no longer exist. Memory stays bounded by the batch size and workers.
+       The BM25 lexical index receives the same upserts and deletes.
     """
     if not os.path.exists(DATA_PATH) or not os.listdir(DATA_PATH):
         print(f"[FATAL] Data directory '{DATA_PATH}' is empty or does not exist.")
         print("Please run the download_data.py script first.")
         sys.exit(1)
 
-    print("--- Starting RAG Ingestion Pipeline ---")
-    
-    # 1. Load, Split, and Tag Documents
-    print("[STEP 1/4] Loading and splitting documents with RBAC tags...")
-    chunks = load_and_split_documents(data_path=DATA_PATH)
-    if not chunks:
-        print("[FATAL] No chunks were created. Aborting ingestion.")
-        sys.exit(1)
-        
-    print(f"[SUCCESS] Total documents processed into {len(chunks)} chunks.")
+    print("--- Starting RAG Ingestion Pipeline (incremental) ---")
 
-    # 2. Initialize Embedding Model
-    print("\n[STEP 2/4] Initializing embedding model...")
+    # 1. Initialize Embedding Model & Vector Store
+    print("[STEP 1/4] Initializing embedding model and ChromaDB vector store...")
     embeddings = initialize_embedding_model()
-    print("[SUCCESS] Embedding model ready.")
-    
-    # 3. Connect to Vector Store
-    print("\n[STEP 3/4] Connecting to ChromaDB vector store...")
-    vector_store = get_vector_store(embeddings)
-    initial_count = vector_store._collection.count()
-    print(f"[INFO] Current document count in DB: {initial_count}")
-
-    # Check if the collection is already populated (optional but helpful)
-    if initial_count > 0 and input("Collection is not empty. Proceed with adding new data? (y/n): ").lower() != 'y':
-        print("[INFO] Aborting ingestion at user request.")
-        return
-
-    # 4. Add Documents to Vector Store
-    print("\n[STEP 4/4] Adding new document chunks to ChromaDB...")
-    
-    # LangChain's add_documents handles the embedding process automatically
-    # The RBAC metadata is automatically stored alongside the vectors
-    vector_store.add_documents(chunks)
-    
-    final_count = vector_store._collection.count()
-    print(f"[SUCCESS] Ingestion complete. Documents added: {final_count - initial_count}")
+    manifest = IngestionManifest.load(MANIFEST_PATH)
+    # Chunks written before the manifest existed always live in the single collection
+    previous_layout = manifest.layout if manifest.exists else "single"
+    if previous_layout != CHROMA_LAYOUT:
+        _switch_layout(embeddings, manifest, previous_layout)
+    manifest.layout = CHROMA_LAYOUT
+
+    vector_store = get_chroma_store(embeddings)
+    initial_count = count_chunks(vector_store)
+    print(f"[INFO] Current document count in DB ({CHROMA_LAYOUT} layout): {initial_count}")
+
+    lexical_backfilled = False
+    if not manifest.exists and initial_count > 0:
+        _reset_legacy_collection(vector_store)
+    elif initial_count > 0 and get_lexical_index().count() == 0:
+        _backfill_lexical_index(vector_store)
+        lexical_backfilled = True
+
+    # 2. Remove Deleted Files
+    print("\n[STEP 2/4] Checking for removed documents...")
+    current_files = {os.path.basename(path): path for path in iter_pdf_files(DATA_PATH)}
+    if not current_files:
+        print("[FATAL] No PDF documents found. Aborting ingestion.")
+        sys.exit(1)
+
+    deleted_chunks = 0
+    for source in sorted(set(manifest.files) - set(current_files)):
+        stale_ids = manifest.remove_file(source)
+        _delete_ids(vector_store, stale_ids)
+        deleted_chunks += len(stale_ids)
+        print(f"[INFO] Removed {len(stale_ids)} chunks of deleted file {source}")
+    manifest.save()
+
+    # 3. Find New & Changed Files (hash only, no parsing)
+    print("\n[STEP 3/4] Scanning documents for changes...")
+    splitter_signature = get_splitter_signature()
+    rechunk_all = manifest.splitter_signature != splitter_signature
+    if rechunk_all and manifest.files:
+        print(f"[INFO] Chunking settings changed ({manifest.splitter_signature} -> {splitter_signature}). Re-chunking all files.")
+
+    changed_files = {}
+    for source, file_path in sorted(current_files.items()):
+        file_hash = compute_file_hash(file_path)
+        if rechunk_all or manifest.file_hash(source) != file_hash:
+            changed_files[file_path] = file_hash
+    unchanged_files = len(current_files) - len(changed_files)
+    print(f"[INFO] {len(changed_files)} new/changed files, {unchanged_files} unchanged.")
+
+    # 4. Streaming Pipeline: parallel parse/split -> diff -> batched embed + upsert
+    print(f"\n[STEP 4/4] Indexing with {INGESTION_WORKERS} parser workers, batch size {INGESTION_BATCH_SIZE}...")
+    progress = IngestionProgress()
+    pending_updates = PendingFileUpdates(manifest)
+    upserted_chunks = skipped_files = 0
+
+    def chunks_to_upsert():
+        nonlocal deleted_chunks, skipped_files
+        for file_path, page_count, chunks in parse_files(changed_files, INGESTION_WORKERS, file_hashes=changed_files):
+            source = os.path.basename(file_path)
+            if page_count == 0:
+                # Unreadable file: keep its old chunks and retry on the next run
+                print(f"[WARN] Skipping {source}: no pages could be parsed.")
+                skipped_files += 1
+                continue
+            new_hashes = {c.metadata['chunk_id']: compute_chunk_hash(c) for c in chunks}
+            to_upsert, to_delete = diff_chunks(manifest.chunk_hashes(source), new_hashes)
+
+            _delete_ids(vector_store, to_delete)
+            deleted_chunks += len(to_delete)
+            progress.add(files=1, pages=page_count, chunks=len(chunks))
+            pending_updates.add(source, changed_files[file_path], new_hashes, outstanding=len(to_upsert))
+
+            upsert_set = set(to_upsert)
+            for chunk in chunks:
+                if chunk.metadata['chunk_id'] in upsert_set:
+                    yield chunk
+
+    for batch in iter_batches(chunks_to_upsert(), INGESTION_BATCH_SIZE):
+        upserted_chunks += embed_and_upsert(vector_store, embeddings, batch)
+        get_lexical_index().upsert(batch)
+        progress.add(embeddings=len(batch))
+        pending_updates.mark_written([c.metadata['source'] for c in batch])
+
+    progress.report(final=True)
+
+    # Recorded last, so an interrupted re-chunk is resumed on the next run
+    if skipped_files == 0:
+        manifest.splitter_signature = splitter_signature
+        manifest.save()
+    print(f"[SUMMARY] {unchanged_files} files unchanged, "
+          f"{upserted_chunks} chunks embedded, {deleted_chunks} chunks removed.")
+
+    if upserted_chunks or deleted_chunks or lexical_backfilled:
+        # Invalidates cached answers/retrievals built on the previous content
+        bump_kb_version()
+    # Keeps the NumPy backend (when selected) in step with the collection
+    sync_numpy_snapshot(vector_store)
+
+    final_count = count_chunks(vector_store)
     print(f"Final document count in ChromaDB: {final_count}")
     print("\n--- RAG Knowledge Base is ready for retrieval! ---")
 
 
 if __name__ == "__main__":
-    run_ingestion()
\ No newline at end of file
+    run_ingestion()
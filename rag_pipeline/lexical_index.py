@@ -0,0 +1,177 @@
+# rag_pipeline/lexical_index.py
+
+import os
+import re
+import json
+import math
+import sqlite3
+import threading
+from collections import Counter
+from functools import lru_cache
+from typing import Iterable, List, Tuple, Union
+
+from langchain_core.documents import Document
+
+from rag_pipeline.chroma_db_manager import CHROMA_PERSIST_DIR
+
+# --- Configuration ---
+LEXICAL_INDEX_PATH = os.getenv("LEXICAL_INDEX_PATH", os.path.join(CHROMA_PERSIST_DIR, "lexical_index.sqlite3"))
+# Standard Okapi BM25 parameters
+BM25_K1 = float(os.getenv("BM25_K1", "1.2"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i if in is my of on or our the "
+    "to we what when where which who why will with you your".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lower-cased alphanumeric terms without stopwords ("GDPR", "VPN" and "401" survive intact).
+    "it" is deliberately not a stopword: it is also the IT department.
+    """
+    return [t for t in _TOKEN_PATTERN.findall(text.lower()) if t not in _STOPWORDS]
+
+
+class LexicalIndex:
+    """
+    BM25 inverted index over the ingested chunks, partitioned by RBAC role.
+    Postings live in SQLite next to the Chroma data and are updated per chunk
+    at ingestion time, so exact terms ("GDPR", "probation", form names) can be
+    matched even when the embedding similarity misses them.
+    """
+
+    def __init__(self, path: str, k1: float = BM25_K1, b: float = BM25_B):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """CREATE TABLE IF NOT EXISTS chunks (
+                chunk_id TEXT PRIMARY KEY,
+                role TEXT NOT NULL,
+                length INTEGER NOT NULL,
+                text TEXT NOT NULL,
+                metadata TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_chunks_role ON chunks (role);
+            CREATE TABLE IF NOT EXISTS postings (
+                role TEXT NOT NULL,
+                term TEXT NOT NULL,
+                chunk_id TEXT NOT NULL,
+                tf INTEGER NOT NULL,
+                PRIMARY KEY (role, term, chunk_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_postings_chunk ON postings (chunk_id);"""
+        )
+        self._conn.commit()
+
+    # --- Ingestion ---
+    def upsert(self, chunks: Iterable[Document]):
+        """Adds or replaces chunks (keyed by metadata['chunk_id'])."""
+        chunk_rows, posting_rows, ids = [], [], []
+        for chunk in chunks:
+            chunk_id = chunk.metadata["chunk_id"]
+            role = chunk.metadata.get("role", "General_Employee")
+            terms = Counter(tokenize(chunk.page_content))
+            ids.append((chunk_id,))
+            chunk_rows.append((chunk_id, role, sum(terms.values()), chunk.page_content,
+                               json.dumps(chunk.metadata, default=str)))
+            posting_rows.extend((role, term, chunk_id, tf) for term, tf in terms.items())
+
+        with self._lock:
+            self._conn.executemany("DELETE FROM postings WHERE chunk_id = ?", ids)
+            self._conn.executemany("INSERT OR REPLACE INTO chunks VALUES (?, ?, ?, ?, ?)", chunk_rows)
+            self._conn.executemany("INSERT INTO postings VALUES (?, ?, ?, ?)", posting_rows)
+            self._conn.commit()
+
+    def delete(self, chunk_ids: List[str]):
+        rows = [(chunk_id,) for chunk_id in chunk_ids]
+        with self._lock:
+            self._conn.executemany("DELETE FROM postings WHERE chunk_id = ?", rows)
+            self._conn.executemany("DELETE FROM chunks WHERE chunk_id = ?", rows)
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM postings")
+            self._conn.execute("DELETE FROM chunks")
+            self._conn.commit()
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    # --- Search ---
+    def search(self, query: str, roles: Union[str, List[str]], k: int) -> List[Tuple[Document, float]]:
+        """Top-k chunks of one or more role partitions by BM25 score (statistics over those partitions)."""
+        terms = set(tokenize(query))
+        if not terms or k <= 0:
+            return []
+        roles = [roles] if isinstance(roles, str) else list(roles)
+
+        term_placeholders = ",".join("?" for _ in terms)
+        role_placeholders = ",".join("?" for _ in roles)
+        with self._lock:
+            n_docs, avg_length = self._conn.execute(
+                f"SELECT COUNT(*), AVG(length) FROM chunks WHERE role IN ({role_placeholders})", roles
+            ).fetchone()
+            if not n_docs:
+                return []
+            postings = self._conn.execute(
+                f"SELECT p.term, p.chunk_id, p.tf, c.length FROM postings p "
+                f"JOIN chunks c ON c.chunk_id = p.chunk_id "
+                f"WHERE p.role IN ({role_placeholders}) AND p.term IN ({term_placeholders})",
+                (*roles, *terms)
+            ).fetchall()
+
+        doc_freq = Counter(term for term, _, _, _ in postings)
+        avg_length = avg_length or 1.0
+        scores = Counter()
+        for term, chunk_id, tf, length in postings:
+            idf = math.log(1 + (n_docs - doc_freq[term] + 0.5) / (doc_freq[term] + 0.5))
+            norm = tf + self.k1 * (1 - self.b + self.b * length / avg_length)
+            scores[chunk_id] += idf * tf * (self.k1 + 1) / norm
+
+        top = scores.most_common(k)
+        if not top:
+            return []
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT chunk_id, text, metadata FROM chunks WHERE chunk_id IN ({','.join('?' for _ in top)})",
+                [chunk_id for chunk_id, _ in top]
+            ).fetchall()
+        found = {chunk_id: (text, metadata) for chunk_id, text, metadata in rows}
+        return [
+            (Document(page_content=found[chunk_id][0], metadata=json.loads(found[chunk_id][1]), id=chunk_id), score)
+            for chunk_id, score in top if chunk_id in found
+        ]
+
+
+def reciprocal_rank_fusion(rankings: List[List[Document]], k: int, rrf_k: int = 60) -> List[Document]:
+    """
+    Merges several ranked lists by summing 1 / (rrf_k + rank) per document ID.
+    Only ranks are used, so BM25 and vector scores never need to be calibrated.
+    """
+    scores = Counter()
+    docs = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, start=1):
+            doc_id = getattr(doc, "id", None) or doc.metadata.get("chunk_id")
+            scores[doc_id] += 1.0 / (rrf_k + rank)
+            docs.setdefault(doc_id, doc)
+    return [docs[doc_id] for doc_id, _ in scores.most_common(k)]
+
+
+@lru_cache(maxsize=1)
+def get_lexical_index() -> LexicalIndex:
+    """Returns this process's lexical index connection."""
+    return LexicalIndex(LEXICAL_INDEX_PATH)
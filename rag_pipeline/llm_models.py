@@ -1,9 +1,23 @@
 # rag_pipeline/llm_models.py (Switching to Ollama)
 
 import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+import contextvars
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Any, AsyncIterator, Deque, Dict, Iterator, List, Optional, Sequence
 from dotenv import load_dotenv
 from langchain_community.llms import Ollama 
 from langchain_core.language_models import BaseLanguageModel
+from langchain_core.caches import BaseCache
+from langchain_core.outputs import Generation, GenerationChunk, LLMResult
+
+from rag_pipeline.ollama_pool import get_ollama_pool
 
 # Load environment variables
 load_dotenv()
@@ -12,22 +26,471 @@ load_dotenv()
 # Use the model name pulled with Ollama
 GENERATION_MODEL_NAME = os.getenv("GENERATION_MODEL_NAME", "llama3") 
 
+# Exact-prompt completion cache (persistent, shared by all workers on this box)
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "./cache/llm_cache.sqlite3")
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", "86400"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "10000"))
+
+# Admission control in front of Ollama (see LLMScheduler)
+LLM_MAX_CONCURRENT = int(os.getenv("LLM_MAX_CONCURRENT", "2"))
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "16"))
+LLM_QUEUE_TIMEOUT_SECONDS = float(os.getenv("LLM_QUEUE_TIMEOUT_SECONDS", "30"))
+
+
+# --- Persistent Completion Cache ---
+class SQLiteCompletionCache(BaseCache):
+    """
+    On-disk LangChain LLM cache backed by SQLite.
+    The key covers the full prompt plus LangChain's `llm_string`, which already
+    encodes the model name, the stop sequences and every sampling parameter.
+    Entries expire after `ttl_seconds` and the least recently used rows are
+    evicted once the table grows past `max_entries`.
+    """
+
+    def __init__(self, path: str, ttl_seconds: float, max_entries: int):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        # WAL lets several uvicorn workers read while one writes
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                generations TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_access ON llm_cache(last_access)")
+        self._conn.commit()
+
+    @staticmethod
+    def _make_key(prompt: str, llm_string: str) -> str:
+        return hashlib.sha256(f"{llm_string}\x00{prompt}".encode("utf-8")).hexdigest()
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Generation]]:
+        key = self._make_key(prompt, llm_string)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT generations, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or (self.ttl_seconds > 0 and now - row[1] > self.ttl_seconds):
+                if row is not None:
+                    self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                    self._conn.commit()
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+        return [Generation(**g) for g in json.loads(row[0])]
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Generation]) -> None:
+        key = self._make_key(prompt, llm_string)
+        now = time.time()
+        payload = json.dumps([{"text": g.text, "generation_info": g.generation_info} for g in return_val])
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, generations, created_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, payload, now, now)
+            )
+            # LRU eviction: keep only the `max_entries` most recently used rows
+            self._conn.execute(
+                "DELETE FROM llm_cache WHERE key IN ("
+                "SELECT key FROM llm_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+            self._conn.commit()
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for this process plus the current on-disk size."""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": entries,
+        }
+
+
+@lru_cache(maxsize=1)
+def get_completion_cache() -> Optional[SQLiteCompletionCache]:
+    """Returns the process-wide completion cache, or None when disabled."""
+    if not LLM_CACHE_ENABLED:
+        return None
+    print(f"[INFO] Using persistent LLM completion cache at {LLM_CACHE_PATH}")
+    return SQLiteCompletionCache(LLM_CACHE_PATH, LLM_CACHE_TTL_SECONDS, LLM_CACHE_MAX_ENTRIES)
+
+
+# --- Admission Control & Fair Queuing ---
+# Lower value = served first
+PRIORITY_FAST = 0        # Single-shot RAG and later steps of an agent run already underway
+PRIORITY_NORMAL = 1      # First generation of a new agent request
+PRIORITY_BACKGROUND = 2  # Memory summaries and other non-interactive work
+
+
+class LLMOverloadedError(RuntimeError):
+    """The generation queue is full (or the wait timed out); retry after `retry_after` seconds."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    __slots__ = ("granted",)
 
-def initialize_llm() -> BaseLanguageModel:
+    def __init__(self):
+        self.granted = False
+
+
+class LLMScheduler:
     """
-    Initializes and returns the Ollama LLM running locally.
+    Caps concurrent Ollama generations at `max_concurrent`. Callers beyond the
+    cap wait in a bounded queue served by priority, then round-robin across
+    users, so one user's burst cannot starve everyone else. New work is
+    rejected with LLMOverloadedError once `max_queue` callers are waiting.
+    Continuations of an admitted request are never rejected, so work that
+    already started can finish. Throughput then stays flat under overload
+    instead of every request timing out together.
+    """
+
+    def __init__(self, max_concurrent: int, max_queue: int, queue_timeout: float):
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._cond = threading.Condition()
+        self._active = 0
+        self._depth = 0
+        # priority -> user -> waiters (insertion order of users = round-robin order)
+        self._queues: Dict[int, "OrderedDict[str, Deque[_Waiter]]"] = {}
+        # Metrics
+        self.admitted = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.max_depth_seen = 0
+        self._waits_ms: Deque[float] = deque(maxlen=1000)
+        self._avg_generation_seconds = 5.0
+
+    def retry_after(self) -> int:
+        """Seconds until the queue has likely drained enough to admit new work."""
+        backlog = (self._depth + self._active) / self.max_concurrent
+        return max(1, int(backlog * self._avg_generation_seconds + 0.5))
+
+    def check_admission(self):
+        """Raises LLMOverloadedError right away if new work would be rejected."""
+        with self._cond:
+            if self._depth >= self.max_queue and self._active >= self.max_concurrent:
+                self.rejected += 1
+                raise LLMOverloadedError("LLM queue is full.", self.retry_after())
+
+    def acquire(self, user_id: str = "anonymous", priority: int = PRIORITY_NORMAL, admit: bool = True) -> float:
+        """Blocks until a generation slot is free. Returns the wait in seconds."""
+        started = time.monotonic()
+        with self._cond:
+            if self._active < self.max_concurrent and self._depth == 0:
+                self._active += 1
+                self._record_wait(0.0)
+                return 0.0
+            if admit and self._depth >= self.max_queue:
+                self.rejected += 1
+                raise LLMOverloadedError("LLM queue is full.", self.retry_after())
+
+            waiter = _Waiter()
+            self._queues.setdefault(priority, OrderedDict()).setdefault(user_id, deque()).append(waiter)
+            self._depth += 1
+            self.max_depth_seen = max(self.max_depth_seen, self._depth)
+            deadline = started + self.queue_timeout
+            while not waiter.granted:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._remove(priority, user_id, waiter)
+                    self.timeouts += 1
+                    raise LLMOverloadedError("Timed out waiting for the LLM.", self.retry_after())
+                self._cond.wait(remaining)
+            waited = time.monotonic() - started
+            self._record_wait(waited)
+            return waited
+
+    def release(self, generation_seconds: Optional[float] = None):
+        with self._cond:
+            self._active -= 1
+            if generation_seconds is not None:
+                # EWMA of generation time, used for Retry-After
+                self._avg_generation_seconds = 0.8 * self._avg_generation_seconds + 0.2 * generation_seconds
+            self._grant_next()
+
+    @contextmanager
+    def slot(self, user_id: str = "anonymous", priority: int = PRIORITY_NORMAL, admit: bool = True):
+        """Holds a generation slot for the block; yields the seconds spent waiting for it."""
+        waited = self.acquire(user_id, priority, admit)
+        started = time.monotonic()
+        try:
+            yield waited
+        finally:
+            self.release(time.monotonic() - started)
+
+    def _grant_next(self):
+        """Hands free slots to waiters: best priority first, round-robin across users. Caller holds the lock."""
+        granted = False
+        while self._active < self.max_concurrent and self._depth > 0:
+            priority = min(p for p, users in self._queues.items() if users)
+            users = self._queues[priority]
+            user_id, waiters = next(iter(users.items()))
+            waiter = waiters.popleft()
+            if waiters:
+                users.move_to_end(user_id)  # This user's next request waits for the others
+            else:
+                del users[user_id]
+            waiter.granted = True
+            self._active += 1
+            self._depth -= 1
+            granted = True
+        if granted:
+            self._cond.notify_all()
+
+    def _remove(self, priority: int, user_id: str, waiter: _Waiter):
+        users = self._queues.get(priority, {})
+        waiters = users.get(user_id)
+        if waiters and waiter in waiters:
+            waiters.remove(waiter)
+            self._depth -= 1
+            if not waiters:
+                del users[user_id]
+
+    def _record_wait(self, seconds: float):
+        self.admitted += 1
+        self._waits_ms.append(seconds * 1000)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            waits = sorted(self._waits_ms)
+            depth_by_priority = {p: sum(len(w) for w in users.values()) for p, users in self._queues.items()}
+
+        def pct(q):
+            return round(waits[min(len(waits) - 1, int(q / 100 * len(waits)))], 2) if waits else 0.0
+
+        return {
+            "active": self._active,
+            "max_concurrent": self.max_concurrent,
+            "queue_depth": self._depth,
+            "queue_depth_by_priority": depth_by_priority,
+            "max_queue": self.max_queue,
+            "max_queue_depth_seen": self.max_depth_seen,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "wait_ms_p50": pct(50),
+            "wait_ms_p95": pct(95),
+            "avg_generation_seconds": round(self._avg_generation_seconds, 3),
+        }
+
+
+@lru_cache(maxsize=1)
+def get_llm_scheduler() -> LLMScheduler:
+    """Process-wide scheduler (each uvicorn worker caps its own generations)."""
+    return LLMScheduler(LLM_MAX_CONCURRENT, LLM_MAX_QUEUE, LLM_QUEUE_TIMEOUT_SECONDS)
+
+
+class _LLMRequest:
+    """
+    Who is generating, whether an earlier generation of the same request already
+    ran, and how long the request has waited in the scheduler queue so far.
+    """
+
+    def __init__(self, user_id: str, priority: int):
+        self.user_id = user_id
+        self.priority = priority
+        self.generations = 0
+        self.queued_seconds = 0.0
+
+
+_current_request: contextvars.ContextVar[Optional[_LLMRequest]] = contextvars.ContextVar("llm_request", default=None)
+
+
+@contextmanager
+def llm_request_context(user_id: str, priority: int = PRIORITY_NORMAL):
+    """
+    Tags every generation made inside the block with the caller and its priority.
+    Yields the request, whose `queued_seconds` grows with every scheduler wait.
+    """
+    request = _LLMRequest(user_id, priority)
+    token = _current_request.set(request)
+    try:
+        yield request
+    finally:
+        try:
+            _current_request.reset(token)
+        except ValueError:
+            pass  # Async generators may finish in another context
+
+
+@contextmanager
+def _request_slot(scheduler: LLMScheduler, request: _LLMRequest, priority: int, admit: bool):
+    with scheduler.slot(request.user_id, priority, admit) as waited:
+        request.queued_seconds += waited
+        yield
+
+
+def _slot_for_current_request(scheduler: LLMScheduler):
+    request = _current_request.get()
+    if request is None:
+        return scheduler.slot()
+    if request.generations:
+        # A follow-up step of an admitted request: jump ahead, never reject
+        slot = _request_slot(scheduler, request, PRIORITY_FAST, admit=False)
+    else:
+        slot = _request_slot(scheduler, request, request.priority, admit=True)
+    request.generations += 1
+    return slot
+
+
+async def _enter_slot_async(slot):
+    """
+    Enters a scheduler slot from a worker thread, so waiting does not block the
+    event loop. The thread cannot be interrupted: if the caller is cancelled while
+    it waits (client disconnect), the slot is released as soon as it is granted.
+    """
+    import asyncio
+    acquire = asyncio.ensure_future(asyncio.to_thread(slot.__enter__))
+    try:
+        await asyncio.shield(acquire)
+    except asyncio.CancelledError:
+        def release_if_granted(future):
+            if not future.cancelled() and future.exception() is None:
+                slot.__exit__(None, None, None)
+        acquire.add_done_callback(release_if_granted)
+        raise
+
+
+# --- Multi-Backend Transport ---
+class PooledOllama(Ollama):
+    """
+    Ollama client that sends every request through the process-wide OllamaPool
+    (keep-alive connections, least-outstanding balancing, circuit breakers)
+    instead of a single fixed `base_url`.
+    """
+
+    def _request_payload(self, payload: Any, stop: Optional[List[str]], kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        # Same request body as Ollama._create_stream builds
+        if self.stop is not None and stop is not None:
+            raise ValueError("`stop` found in both the input and default params.")
+        stop = self.stop if self.stop is not None else stop
+        params = self._default_params
+        for key in self._default_params:
+            if key in kwargs:
+                params[key] = kwargs[key]
+        if "options" in kwargs:
+            params["options"] = kwargs["options"]
+        else:
+            params["options"] = {
+                **params["options"],
+                "stop": stop,
+                **{k: v for k, v in kwargs.items() if k not in self._default_params},
+            }
+        if payload.get("messages"):
+            return {"messages": payload.get("messages", []), **params}
+        return {"prompt": payload.get("prompt"), "images": payload.get("images") or [], **params}
+
+    def _create_stream(self, api_url: str, payload: Any, stop: Optional[List[str]] = None,
+                       **kwargs: Any) -> Iterator[str]:
+        from urllib.parse import urlparse
+        return get_ollama_pool().stream_lines(
+            urlparse(api_url).path,
+            self._request_payload(payload, stop, kwargs),
+            headers={"Content-Type": "application/json", **(self.headers if isinstance(self.headers, dict) else {})},
+            auth=self.auth,
+        )
+
+    async def _acreate_stream(self, api_url: str, payload: Any, stop: Optional[List[str]] = None,
+                              **kwargs: Any) -> AsyncIterator[str]:
+        import asyncio
+        # The pool is blocking (requests); read it from a worker thread
+        lines = await asyncio.to_thread(self._create_stream, api_url, payload, stop, **kwargs)
+        done = object()
+        try:
+            while True:
+                line = await asyncio.to_thread(next, lines, done)
+                if line is done:
+                    break
+                yield line
+        finally:
+            lines.close()
+
+
+class ScheduledOllama(PooledOllama):
+    """
+    Pooled Ollama client whose generations go through the process-wide LLMScheduler.
+    The overrides spell out `run_manager`: LangChain only passes callbacks
+    (token streaming, RunBudget) to a _generate that declares it.
+    """
+
+    def _generate(self, prompts: List[str], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> LLMResult:
+        with _slot_for_current_request(get_llm_scheduler()):
+            return super()._generate(prompts, stop=stop, run_manager=run_manager, **kwargs)
+
+    def _stream(self, prompt: str, stop: Optional[List[str]] = None,
+                run_manager: Any = None, **kwargs: Any) -> Iterator[GenerationChunk]:
+        with _slot_for_current_request(get_llm_scheduler()):
+            yield from super()._stream(prompt, stop=stop, run_manager=run_manager, **kwargs)
+
+    async def _agenerate(self, prompts: List[str], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs: Any) -> LLMResult:
+        slot = _slot_for_current_request(get_llm_scheduler())
+        await _enter_slot_async(slot)
+        try:
+            return await super()._agenerate(prompts, stop=stop, run_manager=run_manager, **kwargs)
+        finally:
+            slot.__exit__(None, None, None)
+
+    async def _astream(self, prompt: str, stop: Optional[List[str]] = None,
+                       run_manager: Any = None, **kwargs: Any) -> AsyncIterator[GenerationChunk]:
+        slot = _slot_for_current_request(get_llm_scheduler())
+        await _enter_slot_async(slot)
+        try:
+            async for chunk in super()._astream(prompt, stop=stop, run_manager=run_manager, **kwargs):
+                yield chunk
+        finally:
+            slot.__exit__(None, None, None)
+
+
+def initialize_llm(use_cache: bool = True, scheduled: bool = True) -> BaseLanguageModel:
+    """
+    Initializes and returns the Ollama LLM client.
+    Requests are balanced over the Ollama hosts in Settings.OLLAMA_BASE_URLS.
+    Building the client is cheap and does NOT contact the server;
+    use check_llm_health() to verify the connection is live.
+    With `use_cache`, identical prompts are answered from the completion cache.
+    With `scheduled`, generations are admitted through the LLMScheduler
+    (cache hits never take a slot).
     """
     print(f"[INFO] Attempting to connect to Ollama server for model: {GENERATION_MODEL_NAME}")
     try:
-        # Ollama class connects to your locally running Ollama server
-        # Ollama runs on port 11434 by default
-        llm = Ollama(
+        # The pool picks the Ollama host per request; base_url only labels the client
+        llm_class = ScheduledOllama if scheduled else PooledOllama
+        llm = llm_class(
             model=GENERATION_MODEL_NAME,
-            base_url="http://localhost:11434"
+            base_url=get_ollama_pool().endpoints[0].base_url,
+            cache=get_completion_cache() if use_cache else None
         )
-        # Quick check to ensure the connection is live
-        llm.invoke("Hi") 
-        
         print(f"[SUCCESS] Initialized LLM for generation via Ollama: {GENERATION_MODEL_NAME}")
         return llm
     except Exception as e:
@@ -36,12 +499,29 @@ def initialize_llm() -> BaseLanguageModel:
         raise
 
 
+def check_llm_health(llm: BaseLanguageModel) -> bool:
+    """
+    Sends a tiny probe generation to confirm the Ollama server is live.
+    Only for clients without an OllamaPool (the registry probes the pool's
+    endpoints instead) and manual checks, never per request.
+    Pass an uncached client, otherwise the probe is answered from the cache.
+    """
+    try:
+        llm.invoke("Hi")
+        return True
+    except Exception as e:
+        print(f"[ERROR] Ollama health check failed for model {GENERATION_MODEL_NAME}: {e}")
+        return False
+
+
 if __name__ == "__main__":
     # Test initialization by invoking the model
     print("--- Running Ollama LLM Initialization Test ---")
     
     try:
         llm = initialize_llm()
+        if not check_llm_health(initialize_llm(use_cache=False, scheduled=False)):
+            raise ConnectionError("Ollama server did not respond to the health probe.")
         
         # Simple test query
         test_query = "What is the capital of France?"
@@ -57,6 +537,10 @@ if __name__ == "__main__":
         else:
             print(f"Response: {response.strip()}")
             raise ValueError("Ollama responded, but the response was too short. Check model status.")
+
+        cache = get_completion_cache()
+        if cache:
+            print(f"Completion cache stats: {cache.stats()}")
             
     except Exception as e:
         print(f"\n[FATAL] LLM Test failed.")
\ No newline at end of file
@@ -0,0 +1,190 @@
+# rag_pipeline/numpy_vector_store.py
+
+import os
+import json
+import shutil
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from rag_pipeline.partitioned_store import roles_from_filter
+
+# Rows scored per step when the snapshot is float16 (keeps the float32 working copy small)
+_SCORE_BLOCK_ROWS = 16384
+# Older snapshot directories are kept briefly for workers still holding their mmaps
+_SNAPSHOTS_TO_KEEP = 2
+CURRENT_POINTER = "CURRENT"
+
+
+class _RolePartition:
+    """One role's memory-mapped, L2-normalized embedding matrix plus its chunk texts."""
+
+    def __init__(self, directory: str, role: str):
+        self.matrix = np.load(os.path.join(directory, f"{role}.npy"), mmap_mode="r")
+        with open(os.path.join(directory, f"{role}.json"), "r", encoding="utf-8") as f:
+            data = json.load(f)
+        self.ids: List[str] = data["ids"]
+        self.documents: List[str] = data["documents"]
+        self.metadatas: List[dict] = data["metadatas"]
+
+    def scores(self, query: np.ndarray) -> np.ndarray:
+        if self.matrix.dtype == np.float32:
+            return self.matrix @ query
+        # float16 has no BLAS path: upcast one block at a time
+        return np.concatenate([
+            self.matrix[start:start + _SCORE_BLOCK_ROWS].astype(np.float32) @ query
+            for start in range(0, len(self.matrix), _SCORE_BLOCK_ROWS)
+        ]) if len(self.matrix) else np.empty(0, dtype=np.float32)
+
+    def top_k(self, query: np.ndarray, k: int):
+        """(row, score) pairs of the k best rows, best first."""
+        if k <= 0 or len(self.ids) == 0:
+            return []
+        scores = self.scores(query)
+        k = min(k, len(scores))
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+        return [(int(row), float(scores[row])) for row in best]
+
+
+class NumpyVectorStore:
+    """
+    Brute-force vector store over per-role snapshots exported from Chroma.
+    Matrices are memory-mapped read-only, so every uvicorn worker shares the
+    same page-cached vectors. Top-k is one matrix-vector product plus
+    argpartition, which beats HNSW + SQLite for a corpus of this size.
+
+    Implements the subset of the Chroma store API the retrievers use:
+    similarity_search(query, k, filter={"role": ...}) and get(ids=...).
+    """
+
+    def __init__(self, embeddings: Embeddings, snapshot_root: str):
+        self.embeddings = embeddings
+        self.snapshot_root = snapshot_root
+        self._version: Optional[str] = None
+        # (role -> partition, chunk ID -> (role, row)), replaced as one object so
+        # a reader never mixes two snapshots
+        self._snapshot: Tuple[Dict[str, _RolePartition], Dict[str, tuple]] = ({}, {})
+        self._lock = threading.Lock()
+
+    # --- Snapshot Loading ---
+    def _refresh(self):
+        """Switches to a newer snapshot when ingestion has exported one."""
+        version = snapshot_version(self.snapshot_root)
+        if version == self._version:
+            return
+        with self._lock:
+            if version == self._version:
+                return
+            if version is None:
+                print(f"[WARN] No NumPy vector snapshot in {self.snapshot_root}. Run the ingestion script.")
+                partitions = {}
+            else:
+                directory = os.path.join(self.snapshot_root, version)
+                with open(os.path.join(directory, "snapshot.json"), "r", encoding="utf-8") as f:
+                    roles = json.load(f)["roles"]
+                partitions = {role: _RolePartition(directory, role) for role in roles}
+            id_index = {
+                chunk_id: (role, row)
+                for role, partition in partitions.items()
+                for row, chunk_id in enumerate(partition.ids)
+            }
+            self._snapshot = (partitions, id_index)
+            self._version = version
+
+    # --- Store API ---
+    def similarity_search(self, query: str, k: int = 4, filter: Optional[Dict[str, Any]] = None) -> List[Document]:
+        self._refresh()
+        # Rows are only meaningful in the snapshot they came from (ingestion may swap it meanwhile)
+        partitions, _ = self._snapshot
+        roles = roles_from_filter(filter)
+        if roles:
+            partitions = {role: partitions[role] for role in roles if role in partitions}
+
+        vector = np.asarray(self.embeddings.embed_query(query), dtype=np.float32)
+        vector = vector / (np.linalg.norm(vector) or 1.0)
+
+        hits = []
+        for role, partition in partitions.items():
+            hits.extend((score, role, row) for row, score in partition.top_k(vector, k))
+        hits.sort(key=lambda hit: hit[0], reverse=True)
+        return [self._document(partitions[role], row) for _, role, row in hits[:k]]
+
+    def get(self, ids: Optional[List[str]] = None, include: Optional[List[str]] = None) -> Dict[str, list]:
+        self._refresh()
+        partitions, id_index = self._snapshot
+        if ids is None:
+            ids = list(id_index)
+        located = [(chunk_id, id_index[chunk_id]) for chunk_id in ids if chunk_id in id_index]
+        return {
+            "ids": [chunk_id for chunk_id, _ in located],
+            "documents": [partitions[role].documents[row] for _, (role, row) in located],
+            "metadatas": [partitions[role].metadatas[row] for _, (role, row) in located],
+        }
+
+    @staticmethod
+    def _document(partition: _RolePartition, row: int) -> Document:
+        return Document(page_content=partition.documents[row], metadata=partition.metadatas[row],
+                        id=partition.ids[row])
+
+
+def export_snapshot(chroma_store, snapshot_root: str, version: str, dtype: str = "float32") -> str:
+    """
+    Writes the Chroma collection as per-role matrices into `snapshot_root/<version>/`
+    and then atomically points CURRENT at it. Readers never see a half-written snapshot.
+    """
+    directory = os.path.join(snapshot_root, version)
+    os.makedirs(directory, exist_ok=True)
+
+    result = chroma_store.get(include=["embeddings", "documents", "metadatas"])
+    by_role: Dict[str, list] = {}
+    for chunk_id, vector, text, meta in zip(result["ids"], result["embeddings"], result["documents"], result["metadatas"]):
+        meta = meta or {}
+        by_role.setdefault(meta.get("role", "General_Employee"), []).append((chunk_id, vector, text, meta))
+
+    for role, rows in by_role.items():
+        matrix = np.asarray([vector for _, vector, _, _ in rows], dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix = (matrix / np.where(norms == 0, 1.0, norms)).astype(dtype)
+        with open(os.path.join(directory, f"{role}.npy"), "wb") as f:
+            np.save(f, matrix)
+        with open(os.path.join(directory, f"{role}.json"), "w", encoding="utf-8") as f:
+            json.dump({
+                "ids": [chunk_id for chunk_id, _, _, _ in rows],
+                "documents": [text for _, _, text, _ in rows],
+                "metadatas": [meta for _, _, _, meta in rows],
+            }, f)
+    with open(os.path.join(directory, "snapshot.json"), "w", encoding="utf-8") as f:
+        json.dump({"version": version, "dtype": dtype, "roles": sorted(by_role),
+                   "rows": {role: len(rows) for role, rows in by_role.items()}}, f, indent=1)
+
+    pointer_tmp = os.path.join(snapshot_root, f"{CURRENT_POINTER}.tmp")
+    with open(pointer_tmp, "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(pointer_tmp, os.path.join(snapshot_root, CURRENT_POINTER))
+
+    _prune_snapshots(snapshot_root, keep=version)
+    print(f"[INFO] Exported NumPy vector snapshot {version} ({len(result['ids'])} chunks, {dtype}).")
+    return directory
+
+
+def snapshot_version(snapshot_root: str) -> Optional[str]:
+    """Version of the snapshot CURRENT points at (None if there is none)."""
+    try:
+        with open(os.path.join(snapshot_root, CURRENT_POINTER), "r", encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def _prune_snapshots(snapshot_root: str, keep: str):
+    snapshots = sorted(
+        (entry for entry in os.scandir(snapshot_root) if entry.is_dir()),
+        key=lambda entry: entry.stat().st_mtime, reverse=True
+    )
+    for entry in snapshots[_SNAPSHOTS_TO_KEEP:]:
+        if entry.name != keep:
+            shutil.rmtree(entry.path, ignore_errors=True)
@@ -0,0 +1,235 @@
+# rag_pipeline/ollama_pool.py
+
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Circuit states
+CLOSED = "closed"        # Healthy, takes traffic
+OPEN = "open"            # Failing, skipped until the reset timeout or a good health probe
+HALF_OPEN = "half_open"  # Reset timeout passed, one trial request decides
+
+
+class NoHealthyBackendError(ConnectionError):
+    """Every Ollama endpoint is failing (all circuits open)."""
+
+
+class OllamaEndpoint:
+    """One Ollama host: its keep-alive session, load and circuit breaker."""
+
+    def __init__(self, base_url: str, failure_threshold: int, reset_seconds: float, pool_maxsize: int):
+        self.base_url = base_url.rstrip("/")
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+        # Keep-alive connections, reused across requests
+        self.session = requests.Session()
+        self.session.mount(self.base_url, HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize))
+        self.state = CLOSED
+        self.outstanding = 0
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.requests = 0
+        self.failures = 0
+
+    def available(self, now: float) -> bool:
+        """True if the endpoint may take a request now. Caller holds the pool lock."""
+        if self.state == OPEN and now - self.opened_at >= self.reset_seconds:
+            self.state = HALF_OPEN
+        if self.state == HALF_OPEN:
+            return self.outstanding == 0  # A single trial request at a time
+        return self.state == CLOSED
+
+    def record_success(self):
+        if self.state != CLOSED:
+            print(f"[HEALTH] Ollama endpoint {self.base_url} recovered.")
+        self.state = CLOSED
+        self.consecutive_failures = 0
+
+    def record_failure(self, now: float):
+        self.failures += 1
+        self.consecutive_failures += 1
+        if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != OPEN:
+                print(f"[WARN] Opening circuit for Ollama endpoint {self.base_url}.")
+            self.state = OPEN
+            self.opened_at = now
+
+
+class _StreamedLines:
+    """Line iterator over a streaming response; frees the endpoint when done, failed or closed."""
+
+    def __init__(self, pool: "OllamaPool", endpoint: OllamaEndpoint, response: requests.Response):
+        self._pool = pool
+        self._endpoint = endpoint
+        self._response = response
+        self._lines = response.iter_lines(decode_unicode=True)
+        self._finished = False
+        # close() (event loop, __del__) can race the reader thread hitting EOF or an error
+        self._finish_lock = threading.Lock()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        try:
+            return next(self._lines)
+        except StopIteration:
+            self._finish(failed=False)
+            raise
+        except requests.RequestException:
+            self._finish(failed=True)  # Hung or dropped mid-stream
+            raise
+
+    def close(self):
+        """Stops reading early (the connection is dropped, the endpoint is not blamed)."""
+        self._finish(failed=False)
+
+    def _finish(self, failed: bool):
+        with self._finish_lock:
+            if self._finished:
+                return
+            self._finished = True  # The endpoint is released exactly once
+        self._response.close()
+        self._pool._release(self._endpoint, failed)
+
+    def __del__(self):
+        self.close()
+
+
+class OllamaPool:
+    """
+    Client-side load balancer over several Ollama hosts. Each request goes to
+    the available endpoint with the fewest outstanding requests. Connection
+    errors, timeouts and 5xx responses count against an endpoint; after
+    `failure_threshold` in a row its circuit opens and it is skipped (fail
+    fast) until `reset_seconds` pass or a health probe succeeds. A request
+    that fails before any response arrives is retried on another endpoint.
+    """
+
+    def __init__(self, base_urls: List[str], failure_threshold: int = 3, reset_seconds: float = 30.0,
+                 connect_timeout: float = 2.0, read_timeout: float = 120.0, probe_timeout: float = 2.0,
+                 pool_maxsize: int = 8):
+        if not base_urls:
+            raise ValueError("OllamaPool needs at least one endpoint.")
+        self.endpoints = [OllamaEndpoint(url, failure_threshold, reset_seconds, pool_maxsize) for url in base_urls]
+        self.timeout = (connect_timeout, read_timeout)
+        self.probe_timeout = probe_timeout
+        self._lock = threading.Lock()
+        self._next = 0  # Rotates the tie-break between equally loaded endpoints
+
+    def _acquire(self, exclude: List[OllamaEndpoint]) -> OllamaEndpoint:
+        with self._lock:
+            now = time.monotonic()
+            candidates = [e for e in self.endpoints if e not in exclude and e.available(now)]
+            if not candidates:
+                raise NoHealthyBackendError("No healthy Ollama endpoint available.")
+            start = self._next % len(self.endpoints)
+            self._next += 1
+            order = {id(e): (i - start) % len(self.endpoints) for i, e in enumerate(self.endpoints)}
+            endpoint = min(candidates, key=lambda e: (e.outstanding, order[id(e)]))
+            endpoint.outstanding += 1
+            endpoint.requests += 1
+            return endpoint
+
+    def _release(self, endpoint: OllamaEndpoint, failed: bool):
+        with self._lock:
+            endpoint.outstanding -= 1
+            if failed:
+                endpoint.record_failure(time.monotonic())
+
+    def stream_lines(self, path: str, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None,
+                     auth: Any = None) -> Iterator[str]:
+        """
+        POSTs `payload` to `path` on the chosen endpoint and returns an iterator
+        over the streamed response lines. The request is sent before returning,
+        so connection errors surface here (and fail over) rather than mid-iteration.
+        """
+        tried: List[OllamaEndpoint] = []
+        last_error: Optional[Exception] = None
+        while len(tried) < len(self.endpoints):
+            try:
+                endpoint = self._acquire(tried)
+            except NoHealthyBackendError:
+                if last_error is not None:
+                    raise NoHealthyBackendError(f"All Ollama endpoints failed: {last_error}") from last_error
+                raise
+            tried.append(endpoint)
+            try:
+                response = endpoint.session.post(
+                    endpoint.base_url + path, json=payload, headers=headers, auth=auth,
+                    stream=True, timeout=self.timeout
+                )
+            except requests.RequestException as e:
+                print(f"[WARN] Ollama endpoint {endpoint.base_url} failed: {e}")
+                self._release(endpoint, failed=True)
+                last_error = e
+                continue
+
+            if response.status_code >= 500:
+                detail = response.text
+                response.close()
+                print(f"[WARN] Ollama endpoint {endpoint.base_url} returned {response.status_code}.")
+                self._release(endpoint, failed=True)
+                last_error = ValueError(f"Ollama call failed with status code {response.status_code}. Details: {detail}")
+                continue
+
+            with self._lock:
+                endpoint.record_success()
+            if response.status_code != 200:
+                detail = response.text
+                response.close()
+                self._release(endpoint, failed=False)
+                raise ValueError(f"Ollama call failed with status code {response.status_code}. Details: {detail}")
+            response.encoding = "utf-8"
+            return _StreamedLines(self, endpoint, response)
+        raise NoHealthyBackendError(f"All Ollama endpoints failed: {last_error}")
+
+    def probe(self, endpoint: OllamaEndpoint) -> bool:
+        """Cheap liveness check (lists local models, loads nothing) that also drives the breaker."""
+        try:
+            response = endpoint.session.get(endpoint.base_url + "/api/tags", timeout=self.probe_timeout)
+            healthy = response.status_code == 200
+            response.close()
+        except requests.RequestException:
+            healthy = False
+        with self._lock:
+            if healthy:
+                endpoint.record_success()
+            elif endpoint.state != OPEN:
+                # A failed probe opens the circuit right away: stop routing to a hung host
+                endpoint.consecutive_failures = endpoint.failure_threshold - 1
+                endpoint.record_failure(time.monotonic())
+        return healthy
+
+    def probe_all(self) -> bool:
+        """Probes every endpoint; True if at least one is healthy."""
+        results = [self.probe(endpoint) for endpoint in self.endpoints]
+        return any(results)
+
+    def stats(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [{
+                "base_url": e.base_url,
+                "state": e.state,
+                "outstanding": e.outstanding,
+                "requests": e.requests,
+                "failures": e.failures,
+            } for e in self.endpoints]
+
+
+@lru_cache(maxsize=1)
+def get_ollama_pool() -> OllamaPool:
+    """Process-wide pool over the endpoints in Settings.OLLAMA_BASE_URLS."""
+    from app.core.config import settings
+    return OllamaPool(
+        [url.strip() for url in settings.OLLAMA_BASE_URLS.split(",") if url.strip()],
+        failure_threshold=settings.OLLAMA_CIRCUIT_FAILURE_THRESHOLD,
+        reset_seconds=settings.OLLAMA_CIRCUIT_RESET_SECONDS,
+        connect_timeout=settings.OLLAMA_CONNECT_TIMEOUT_SECONDS,
+        read_timeout=settings.OLLAMA_READ_TIMEOUT_SECONDS,
+        pool_maxsize=settings.OLLAMA_CONNECTIONS_PER_HOST,
+    )
@@ -0,0 +1,118 @@
+# rag_pipeline/page_cache.py
+
+import os
+import json
+import zlib
+import sqlite3
+import threading
+from functools import lru_cache
+from importlib.metadata import version, PackageNotFoundError
+from typing import List, Optional
+
+from langchain_core.documents import Document
+
+# --- Configuration ---
+PAGE_CACHE_ENABLED = os.getenv("PAGE_CACHE_ENABLED", "true").lower() == "true"
+PAGE_CACHE_PATH = os.getenv("PAGE_CACHE_PATH", "./cache/page_cache.sqlite3")
+
+
+def _loader_version() -> str:
+    """Parsed text depends on the PDF library, so its version is part of the cache key."""
+    try:
+        return f"PyPDFLoader/pypdf-{version('pypdf')}"
+    except PackageNotFoundError:
+        return "PyPDFLoader/pypdf-unknown"
+
+LOADER_VERSION = _loader_version()
+
+
+class PageTextCache:
+    """
+    Persistent store of parsed PDF pages, keyed by (file hash, loader version).
+    Page text is kept as zlib-compressed blobs in SQLite, so re-chunking
+    experiments read pages back in milliseconds instead of re-parsing PDFs.
+    """
+
+    def __init__(self, path: str, loader_version: str = LOADER_VERSION):
+        self.path = path
+        self.loader_version = loader_version
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Ingestion workers are separate processes; WAL + a busy timeout lets them share the file
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """CREATE TABLE IF NOT EXISTS parsed_files (
+                file_hash TEXT NOT NULL,
+                loader_version TEXT NOT NULL,
+                page_count INTEGER NOT NULL,
+                PRIMARY KEY (file_hash, loader_version)
+            );
+            CREATE TABLE IF NOT EXISTS parsed_pages (
+                file_hash TEXT NOT NULL,
+                loader_version TEXT NOT NULL,
+                page_index INTEGER NOT NULL,
+                text BLOB NOT NULL,
+                metadata TEXT NOT NULL,
+                PRIMARY KEY (file_hash, loader_version, page_index)
+            );"""
+        )
+        self._conn.commit()
+
+    def get_pages(self, file_hash: str, file_path: str) -> Optional[List[Document]]:
+        """Returns the cached pages of a file, or None on a miss."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT page_count FROM parsed_files WHERE file_hash = ? AND loader_version = ?",
+                (file_hash, self.loader_version)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            rows = self._conn.execute(
+                "SELECT text, metadata FROM parsed_pages WHERE file_hash = ? AND loader_version = ? "
+                "ORDER BY page_index",
+                (file_hash, self.loader_version)
+            ).fetchall()
+            self.hits += 1
+
+        pages = []
+        for text, metadata in rows:
+            meta = json.loads(metadata)
+            # The same content may now live at a different path
+            meta["source"] = file_path
+            pages.append(Document(page_content=zlib.decompress(text).decode("utf-8"), metadata=meta))
+        return pages
+
+    def put_pages(self, file_hash: str, pages: List[Document]):
+        rows = [
+            (file_hash, self.loader_version, i,
+             zlib.compress(page.page_content.encode("utf-8")),
+             json.dumps(page.metadata, default=str))
+            for i, page in enumerate(pages)
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO parsed_pages (file_hash, loader_version, page_index, text, metadata) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+            # Written last: a file only counts as cached once all its pages are stored
+            self._conn.execute(
+                "INSERT OR REPLACE INTO parsed_files (file_hash, loader_version, page_count) VALUES (?, ?, ?)",
+                (file_hash, self.loader_version, len(pages))
+            )
+            self._conn.commit()
+
+
+@lru_cache(maxsize=1)
+def get_page_cache() -> Optional[PageTextCache]:
+    """Returns this process's page cache connection, or None when disabled."""
+    if not PAGE_CACHE_ENABLED:
+        return None
+    return PageTextCache(PAGE_CACHE_PATH)
@@ -0,0 +1,143 @@
+# rag_pipeline/partitioned_store.py
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import chromadb
+from langchain_chroma import Chroma
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+# --- Configuration ---
+# Threads used to search several role partitions at once
+PARTITION_SEARCH_WORKERS = int(os.getenv("PARTITION_SEARCH_WORKERS", "4"))
+_search_pool = ThreadPoolExecutor(max_workers=PARTITION_SEARCH_WORKERS, thread_name_prefix="partition-search")
+
+
+# --- Role Filters ---
+def role_filter(roles: List[str]) -> Dict[str, Any]:
+    """Chroma `where` filter matching any of the given roles."""
+    if len(roles) == 1:
+        return {"role": roles[0]}
+    return {"role": {"$in": list(roles)}}
+
+
+def roles_from_filter(filter: Optional[Dict[str, Any]]) -> List[str]:
+    """Inverse of role_filter(); an empty list means no role restriction."""
+    if not filter or "role" not in filter:
+        return []
+    value = filter["role"]
+    if isinstance(value, dict):
+        return list(value.get("$in", []))
+    return [value]
+
+
+class PartitionedChromaStore:
+    """
+    One Chroma collection per RBAC role ("<base>__<role>") instead of one
+    shared collection with a metadata filter. A search only walks the HNSW
+    graphs of the partitions the caller may see, so one large department no
+    longer slows down (or crowds out) everyone else's results.
+
+    Speaks the subset of the Chroma store API used by retrieval and ingestion.
+    """
+
+    def __init__(self, embeddings: Embeddings, persist_dir: str, base_name: str,
+                 collection_metadata: Optional[dict] = None):
+        self.embeddings = embeddings
+        self.base_name = base_name
+        # HNSW parameters used when a partition is created
+        self.collection_metadata = collection_metadata
+        self._client = chromadb.PersistentClient(path=persist_dir)
+        self._partitions: Dict[str, Chroma] = {}
+        self._lock = threading.Lock()
+
+    def collection_name(self, role: str) -> str:
+        return f"{self.base_name}__{role}"
+
+    def partition(self, role: str) -> Chroma:
+        """
+        The (lazily opened) collection of one role. Opening creates the collection,
+        so read paths only call this for roles listed by roles().
+        """
+        store = self._partitions.get(role)
+        if store is None:
+            with self._lock:
+                store = self._partitions.get(role)
+                if store is None:
+                    store = Chroma(client=self._client, collection_name=self.collection_name(role),
+                                   embedding_function=self.embeddings,
+                                   collection_metadata=self.collection_metadata)
+                    self._partitions[role] = store
+        return store
+
+    def roles(self) -> List[str]:
+        """Roles that have a partition on disk."""
+        prefix = f"{self.base_name}__"
+        names = [getattr(c, "name", c) for c in self._client.list_collections()]
+        return sorted(name[len(prefix):] for name in names if name.startswith(prefix))
+
+    # --- Retrieval ---
+    def _search_partition(self, role: str, vector: List[float], k: int):
+        return self.partition(role).similarity_search_by_vector_with_relevance_scores(vector, k=k)
+
+    def similarity_search(self, query: str, k: int = 4, filter: Optional[Dict[str, Any]] = None) -> List[Document]:
+        """
+        Embeds the query once, searches each allowed partition (in parallel when
+        there are several) and merges the hits by distance. Roles without a
+        partition have nothing to find; searching never creates one.
+        """
+        existing = self.roles()
+        requested = roles_from_filter(filter)
+        roles = [role for role in requested if role in existing] if requested else existing
+        if not roles:
+            return []
+        vector = self.embeddings.embed_query(query)
+        if len(roles) == 1:
+            results = [self._search_partition(roles[0], vector, k)]
+        else:
+            results = list(_search_pool.map(lambda role: self._search_partition(role, vector, k), roles))
+        # All partitions share one embedding space, so distances are comparable
+        hits = sorted((hit for partition_hits in results for hit in partition_hits), key=lambda hit: hit[1])
+        return [doc for doc, _ in hits[:k]]
+
+    def get(self, ids: Optional[List[str]] = None, include: Optional[List[str]] = None) -> Dict[str, list]:
+        include = ["documents", "metadatas"] if include is None else include
+        merged: Dict[str, list] = {"ids": [], **{key: [] for key in include}}
+        for role in self.roles():
+            result = self.partition(role).get(ids=ids, include=include)
+            for key in merged:
+                values = result.get(key)
+                if values is not None:
+                    merged[key].extend(values)
+        return merged
+
+    # --- Ingestion ---
+    def upsert(self, ids: List[str], embeddings: List[List[float]], documents: List[str], metadatas: List[dict]):
+        """Writes each chunk into the partition of its metadata role."""
+        by_role: Dict[str, List[int]] = {}
+        for i, meta in enumerate(metadatas):
+            by_role.setdefault(meta.get("role", "General_Employee"), []).append(i)
+        for role, rows in by_role.items():
+            self.partition(role)._collection.upsert(
+                ids=[ids[i] for i in rows],
+                embeddings=[embeddings[i] for i in rows],
+                documents=[documents[i] for i in rows],
+                metadatas=[metadatas[i] for i in rows]
+            )
+
+    def delete(self, ids: List[str]):
+        # Deleting IDs a partition does not hold is a no-op
+        for role in self.roles():
+            self.partition(role).delete(ids=ids)
+
+    def count(self) -> int:
+        return sum(self.partition(role)._collection.count() for role in self.roles())
+
+    def drop(self):
+        """Deletes every partition collection."""
+        for role in self.roles():
+            self._client.delete_collection(self.collection_name(role))
+        self._partitions.clear()
@@ -1,15 +1,23 @@
 # rag_pipeline/retrieval_chain.py
 
-from typing import List, Dict, Any
+import os
+from typing import List, Dict, Any, Optional
 from langchain_core.runnables import RunnablePassthrough
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
 
 # Import components
-from rag_pipeline.embedding_models import initialize_embedding_model
-from rag_pipeline.chroma_db_manager import get_vector_store
-from rag_pipeline.llm_models import initialize_llm 
-from app.services.memory_service import load_message_history 
+from rag_pipeline.embedding_models import initialize_embedding_model, normalize_query_text
+from rag_pipeline.chroma_db_manager import get_vector_store, get_kb_version
+from rag_pipeline.ttl_cache import TTLCache
+from rag_pipeline.lexical_index import get_lexical_index, reciprocal_rank_fusion
+from rag_pipeline.partitioned_store import role_filter
+from rag_pipeline.utils import get_accessible_roles
+from rag_pipeline.context_packer import pack_context, CONTEXT_PACKING_ENABLED
+from app.services.memory_service import load_conversation_memory
 
 # --- UPDATED & POLISHED SYSTEM PROMPT ---
 RAG_PROMPT_TEMPLATE = """
@@ -40,43 +48,126 @@ INSTRUCTIONS:
 Answer:
 """
 
-# --- Secure Retriever Setup (Unchanged) ---
-def create_retriever(user_role: str):
-    embeddings = initialize_embedding_model()
-    vector_store = get_vector_store(embeddings)
-    
-    rbac_filter = {"role": user_role}
-    
-    retriever = vector_store.as_retriever(
-        search_kwargs={
-            "k": 5,
-            "filter": rbac_filter
+# --- Retrieval Result Cache ---
+# (kb_version, role, normalized query, k) -> chunk IDs. Set the size to 0 to disable.
+RETRIEVAL_CACHE_SIZE = int(os.getenv("RETRIEVAL_CACHE_SIZE", "2048"))
+RETRIEVAL_CACHE_TTL_SECONDS = float(os.getenv("RETRIEVAL_CACHE_TTL_SECONDS", "600"))
+retrieval_cache = TTLCache(RETRIEVAL_CACHE_SIZE, RETRIEVAL_CACHE_TTL_SECONDS)
+
+# --- Hybrid (BM25 + vector) Search ---
+HYBRID_SEARCH_ENABLED = os.getenv("HYBRID_SEARCH_ENABLED", "true").lower() == "true"
+# Candidates taken from each ranking before fusion
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "20"))
+RRF_K = int(os.getenv("RRF_K", "60"))
+
+class CachedRoleRetriever(BaseRetriever):
+    """
+    Role-filtered similarity search that remembers which chunk IDs a query returned.
+    On a cache hit the chunks are fetched by ID, skipping embedding and the HNSW search.
+    The knowledge-base version is part of the key, so re-ingestion invalidates entries.
+    With a `lexical_index`, vector and BM25 candidates are merged by reciprocal-rank fusion.
+    Searches every role partition the user may read (see get_accessible_roles).
+    """
+    vector_store: Any
+    user_role: str
+    k: int = 5
+    lexical_index: Any = None
+    candidates: int = HYBRID_CANDIDATES
+
+    def _search(self, query: str) -> List[Document]:
+        roles = get_accessible_roles(self.user_role)
+        if self.lexical_index is None:
+            return self.vector_store.similarity_search(query, k=self.k, filter=role_filter(roles))
+
+        fetch_k = max(self.k, self.candidates)
+        vector_docs = self.vector_store.similarity_search(query, k=fetch_k, filter=role_filter(roles))
+        lexical_docs = [doc for doc, _ in self.lexical_index.search(query, roles, fetch_k)]
+        return reciprocal_rank_fusion([vector_docs, lexical_docs], k=self.k, rrf_k=RRF_K)
+
+    def _fetch_by_ids(self, ids: List[str]) -> Optional[List[Document]]:
+        result = self.vector_store.get(ids=ids, include=["documents", "metadatas"])
+        found = {
+            doc_id: Document(page_content=text, metadata=meta or {}, id=doc_id)
+            for doc_id, text, meta in zip(result["ids"], result["documents"], result["metadatas"])
         }
-    )
+        if len(found) != len(ids):
+            return None  # A chunk disappeared; fall back to a real search
+        # Chroma does not preserve request order, restore the ranking
+        return [found[doc_id] for doc_id in ids]
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        key = (get_kb_version(), self.user_role, normalize_query_text(query), self.k)
+        cached_ids = retrieval_cache.get(key)
+        if cached_ids is not None:
+            docs = self._fetch_by_ids(cached_ids)
+            if docs is not None:
+                return docs
+
+        docs = self._search(query)
+        ids = [getattr(d, "id", None) for d in docs]
+        if all(ids):
+            retrieval_cache.put(key, ids)
+        return docs
+
+# --- Secure Retriever Setup ---
+def create_retriever(user_role: str, vector_store=None, k: int = 5):
+    """
+    Builds a role-filtered (cached, hybrid when enabled) retriever.
+    Pass a shared `vector_store` to avoid opening a new Chroma client.
+    """
+    if vector_store is None:
+        embeddings = initialize_embedding_model()
+        vector_store = get_vector_store(embeddings)
+
+    lexical_index = get_lexical_index() if HYBRID_SEARCH_ENABLED else None
+    retriever = CachedRoleRetriever(vector_store=vector_store, user_role=user_role, k=k,
+                                    lexical_index=lexical_index)
     return retriever
 
-# --- Full Retrieval Chain Construction (Unchanged) ---
-def create_rag_chain(user_id: str, session_id: str, user_role: str):
-    llm = initialize_llm()
+# --- Single-Shot RAG Chain ---
+def create_rag_chain(user_id: str, session_id: str, user_role: str, chat_history: Optional[str] = None):
+    """
+    Fixed retrieve -> pack -> generate pipeline: exactly ONE LLM call per question.
+    Reuses the shared LLM and the cached per-role retriever from the component registry.
+    Pass `chat_history` when the caller already loaded the session memory.
+    Invoke with {"question": ...}; the output is the answer string.
+    """
+    # Imported lazily: the registry itself imports this module
+    from rag_pipeline.component_registry import get_component_registry
+
+    registry = get_component_registry()
+    if registry.llm_healthy is False:
+        raise RuntimeError("LLM backend failed its last health check.")
+    llm = registry.llm
+    retriever = registry.get_retriever(user_role)
     prompt = ChatPromptTemplate.from_template(RAG_PROMPT_TEMPLATE)
-    retriever = create_retriever(user_role)
-    
-    # Mock session for memory loading
-    from app.database.database import get_session
-    db_session_gen = get_session()
-    db_session = next(db_session_gen)
-    
-    chat_history_list = load_message_history(db_session, session_id=session_id)
-    chat_history_str = "\n".join([f"{msg['role']}: {msg['content']}" for msg in chat_history_list])
-    
+
+    if chat_history is None:
+        # Mock session for memory loading
+        from app.database.database import get_session
+        db_session_gen = get_session()
+        db_session = next(db_session_gen)
+
+        # Rolling summary + recent turns, capped by MEMORY_TOKEN_BUDGET
+        chat_history = load_conversation_memory(db_session, session_id=session_id)
+
+    def build_context(inputs: Dict[str, Any]) -> str:
+        question = inputs["question"]
+        docs = retriever.invoke(question)
+        if not docs:
+            return "No relevant documents found."
+        if not CONTEXT_PACKING_ENABLED:
+            return "\n\n".join(d.page_content for d in docs)
+        return pack_context(question, docs, registry.embeddings)
+
     rag_chain = (
         RunnablePassthrough.assign(
-            context=(lambda x: x['question']) | retriever,
-            chat_history=lambda x: chat_history_str 
+            context=build_context,
+            chat_history=lambda x: chat_history or "(new conversation)"
         )
         | prompt
         | llm
         | StrOutputParser()
     )
     
-    return rag_chain
\ No newline at end of file
+    return rag_chain
@@ -0,0 +1,87 @@
+# rag_pipeline/retrieval_prefetch.py
+
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Optional
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from rag_pipeline.embedding_models import normalize_query_text
+
+# --- Configuration ---
+RETRIEVAL_PREFETCH_ENABLED = os.getenv("RETRIEVAL_PREFETCH_ENABLED", "true").lower() == "true"
+# Minimum cosine between the agent's Action Input and the raw question to reuse the prefetch
+RETRIEVAL_PREFETCH_SIMILARITY = float(os.getenv("RETRIEVAL_PREFETCH_SIMILARITY", "0.85"))
+# How long the tool waits for a prefetch that is still running
+RETRIEVAL_PREFETCH_WAIT_SECONDS = float(os.getenv("RETRIEVAL_PREFETCH_WAIT_SECONDS", "10"))
+_prefetch_pool = ThreadPoolExecutor(
+    max_workers=int(os.getenv("RETRIEVAL_PREFETCH_WORKERS", "4")), thread_name_prefix="retrieval-prefetch"
+)
+
+
+class RetrievalPrefetch:
+    """
+    Speculative retrieval for one agent run. Retrieval on the user's raw
+    question starts immediately, in parallel with the first ReAct generation.
+    When the agent then searches for something close enough to that question,
+    the knowledge tool takes the prefetched hits instead of searching again.
+    """
+
+    def __init__(self, question: str, retriever, embeddings: Embeddings,
+                 threshold: float = RETRIEVAL_PREFETCH_SIMILARITY,
+                 wait_seconds: float = RETRIEVAL_PREFETCH_WAIT_SECONDS):
+        self.question = question
+        self.retriever = retriever
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.wait_seconds = wait_seconds
+        self.hits = 0
+        self.misses = 0
+        self._future: Optional[Future] = None
+
+    def start(self) -> "RetrievalPrefetch":
+        self._future = _prefetch_pool.submit(self.retriever.invoke, self.question)
+        return self
+
+    def matches(self, query: str) -> bool:
+        """True if `query` is close enough to the prefetched question."""
+        if normalize_query_text(query) == normalize_query_text(self.question):
+            return True
+        # Both vectors come from the query embedding cache (the prefetch already embedded the question)
+        a = np.asarray(self.embeddings.embed_query(self.question), dtype=np.float32)
+        b = np.asarray(self.embeddings.embed_query(query), dtype=np.float32)
+        norm = float(np.linalg.norm(a) * np.linalg.norm(b))
+        return norm > 0 and float(a @ b) / norm >= self.threshold
+
+    def take(self, query: str) -> Optional[List[Document]]:
+        """The prefetched documents if they fit `query`, else None (search normally)."""
+        if self._future is None:
+            return None
+        try:
+            if not self.matches(query):
+                # The agent searched for something else: drop the prefetch
+                self.misses += 1
+                self.cancel()
+                return None
+            docs = self._future.result(timeout=self.wait_seconds)
+        except Exception as e:  # Timeout or a failed search
+            print(f"[WARN] Retrieval prefetch unusable: {e}")
+            self.misses += 1
+            return None
+        self.hits += 1
+        return docs
+
+    def cancel(self):
+        """Drops the prefetch (a search that is already running simply finishes unused)."""
+        if self._future is not None:
+            self._future.cancel()
+            self._future = None
+
+
+def start_retrieval_prefetch(question: str, retriever, embeddings: Embeddings) -> Optional[RetrievalPrefetch]:
+    """Starts a prefetch for the question, or returns None when prefetching is disabled."""
+    if not RETRIEVAL_PREFETCH_ENABLED or not question.strip():
+        return None
+    return RetrievalPrefetch(question, retriever, embeddings).start()
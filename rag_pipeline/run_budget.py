@@ -0,0 +1,130 @@
+# rag_pipeline/run_budget.py
+
+import os
+import threading
+import time
+from typing import Any, Callable, List, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+# --- Configuration ---
+# Hard limits for one agent/RAG run. The AgentExecutor enforces the iteration limit;
+# RunBudget enforces time and tokens per token. The time limit counts from the first
+# generation and excludes waits in the LLM scheduler queue.
+AGENT_MAX_ITERATIONS = int(os.getenv("AGENT_MAX_ITERATIONS", "5"))
+AGENT_MAX_EXECUTION_SECONDS = float(os.getenv("AGENT_MAX_EXECUTION_SECONDS", "45"))
+AGENT_MAX_GENERATED_TOKENS = int(os.getenv("AGENT_MAX_GENERATED_TOKENS", "1500"))
+
+# What AgentExecutor returns (early_stopping_method="force") when it hits its own limits
+AGENT_STOPPED_OUTPUT = "Agent stopped due to iteration limit or time limit."
+FINAL_ANSWER_MARKER = "Final Answer:"
+PARTIAL_ANSWER_PREFIX = "I ran out of time before finishing my answer. Here is what I found so far:\n\n"
+STOPPED_MESSAGE = "I could not finish answering within the time limit. Please try a more specific question."
+# Longest tool observation quoted in a partial answer
+_MAX_OBSERVATION_CHARS = 1200
+
+
+class RunCancelledError(RuntimeError):
+    """The client went away: nobody will read the answer."""
+
+
+class RunBudgetExceeded(RuntimeError):
+    """The run hit its time or token limit; use RunBudget.partial_answer()."""
+
+
+class RunBudget(BaseCallbackHandler):
+    """
+    Callback handler passed to every LLM and tool call of one run. It counts
+    generated tokens and elapsed time, and raises as soon as a limit is hit or
+    cancel() was called. Raising inside on_llm_new_token aborts the streaming
+    Ollama generation mid-answer, which closes its HTTP connection.
+    It also remembers what the run produced, to build a partial answer.
+    The clock starts at the first LLM call; `queued_seconds` reports time spent
+    waiting for a generation slot, which is not charged to the run.
+    """
+
+    raise_error = True  # Exceptions must abort the run, not be logged and ignored
+    run_inline = True   # Called per token; no executor hop
+
+    def __init__(self, max_seconds: float = AGENT_MAX_EXECUTION_SECONDS,
+                 max_tokens: int = AGENT_MAX_GENERATED_TOKENS, answer_marker: Optional[str] = FINAL_ANSWER_MARKER):
+        self.max_seconds = max_seconds
+        self.max_tokens = max_tokens
+        # None = everything generated is answer text (single-shot RAG)
+        self.answer_marker = answer_marker
+        self.started: Optional[float] = None
+        # Set to the LLM request's queue-wait counter (see llm_request_context)
+        self.queued_seconds: Callable[[], float] = lambda: 0.0
+        self.tokens = 0
+        self.generation = ""
+        self.observations: List[str] = []
+        self.tools_used: List[str] = []
+        self.stopped_early = False
+        # Keeps a cancelled run going while this returns True (e.g. others wait for its answer)
+        self.keep_alive: Callable[[], bool] = lambda: False
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        """Marks the run as unwanted; it stops at the next token or tool call."""
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set() and not self.keep_alive()
+
+    def elapsed(self) -> float:
+        """Seconds the run has been working (not queued) since its first LLM call."""
+        if self.started is None:
+            return 0.0
+        return time.monotonic() - self.started - self.queued_seconds()
+
+    def check(self):
+        if self.cancelled:
+            raise RunCancelledError("Client disconnected.")
+        if self.elapsed() > self.max_seconds:
+            self.stopped_early = True
+            raise RunBudgetExceeded(f"time limit of {self.max_seconds:g}s")
+        if self.tokens >= self.max_tokens:
+            self.stopped_early = True
+            raise RunBudgetExceeded(f"limit of {self.max_tokens} generated tokens")
+
+    # --- Callbacks ---
+    def on_llm_start(self, serialized: Any, prompts: List[str], **kwargs: Any):
+        if self.started is None:
+            self.started = time.monotonic()
+        self.generation = ""
+        self.check()
+
+    def on_llm_new_token(self, token: str, **kwargs: Any):
+        self.tokens += 1  # Ollama streams about one token per chunk
+        self.generation += token
+        self.check()
+
+    def on_tool_start(self, serialized: Any, input_str: str, **kwargs: Any):
+        self.tools_used.append((serialized or {}).get("name", "tool"))
+        self.check()
+
+    def on_tool_end(self, output: Any, **kwargs: Any):
+        self.observations.append(str(output))
+
+    # --- Early stop ---
+    def partial_answer(self) -> str:
+        """Best answer available after an early stop."""
+        self.stopped_early = True
+        if self.answer_marker is None:
+            text = self.generation.strip()
+        else:
+            marker_pos = self.generation.find(self.answer_marker)
+            text = self.generation[marker_pos + len(self.answer_marker):].strip() if marker_pos != -1 else ""
+        if text:
+            return text + " …"  # The answer that was being written when the limit hit
+        if self.observations:
+            observation = self.observations[-1].strip()
+            if len(observation) > _MAX_OBSERVATION_CHARS:
+                observation = observation[:_MAX_OBSERVATION_CHARS].rsplit(" ", 1)[0] + " …"
+            return PARTIAL_ANSWER_PREFIX + observation
+        return STOPPED_MESSAGE
+
+    def finish(self, output: str) -> str:
+        """Replaces AgentExecutor's generic stop message with a partial answer."""
+        return self.partial_answer() if output.strip() == AGENT_STOPPED_OUTPUT else output
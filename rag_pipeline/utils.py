@@ -1,7 +1,9 @@
 # rag_pipeline/utils.py
 
 import os
-from typing import List, Dict, Any
+import json
+import hashlib
+from typing import List, Dict, Any, Iterator, Optional
 from langchain_text_splitters import RecursiveCharacterTextSplitter 
 
 # We only need PyPDFLoader now
@@ -9,11 +11,17 @@ from langchain_community.document_loaders import PyPDFLoader
 
 from langchain_core.documents import Document
 
+from rag_pipeline.page_cache import get_page_cache
+
 # --- Configuration ---
 # MODIFIED: Smaller chunks for higher precision on fact-based queries
 CHUNK_SIZE = 400  
 CHUNK_OVERLAP = 50  # ~12.5% overlap
 
+def get_splitter_signature() -> str:
+    """Identifies the chunking settings; changing them forces a full re-chunk."""
+    return f"recursive:{CHUNK_SIZE}:{CHUNK_OVERLAP}"
+
 def get_rbac_metadata(file_path: str) -> Dict[str, str]:
     """
     Determines the appropriate Role-Based Access Control (RBAC) metadata 
@@ -32,6 +40,109 @@ def get_rbac_metadata(file_path: str) -> Dict[str, str]:
         # Default for general policies (e.g., Company Overview)
         return {"role": "General_Employee", "department": "General"}
 
+# Roles whose documents every user may read (in addition to their own)
+RBAC_SHARED_ROLES = [r.strip() for r in os.getenv("RBAC_SHARED_ROLES", "General_Employee").split(",") if r.strip()]
+
+def get_accessible_roles(user_role: str) -> List[str]:
+    """
+    Role partitions a user may search. `user_role` may list several roles
+    separated by commas (e.g. "HR_Employee,IT_Tech"); the shared roles
+    (General_Employee by default) are always included.
+    """
+    roles = [r.strip() for r in user_role.split(",") if r.strip()]
+    for shared in RBAC_SHARED_ROLES:
+        if shared not in roles:
+            roles.append(shared)
+    return roles
+
+# --- Hashing & Deterministic IDs (used for incremental ingestion) ---
+def compute_file_hash(file_path: str) -> str:
+    """SHA-256 of the raw file bytes, read in blocks."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def make_chunk_id(source: str, page: Any, offset: Any) -> str:
+    """Stable chunk ID: the same source/page/offset always maps to the same vector row."""
+    return f"{source}::p{page}::o{offset}"
+
+def compute_chunk_hash(chunk: Document) -> str:
+    """Hash of a chunk's text and metadata, used to detect changed chunks."""
+    payload = chunk.page_content + json.dumps(chunk.metadata, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def create_text_splitter(chunk_size: int = CHUNK_SIZE, chunk_overlap: int = CHUNK_OVERLAP) -> RecursiveCharacterTextSplitter:
+    """Builds the shared splitter. `add_start_index` gives every chunk its page offset."""
+    return RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        length_function=len,
+        separators=["\n\n", "\n", " ", ""],
+        add_start_index=True
+    )
+
+def iter_pdf_files(data_path: str = "data") -> Iterator[str]:
+    """Yields the path of every PDF under the data directory."""
+    for root, _, files in os.walk(data_path):
+        for file_name in sorted(files):
+            # Skip non-PDF files explicitly
+            if file_name.endswith('.pdf'):
+                yield os.path.join(root, file_name)
+
+def load_pdf_pages(file_path: str, file_hash: Optional[str] = None) -> List[Document]:
+    """
+    Returns one Document per PDF page (empty list if the file is unreadable).
+    Pages come from the persistent page cache when possible; the PDF parser
+    only runs on a cache miss.
+    """
+    page_cache = get_page_cache()
+    if page_cache is not None:
+        file_hash = file_hash or compute_file_hash(file_path)
+        cached_pages = page_cache.get_pages(file_hash, file_path)
+        if cached_pages is not None:
+            return cached_pages
+
+    loader = PyPDFLoader(file_path)
+    try:
+        pages = loader.load()
+    except Exception as e:
+        print(f"Error loading {os.path.basename(file_path)}: {e}")
+        return []
+
+    if page_cache is not None and pages:
+        page_cache.put_pages(file_hash, pages)
+    return pages
+
+def split_pages(document_data: List[Document], file_path: str, text_splitter: RecursiveCharacterTextSplitter) -> List[Document]:
+    """
+    Assigns RBAC metadata to parsed pages and splits them into chunks.
+    Every chunk gets a deterministic 'chunk_id' in its metadata.
+    """
+    file_name = os.path.basename(file_path)
+
+    # Assign Metadata (RBAC, source file name, etc.)
+    base_metadata = get_rbac_metadata(file_path)
+    
+    for doc in document_data:
+        # Merge the RBAC metadata into the document's metadata
+        doc.metadata.update(base_metadata)
+        doc.metadata['source'] = file_name 
+
+    # Split Document into Chunks
+    chunks = text_splitter.split_documents(document_data)
+    for chunk in chunks:
+        chunk.metadata['chunk_id'] = make_chunk_id(
+            file_name, chunk.metadata.get('page', 0), chunk.metadata.get('start_index', 0)
+        )
+    print(f"Processed {len(document_data)} pages/sections from {file_name} into {len(chunks)} chunks.")
+    return chunks
+
+def load_and_split_file(file_path: str, text_splitter: RecursiveCharacterTextSplitter) -> List[Document]:
+    """Loads a single PDF, assigns RBAC metadata and splits it into chunks."""
+    return split_pages(load_pdf_pages(file_path), file_path, text_splitter)
+
 def load_and_split_documents(data_path: str = "data") -> List[Document]:
     """
     Loads ONLY PDF documents from the data directory, assigns metadata, 
@@ -40,42 +151,10 @@ def load_and_split_documents(data_path: str = "data") -> List[Document]:
     all_documents = []
     
     # Initialize the text splitter with the new smaller size
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=CHUNK_SIZE,
-        chunk_overlap=CHUNK_OVERLAP,
-        length_function=len,
-        separators=["\n\n", "\n", " ", ""]
-    )
+    text_splitter = create_text_splitter()
 
-    for root, _, files in os.walk(data_path):
-        for file_name in files:
-            file_path = os.path.join(root, file_name)
-            
-            # Skip non-PDF files explicitly
-            if not file_name.endswith('.pdf'):
-                continue
-
-            # 1. Load Document
-            loader = PyPDFLoader(file_path)
-
-            try:
-                document_data = loader.load()
-            except Exception as e:
-                print(f"Error loading {file_name}: {e}")
-                continue
-
-            # 2. Assign Metadata (RBAC, source file name, etc.)
-            base_metadata = get_rbac_metadata(file_path)
-            
-            for doc in document_data:
-                # Merge the RBAC metadata into the document's metadata
-                doc.metadata.update(base_metadata)
-                doc.metadata['source'] = file_name 
-
-            # 3. Split Document into Chunks
-            chunks = text_splitter.split_documents(document_data)
-            all_documents.extend(chunks)
-            print(f"Processed {len(document_data)} pages/sections from {file_name} into {len(chunks)} chunks.")
+    for file_path in iter_pdf_files(data_path):
+        all_documents.extend(load_and_split_file(file_path, text_splitter))
 
     return all_documents
 
@@ -0,0 +1,52 @@
+# tests/unit/test_answer_cache.py
+
+import pytest
+from app.services.answer_cache_service import SemanticAnswerCache, is_cacheable_question, can_use_answer_cache
+
+
+class FakeEmbeddings:
+    """Maps known phrases to fixed vectors so similarity is predictable."""
+    VECTORS = {
+        "how many leave days do i get": [1.0, 0.0, 0.0],
+        "how many days of leave do i get": [0.99, 0.1, 0.0],
+        "what is the password policy": [0.0, 1.0, 0.0],
+    }
+
+    def embed_query(self, text):
+        return self.VECTORS[text.lower()]
+
+
+def make_cache(version):
+    return SemanticAnswerCache(
+        embeddings=FakeEmbeddings(), threshold=0.9, max_entries_per_role=10,
+        ttl_seconds=60, version_fn=lambda: version["value"]
+    )
+
+
+# --- TEST: PARAPHRASE HIT, ROLE SCOPING, KB VERSION INVALIDATION ---
+def test_semantic_cache_scoped_by_role_and_version():
+    version = {"value": "v1"}
+    cache = make_cache(version)
+    cache.store("HR_Employee", cache.embed("How many leave days do I get"), "20 days.")
+
+    paraphrase = cache.embed("How many days of leave do I get")
+    assert cache.lookup("HR_Employee", paraphrase) == "20 days."
+    assert cache.lookup("IT_Tech", paraphrase) is None
+    assert cache.lookup("HR_Employee", cache.embed("What is the password policy")) is None
+
+    # A new ingestion run bumps the version and invalidates the entry
+    version["value"] = "v2"
+    assert cache.lookup("HR_Employee", paraphrase) is None
+
+def test_side_effect_questions_are_not_cacheable():
+    assert is_cacheable_question("What is the password policy?")
+    assert not is_cacheable_question("Please change my password to hunter2")
+    assert not is_cacheable_question("Apply for sick leave from 2025-12-01 to 2025-12-05")
+
+
+# --- TEST: ANSWERS SHAPED BY SESSION MEMORY ARE NEVER CACHED ---
+def test_cache_skipped_with_session_history():
+    assert can_use_answer_cache("How many leave days do I get?")
+    # A follow-up is answered from someone's conversation: no lookup, no store
+    assert not can_use_answer_cache("And for contractors?", "User: How many leave days do I get?\nAgent: 20 days.")
+    assert not can_use_answer_cache("Apply for leave from 2025-12-01 to 2025-12-05")
@@ -0,0 +1,49 @@
+# tests/unit/test_benchmark_common.py
+
+import json
+import pytest
+from benchmarks.common import (
+    StageTimer, percentile, first_relevant_rank, recall_at_k, mean_reciprocal_rank
+)
+
+
+# --- TEST: BENCHMARK HELPERS ---
+def test_percentile_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 95) == 95
+    assert percentile(values, 99) == 99
+    assert percentile([], 50) == 0.0
+
+def test_stage_timer_reports_throughput():
+    with StageTimer("split") as stage:
+        stage.count(chunks=10)
+
+    result = stage.result()
+    assert result["stage"] == "split"
+    assert result["chunks"] == 10
+    assert result["chunks_per_s"] > 0
+    assert result["peak_rss_mb"] > 0
+
+def test_retrieval_quality_metrics():
+    expected = [("HR_Policy_Detailed.pdf", 4)]
+    retrieved = [("IT_Security_Policy.pdf", 0), ("HR_Policy_Detailed.pdf", 4)]
+    assert first_relevant_rank(retrieved, expected) == 2
+    assert first_relevant_rank(retrieved[:1], expected) is None
+
+    ranks = [1, 2, None, 4]
+    assert recall_at_k(ranks, 1) == 0.25
+    assert recall_at_k(ranks, 5) == 0.75
+    assert mean_reciprocal_rank(ranks) == pytest.approx((1 + 0.5 + 0.25) / 4)
+
+def test_golden_set_is_well_formed():
+    with open("benchmarks/golden_questions.json", "r", encoding="utf-8") as f:
+        golden = json.load(f)
+
+    roles = {"HR_Employee", "IT_Tech", "Sales_Team", "General_Employee"}
+    assert len(golden) >= 40
+    for item in golden:
+        assert item["role"] in roles and item["question"].strip()
+        assert item["expected"]
+        for location in item["expected"]:
+            assert location["source"].endswith(".pdf") and location["page"] >= 0
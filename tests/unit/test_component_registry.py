@@ -0,0 +1,51 @@
+# tests/unit/test_component_registry.py
+
+import pytest
+from rag_pipeline.component_registry import ComponentRegistry
+
+
+class FakeVectorStore:
+    pass
+
+
+# --- TEST: ONE RETRIEVER PER ROLE ---
+def test_retriever_is_built_once_per_role():
+    store = FakeVectorStore()
+    registry = ComponentRegistry(llm=None, embeddings=None, vector_store=store)
+
+    hr_first = registry.get_retriever("HR_Employee")
+    hr_second = registry.get_retriever("HR_Employee")
+    it_retriever = registry.get_retriever("IT_Tech")
+
+    assert hr_first is hr_second
+    assert it_retriever is not hr_first
+    assert it_retriever.user_role == "IT_Tech"
+    assert it_retriever.vector_store is store
+
+
+# --- TEST: HEALTH CHECKS NEVER GENERATE WHEN A POOL IS PROBED ---
+class FakePool:
+    def __init__(self, healthy):
+        self.healthy = healthy
+        self.probes = 0
+
+    def probe_all(self):
+        self.probes += 1
+        return self.healthy
+
+
+class NoGenerationLLM:
+    def invoke(self, *args, **kwargs):
+        raise AssertionError("health check must not run a generation")
+
+
+def test_health_check_uses_pool_probes_only():
+    pool = FakePool(healthy=True)
+    registry = ComponentRegistry(llm=None, embeddings=None, vector_store=FakeVectorStore(),
+                                 probe_llm=NoGenerationLLM(), llm_pool=pool)
+
+    assert registry.check_llm_health() is True
+    pool.healthy = False
+    assert registry.check_llm_health() is False
+    assert registry.llm_healthy is False
+    assert pool.probes == 2
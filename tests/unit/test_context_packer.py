@@ -0,0 +1,67 @@
+# tests/unit/test_context_packer.py
+
+from langchain_core.documents import Document
+from rag_pipeline.context_packer import dedupe_and_stitch, split_sentences, pack_context, estimate_tokens
+
+PAGE = "Annual leave is 20 days.\nSick leave is 10 days.\nThe office opens at 9am.\nParking is free for staff."
+
+
+class _KeywordEmbeddings:
+    """One dimension per keyword, so similarity is keyword overlap."""
+    KEYWORDS = ["leave", "annual", "sick", "office", "parking", "vpn"]
+
+    def _vector(self, text):
+        text = text.lower()
+        return [float(word in text) for word in self.KEYWORDS]
+
+    def embed_documents(self, texts):
+        return [self._vector(t) for t in texts]
+
+    def embed_query(self, text):
+        return self._vector(text)
+
+
+def _chunk(start, end, source="HR.pdf", page=0, text=PAGE):
+    return Document(page_content=text[start:end], id=f"{source}::p{page}::o{start}",
+                    metadata={"source": source, "page": page, "start_index": start})
+
+
+# --- TEST: OVERLAPPING CHUNKS ARE STITCHED, DUPLICATES DROPPED ---
+def test_dedupe_and_stitch_merges_overlap():
+    first, second = _chunk(0, 50), _chunk(40, len(PAGE))
+    passages = dedupe_and_stitch([second, first, first])
+    assert len(passages) == 1
+    assert passages[0].text == PAGE
+    assert passages[0].rank == 0
+
+
+# --- TEST: DIFFERENT PAGES ARE NOT STITCHED ---
+def test_stitch_keeps_pages_apart():
+    passages = dedupe_and_stitch([_chunk(0, 25), _chunk(25, 50, page=1)])
+    assert len(passages) == 2
+
+
+# --- TEST: WRAPPED PDF LINES STAY IN ONE SENTENCE ---
+def test_split_sentences_joins_wrapped_lines():
+    text = "• Keyword research: basmati rice, halal meat\nsupplier lists\n• Link building. Blog posts"
+    assert split_sentences(text) == [
+        "• Keyword research: basmati rice, halal meat supplier lists", "• Link building.", "Blog posts"
+    ]
+
+
+# --- TEST: IRRELEVANT SENTENCES AND HITS ARE DROPPED ---
+def test_pack_context_selects_relevant_sentences():
+    other = Document(page_content="VPN access requires MFA.", id="IT.pdf::p0::o0",
+                     metadata={"source": "IT.pdf", "page": 0, "start_index": 0})
+    packed = pack_context("annual leave days", [_chunk(0, 50), _chunk(40, len(PAGE)), other],
+                          _KeywordEmbeddings(), token_budget=12)
+    assert "Annual leave is 20 days." in packed
+    assert "Parking" not in packed
+    assert "VPN" not in packed  # Adaptive k cut the unrelated hit
+    assert estimate_tokens(packed) <= 12
+
+
+# --- TEST: WITHOUT A MODEL THE STITCHED TEXT IS RETURNED ---
+def test_pack_context_without_embeddings():
+    assert pack_context("q", [_chunk(0, 50), _chunk(40, len(PAGE))], None) == PAGE
+    assert pack_context("q", [], None) == ""
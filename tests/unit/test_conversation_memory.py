@@ -0,0 +1,60 @@
+# tests/unit/test_conversation_memory.py
+
+import pytest
+from sqlmodel import SQLModel, Session, create_engine
+
+from app.services.memory_service import save_message, load_conversation_memory, update_rolling_summary
+
+
+@pytest.fixture
+def db_session():
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+
+
+def add_turns(session, session_id, count, start=0):
+    for i in range(start, start + count):
+        save_message(session, "alice@corp.com", session_id, "user", f"question {i}")
+        save_message(session, "alice@corp.com", session_id, "agent", f"answer {i}")
+
+
+class RecordingSummarizer:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, summary, new_lines):
+        self.calls.append((summary, list(new_lines)))
+        return (summary + " | " if summary else "") + f"{len(new_lines)} lines"
+
+
+# --- TEST: ONLY OLDER TURNS ARE SUMMARIZED, AND ONLY ONCE ---
+def test_summary_is_incremental(db_session):
+    summarizer = RecordingSummarizer()
+    add_turns(db_session, "s1", 4)
+
+    assert update_rolling_summary(db_session, "s1", summarizer, recent_turns=2) is True
+    assert summarizer.calls == [("", ["User: question 0", "Assistant: answer 0",
+                                      "User: question 1", "Assistant: answer 1"])]
+    # Nothing new dropped out of the window: no LLM call
+    assert update_rolling_summary(db_session, "s1", summarizer, recent_turns=2) is False
+
+    add_turns(db_session, "s1", 1, start=4)
+    assert update_rolling_summary(db_session, "s1", summarizer, recent_turns=2) is True
+    # The previous summary is extended with just the newly evicted turn
+    assert summarizer.calls[-1] == ("4 lines", ["User: question 2", "Assistant: answer 2"])
+
+    memory = load_conversation_memory(db_session, "s1", token_budget=1000)
+    assert memory.splitlines() == [
+        "Summary of earlier conversation: 4 lines | 2 lines",
+        "User: question 3", "Assistant: answer 3", "User: question 4", "Assistant: answer 4",
+    ]
+
+
+# --- TEST: THE TOKEN BUDGET KEEPS THE NEWEST MESSAGES ---
+def test_memory_respects_token_budget(db_session):
+    add_turns(db_session, "s2", 10)
+    memory = load_conversation_memory(db_session, "s2", token_budget=8)
+    assert memory.splitlines() == ["User: question 9", "Assistant: answer 9"]
+    assert load_conversation_memory(db_session, "unknown", token_budget=100) == ""
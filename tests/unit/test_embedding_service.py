@@ -0,0 +1,118 @@
+# tests/unit/test_embedding_service.py
+
+import os
+import asyncio
+import tempfile
+import threading
+
+from rag_pipeline.embedding_service import MicroBatcher, serve
+from rag_pipeline.embedding_models import SidecarEmbeddings
+
+
+class _FakeModel:
+    """Vector of a text is [len(text)]; records the size of every model call."""
+
+    def __init__(self):
+        self.calls = []
+
+    def embed_documents(self, texts):
+        self.calls.append(len(texts))
+        return [[float(len(t))] for t in texts]
+
+
+# --- TEST: CONCURRENT REQUESTS SHARE ONE MODEL CALL ---
+def test_batcher_merges_concurrent_requests():
+    model = _FakeModel()
+
+    async def scenario():
+        batcher = MicroBatcher(model.embed_documents, max_batch_size=64, max_wait_ms=50)
+        batcher.start()
+        results = await asyncio.gather(
+            batcher.embed(["a"]), batcher.embed(["bb", "ccc"]), batcher.embed(["dddd"])
+        )
+        await batcher.stop()
+        return results, batcher.stats()
+
+    results, stats = asyncio.run(scenario())
+    # Each caller gets back exactly its own vectors, in order
+    assert results == [[[1.0]], [[2.0], [3.0]], [[4.0]]]
+    assert model.calls == [4]
+    assert stats["batches"] == 1 and stats["requests"] == 3
+
+
+# --- TEST: MAX BATCH SIZE CLOSES A BATCH EARLY ---
+def test_batcher_respects_max_batch_size():
+    model = _FakeModel()
+
+    async def scenario():
+        batcher = MicroBatcher(model.embed_documents, max_batch_size=2, max_wait_ms=50)
+        batcher.start()
+        await asyncio.gather(*(batcher.embed(["x"]) for _ in range(5)))
+        await batcher.stop()
+
+    asyncio.run(scenario())
+    assert sum(model.calls) == 5
+    assert max(model.calls) <= 2
+
+
+# --- TEST: A MODEL ERROR FAILS THE WHOLE BATCH, NOT THE LOOP ---
+def test_batcher_survives_model_errors():
+    calls = []
+
+    def flaky(texts):
+        calls.append(texts)
+        if len(calls) == 1:
+            raise ValueError("boom")
+        return [[1.0] for _ in texts]
+
+    async def scenario():
+        batcher = MicroBatcher(flaky, max_batch_size=8, max_wait_ms=1)
+        batcher.start()
+        try:
+            await batcher.embed(["a"])
+            raise AssertionError("expected the first batch to fail")
+        except ValueError:
+            pass
+        result = await batcher.embed(["b"])
+        await batcher.stop()
+        return result
+
+    assert asyncio.run(scenario()) == [[1.0]]
+
+
+# --- TEST: CLIENT ROUND TRIP OVER THE UNIX SOCKET ---
+def test_sidecar_client_round_trip():
+    model = _FakeModel()
+    with tempfile.TemporaryDirectory() as tmp:
+        socket_path = os.path.join(tmp, "embed.sock")
+        loop = asyncio.new_event_loop()
+        ready = asyncio.Event()
+        task_holder = {}
+
+        def run():
+            asyncio.set_event_loop(loop)
+            task_holder["task"] = loop.create_task(
+                serve(model.embed_documents, socket_path, max_batch_size=16, max_wait_ms=1, ready=ready)
+            )
+            try:
+                loop.run_until_complete(task_holder["task"])
+            except asyncio.CancelledError:
+                pass
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        for _ in range(200):
+            if os.path.exists(socket_path):
+                break
+            threading.Event().wait(0.01)
+
+        client = SidecarEmbeddings(socket_path, timeout=5)
+        assert client.embed_query("four") == [4.0]
+        assert client.embed_documents(["a", "bb"]) == [[1.0], [2.0]]
+        assert client.embed_documents([]) == []
+        assert client.stats()["texts"] == 3
+        client.close()
+
+        loop.call_soon_threadsafe(task_holder["task"].cancel)
+        thread.join(timeout=5)
+        assert not os.path.exists(socket_path)
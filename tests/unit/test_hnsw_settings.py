@@ -0,0 +1,62 @@
+# tests/unit/test_hnsw_settings.py
+
+import uuid
+import pytest
+import chromadb
+from rag_pipeline.chroma_db_manager import set_search_ef
+
+
+class _FakeCollection:
+    def __init__(self, metadata):
+        self.metadata = metadata
+        self.modified = []
+
+    def modify(self, metadata):
+        self.modified.append(metadata)
+        self.metadata = metadata
+
+
+class _FakePartition:
+    def __init__(self, collection):
+        self._collection = collection
+
+
+class _FakePartitionedStore:
+    def __init__(self, collections):
+        self.collections = collections
+
+    def roles(self):
+        return sorted(self.collections)
+
+    def partition(self, role):
+        return _FakePartition(self.collections[role])
+
+
+# --- TEST: SEARCH EF CHANGES WITHOUT A REBUILD ---
+def test_set_search_ef_updates_every_partition():
+    it = _FakeCollection({"hnsw:space": "l2", "hnsw:M": 16, "hnsw:search_ef": 10})
+    hr = _FakeCollection({"hnsw:search_ef": 50})
+    set_search_ef(_FakePartitionedStore({"IT_Tech": it, "HR_Employee": hr}), 50)
+
+    # The distance function is never sent back (Chroma rejects it in modify)
+    assert it.modified == [{"hnsw:M": 16, "hnsw:search_ef": 50}]
+    # Already at the requested value: untouched
+    assert hr.modified == []
+
+
+def _effective_search_ef(collection):
+    configuration = getattr(collection, "configuration", None)
+    if isinstance(configuration, dict) and configuration.get("hnsw") is not None:
+        return configuration["hnsw"]["ef_search"]
+    return collection.metadata["hnsw:search_ef"]
+
+
+def test_set_search_ef_on_real_collection():
+    client = chromadb.EphemeralClient()
+    name = f"hnsw-{uuid.uuid4().hex[:8]}"
+    collection = client.get_or_create_collection(name, metadata={"hnsw:M": 16, "hnsw:search_ef": 10})
+
+    set_search_ef(_FakePartitionedStore({"IT_Tech": collection}), 64)
+
+    # Re-read from the server: the index itself must now search with ef=64
+    assert _effective_search_ef(client.get_collection(name)) == 64
@@ -0,0 +1,45 @@
+# tests/unit/test_ingestion_manifest.py
+
+import pytest
+from rag_pipeline.ingestion_manifest import IngestionManifest, PendingFileUpdates, diff_chunks
+
+
+# --- TEST: ONLY NEW/CHANGED CHUNKS ARE RE-EMBEDDED ---
+def test_diff_chunks_upserts_changed_and_deletes_missing():
+    old = {"a::p0::o0": "h1", "a::p0::o350": "h2", "a::p1::o0": "h3"}
+    new = {"a::p0::o0": "h1", "a::p0::o350": "CHANGED", "a::p2::o0": "h4"}
+
+    to_upsert, to_delete = diff_chunks(old, new)
+
+    assert sorted(to_upsert) == ["a::p0::o350", "a::p2::o0"]
+    assert to_delete == ["a::p1::o0"]
+
+def test_manifest_round_trip(tmp_path):
+    path = str(tmp_path / "manifest.json")
+    manifest = IngestionManifest.load(path)
+    assert not manifest.exists
+
+    manifest.set_file("HR_Policy.pdf", "filehash", {"HR_Policy.pdf::p0::o0": "h1"})
+    manifest.save()
+
+    reloaded = IngestionManifest.load(path)
+    assert reloaded.exists
+    assert reloaded.file_hash("HR_Policy.pdf") == "filehash"
+    assert reloaded.remove_file("HR_Policy.pdf") == ["HR_Policy.pdf::p0::o0"]
+    assert reloaded.file_hash("HR_Policy.pdf") is None
+
+# --- TEST: MANIFEST ENTRY COMMITTED ONLY AFTER ALL CHUNKS ARE WRITTEN ---
+def test_pending_updates_commit_after_last_chunk(tmp_path):
+    manifest = IngestionManifest.load(str(tmp_path / "manifest.json"))
+    pending = PendingFileUpdates(manifest)
+
+    pending.add("a.pdf", "hash-a", {"a::p0::o0": "h1", "a::p0::o350": "h2"}, outstanding=2)
+    pending.add("b.pdf", "hash-b", {}, outstanding=0)
+    assert manifest.file_hash("b.pdf") == "hash-b"
+
+    pending.mark_written(["a.pdf"])
+    assert manifest.file_hash("a.pdf") is None
+
+    pending.mark_written(["a.pdf"])
+    assert manifest.file_hash("a.pdf") == "hash-a"
+    assert IngestionManifest.load(manifest.path).file_hash("a.pdf") == "hash-a"
@@ -0,0 +1,116 @@
+# tests/unit/test_intent_router.py
+
+import pytest
+from app.services import intent_router
+from app.services.intent_router import (
+    IntentRouter, IntentClassifier, parse_leave_command, parse_password_command, GREETING_REPLY
+)
+
+
+class FakeEmbeddings:
+    """
+    'hey buddy' is close to the greeting prototypes, policy questions to knowledge,
+    the probation question loosely to knowledge, the rest to nothing.
+    """
+
+    def _vector(self, text):
+        text = text.lower()
+        if text in ("hi", "hello there", "good morning", "hey buddy"):
+            return [1.0, 0.0, 0.0]
+        if "policy" in text:
+            return [0.0, 1.0, 0.0]
+        if "probation" in text:
+            return [0.0, 0.6, 0.8]  # Nearest is knowledge, but below the fast-path threshold
+        return [0.2, 0.2, 0.96]
+
+    def embed_documents(self, texts):
+        return [self._vector(t) for t in texts]
+
+    def embed_query(self, text):
+        return self._vector(text)
+
+
+@pytest.fixture
+def router(monkeypatch):
+    calls = []
+    monkeypatch.setattr(intent_router, "submit_leave_request",
+                        lambda user, start, end, reason: calls.append(("leave", user, start, end, reason)) or "Success: Leave requested.")
+    monkeypatch.setattr(intent_router, "update_user_password",
+                        lambda user, password: calls.append(("password", user, password)) or "Success")
+    classifier = IntentClassifier(FakeEmbeddings(), threshold=0.9,
+                                  prototypes={"greeting": ["hi", "hello there", "good morning"],
+                                              "knowledge": ["what is the leave policy"]})
+    r = IntentRouter(classifier, rag_threshold=0.4)
+    r.calls = calls
+    return r
+
+
+# --- TEST: COMMAND PARSING ---
+def test_parse_leave_command():
+    assert parse_leave_command("apply leave 2025-12-01 to 2025-12-05, sick") == ("2025-12-01", "2025-12-05", "sick")
+    assert parse_leave_command("Please apply for annual leave on 2025-12-01 for a family trip.") == \
+        ("2025-12-01", "2025-12-01", "Annual leave: a family trip")
+    # Missing reason, impossible dates or reversed ranges go to the agent
+    assert parse_leave_command("apply leave 2025-12-01 to 2025-12-05") is None
+    assert parse_leave_command("apply leave 2025-02-30 to 2025-03-02, trip") is None
+    assert parse_leave_command("apply leave 2025-12-05 to 2025-12-01, trip") is None
+    assert parse_leave_command("how do I apply for leave?") is None
+
+
+@pytest.mark.parametrize("message", [
+    "apply for leave 2025-12-01 to next friday, vacation",
+    "apply leave 2025-12-01 for 3 days, family",
+    "book leave 2025-12-01 until 12/05 for vacation",
+    "apply leave 2025-12-01 to",
+    "apply leave 2025-12-01 through 2025-12-03, trip",
+    "apply leave 2025-12-01 - 2 weeks, travel",
+    "request leave 2025-12-01, wedding on Friday",
+])
+def test_parse_leave_command_rejects_unparsed_dates_and_durations(message):
+    assert parse_leave_command(message) is None
+
+
+def test_parse_password_command():
+    assert parse_password_command("change my password to hunter2") == "hunter2"
+    assert parse_password_command("Please set my password to 'S3cret!'") == "S3cret!"
+    assert parse_password_command("how do I change my password?") is None
+    assert parse_password_command("change my password to two words") is None
+
+
+# --- TEST: ROUTING ---
+def test_router_fast_paths(router):
+    assert router.route("a@corp.com", "Hello!").answer == GREETING_REPLY
+    assert router.route("a@corp.com", "hey buddy").intent == "greeting"  # Classifier decision
+
+    result = router.route("a@corp.com", "apply leave 2025-12-01 to 2025-12-05, sick")
+    assert result.tools_used == ["apply_for_leave"]
+    assert router.calls[-1] == ("leave", "a@corp.com", "2025-12-01", "2025-12-05", "sick")
+
+    result = router.route("a@corp.com", "change my password to hunter2")
+    assert result.tools_used == ["change_my_password"]
+    assert router.calls[-1] == ("password", "a@corp.com", "hunter2")
+
+
+def test_router_falls_through_to_agent(router):
+    assert router.route("a@corp.com", "Hi, what is the leave policy for interns?") is None
+    assert router.route("a@corp.com", "I need some days off next week") is None
+    assert router.route("a@corp.com", "   ") is None
+    assert router.calls == []
+
+
+# --- TEST: AUTO MODE PICKS RAG FOR KNOWLEDGE QUESTIONS ---
+def test_choose_mode(router):
+    assert router.choose_mode("What is the leave policy?") == "rag"
+    assert router.choose_mode("Apply for sick leave from 2025-12-01 to 2025-12-05") == "agent"
+    assert router.choose_mode("Please change my password to hunter2") == "agent"
+
+
+def test_choose_mode_rag_below_fast_path_threshold(router):
+    assert router.classify("How long is the probation period?")[0] is None  # Too far for a canned reply
+    assert router.choose_mode("How long is the probation period?") == "rag"
+
+
+def test_choose_mode_falls_back_to_agent_when_unsure(router):
+    assert router.classify("I need next Friday off")[0] is None  # No pattern or prototype matches
+    assert router.choose_mode("I need next Friday off") == "agent"
+    assert IntentRouter().choose_mode("What is the leave policy?") == "agent"  # No classifier at all
@@ -0,0 +1,49 @@
+# tests/unit/test_lexical_index.py
+
+import pytest
+from langchain_core.documents import Document
+from rag_pipeline.lexical_index import LexicalIndex, reciprocal_rank_fusion, tokenize
+
+
+def _chunk(chunk_id, text, role):
+    return Document(page_content=text, metadata={"chunk_id": chunk_id, "role": role, "source": f"{chunk_id}.pdf"})
+
+
+# --- TEST: BM25 SEARCH IS PARTITIONED BY ROLE AND UPDATED INCREMENTALLY ---
+def test_lexical_search_by_role(tmp_path):
+    index = LexicalIndex(str(tmp_path / "lexical.sqlite3"))
+    index.upsert([
+        _chunk("gdpr", "GDPR requests are answered within 30 days.", "General_Employee"),
+        _chunk("vpn", "Use the VPN for all remote access.", "IT_Tech"),
+        _chunk("leave", "Annual leave is 20 days per year.", "General_Employee"),
+    ])
+
+    results = index.search("How fast are GDPR requests answered?", "General_Employee", k=5)
+    assert [doc.id for doc, _ in results] == ["gdpr"]
+    # Chunks of another role are never returned
+    assert index.search("VPN", "General_Employee", k=5) == []
+
+    index.upsert([_chunk("gdpr", "Data subject requests take a month.", "General_Employee")])
+    assert index.search("GDPR", "General_Employee", k=5) == []
+    index.delete(["vpn"])
+    assert index.search("VPN", "IT_Tech", k=5) == []
+    assert index.count() == 2
+
+def test_tokenize_keeps_exact_terms():
+    assert tokenize("What is the IT VPN policy for GDPR?") == ["it", "vpn", "policy", "gdpr"]
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    a, b, c = (Document(page_content=x, metadata={"chunk_id": x}) for x in "abc")
+    fused = reciprocal_rank_fusion([[a, b], [c, b]], k=2)
+    assert [d.metadata["chunk_id"] for d in fused] == ["b", "a"]
+
+def test_lexical_search_across_allowed_roles(tmp_path):
+    index = LexicalIndex(str(tmp_path / "lexical.sqlite3"))
+    index.upsert([
+        _chunk("vpn", "VPN access requires MFA.", "IT_Tech"),
+        _chunk("gdpr", "GDPR requests need MFA verification.", "General_Employee"),
+        _chunk("salary", "Salary reviews need MFA approval.", "HR_Employee"),
+    ])
+
+    results = index.search("MFA", ["IT_Tech", "General_Employee"], k=5)
+    assert sorted(doc.id for doc, _ in results) == ["gdpr", "vpn"]
@@ -0,0 +1,22 @@
+# tests/unit/test_limiter.py
+
+from app.core.limiter import limiter, hit_rate_limit
+
+
+# --- TEST: LIMITS FOR TRAFFIC THE DECORATORS NEVER SEE (WEBSOCKET MESSAGES) ---
+def test_hit_rate_limit_per_key():
+    limiter.reset()
+    assert [hit_rate_limit("2/minute", "ws_query", "a@corp.com") for _ in range(2)] == [0, 0]
+    retry_after = hit_rate_limit("2/minute", "ws_query", "a@corp.com")
+    assert 1 <= retry_after <= 60
+    assert hit_rate_limit("2/minute", "ws_query", "b@corp.com") == 0  # Other users keep their own budget
+    assert hit_rate_limit("2/minute", "other_scope", "a@corp.com") == 0
+
+
+def test_disabled_limiter_allows_everything():
+    limiter.reset()
+    limiter.enabled = False
+    try:
+        assert all(hit_rate_limit("1/minute", "ws_query", "a@corp.com") == 0 for _ in range(3))
+    finally:
+        limiter.enabled = True
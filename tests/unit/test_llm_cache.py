@@ -0,0 +1,32 @@
+# tests/unit/test_llm_cache.py
+
+import time
+import pytest
+from langchain_core.outputs import Generation
+from rag_pipeline.llm_models import SQLiteCompletionCache
+
+
+# --- TEST: KEYED BY PROMPT + LLM STRING, LRU EVICTION, TTL ---
+def test_completion_cache_hit_and_lru_eviction(tmp_path):
+    cache = SQLiteCompletionCache(str(tmp_path / "llm.sqlite3"), ttl_seconds=60, max_entries=2)
+
+    cache.update("prompt-a", "llama3-stop=[Observation]", [Generation(text="A")])
+    cache.update("prompt-b", "llama3-stop=[Observation]", [Generation(text="B")])
+
+    # Different stop sequences / params are different keys
+    assert cache.lookup("prompt-a", "llama3-stop=[]") is None
+    assert cache.lookup("prompt-a", "llama3-stop=[Observation]")[0].text == "A"
+
+    # 'prompt-b' is now least recently used and gets evicted
+    cache.update("prompt-c", "llama3-stop=[Observation]", [Generation(text="C")])
+    assert cache.lookup("prompt-b", "llama3-stop=[Observation]") is None
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["entries"] == 2
+
+def test_completion_cache_ttl_expiry(tmp_path):
+    cache = SQLiteCompletionCache(str(tmp_path / "llm.sqlite3"), ttl_seconds=0.01, max_entries=10)
+    cache.update("prompt", "llm", [Generation(text="old")])
+    time.sleep(0.02)
+    assert cache.lookup("prompt", "llm") is None
@@ -0,0 +1,197 @@
+# tests/unit/test_llm_scheduler.py
+
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from langchain_core.callbacks import BaseCallbackHandler
+from rag_pipeline import llm_models
+from rag_pipeline.llm_models import (
+    LLMScheduler, LLMOverloadedError, ScheduledOllama, llm_request_context,
+    PRIORITY_FAST, PRIORITY_NORMAL, PRIORITY_BACKGROUND
+)
+from rag_pipeline.ollama_pool import OllamaPool
+
+
+def _wait_for_depth(scheduler, depth):
+    deadline = time.monotonic() + 5
+    while scheduler.stats()["queue_depth"] < depth:
+        assert time.monotonic() < deadline, "waiters never queued"
+        time.sleep(0.005)
+
+
+def _queue(scheduler, order, label, user, priority):
+    def run():
+        with scheduler.slot(user, priority):
+            order.append(label)
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+
+# --- TEST: CONCURRENCY CAP + BOUNDED QUEUE ---
+def test_rejects_when_queue_is_full():
+    scheduler = LLMScheduler(max_concurrent=1, max_queue=1, queue_timeout=5)
+    scheduler.acquire("a")  # Takes the only slot
+
+    waiter = _queue(scheduler, [], "b", "b", PRIORITY_NORMAL)
+    _wait_for_depth(scheduler, 1)
+
+    with pytest.raises(LLMOverloadedError) as exc:
+        scheduler.acquire("c")
+    assert exc.value.retry_after >= 1
+    with pytest.raises(LLMOverloadedError):
+        scheduler.check_admission()
+
+    scheduler.release()
+    waiter.join(5)
+    stats = scheduler.stats()
+    assert stats["rejected"] == 2
+    assert stats["active"] == 0 and stats["queue_depth"] == 0
+
+
+def test_queue_timeout():
+    scheduler = LLMScheduler(max_concurrent=1, max_queue=4, queue_timeout=0.05)
+    scheduler.acquire("a")
+    with pytest.raises(LLMOverloadedError):
+        scheduler.acquire("b")
+    assert scheduler.stats()["timeouts"] == 1
+    assert scheduler.stats()["queue_depth"] == 0
+
+
+# --- TEST: PRIORITY FIRST, THEN ROUND-ROBIN ACROSS USERS ---
+def test_priority_and_fair_order():
+    scheduler = LLMScheduler(max_concurrent=1, max_queue=10, queue_timeout=5)
+    scheduler.acquire("holder")
+    order, threads = [], []
+
+    # A burst from one user, then one request each from two others
+    for label, user, priority in [("bg", "summary", PRIORITY_BACKGROUND),
+                                  ("a1", "a", PRIORITY_NORMAL), ("a2", "a", PRIORITY_NORMAL),
+                                  ("a3", "a", PRIORITY_NORMAL), ("b1", "b", PRIORITY_NORMAL),
+                                  ("c1", "c", PRIORITY_NORMAL), ("fast", "d", PRIORITY_FAST)]:
+        threads.append(_queue(scheduler, order, label, user, priority))
+        _wait_for_depth(scheduler, len(threads))
+
+    scheduler.release()
+    for thread in threads:
+        thread.join(5)
+
+    assert order == ["fast", "a1", "b1", "c1", "a2", "a3", "bg"]
+
+
+# --- TEST: CONTINUATIONS ARE NEVER REJECTED ---
+def test_continuation_bypasses_queue_limit():
+    scheduler = LLMScheduler(max_concurrent=1, max_queue=0, queue_timeout=5)
+    scheduler.acquire("a")
+    order = []
+
+    def continue_run():
+        scheduler.acquire("a", PRIORITY_FAST, admit=False)
+        order.append("continued")
+
+    thread = threading.Thread(target=continue_run)
+    thread.start()
+    _wait_for_depth(scheduler, 1)
+    with pytest.raises(LLMOverloadedError):
+        scheduler.acquire("b")
+    scheduler.release()
+    thread.join(5)
+    assert order == ["continued"]
+
+
+# --- TEST: QUEUE WAIT IS RECORDED ON THE REQUEST ---
+def test_request_records_queue_wait():
+    scheduler = LLMScheduler(max_concurrent=1, max_queue=4, queue_timeout=5)
+    scheduler.acquire("other")
+    waits = []
+
+    def run():
+        with llm_request_context("a") as request:
+            with llm_models._slot_for_current_request(scheduler):
+                pass
+            with llm_models._slot_for_current_request(scheduler):  # Free slot: no wait
+                pass
+            waits.append(request.queued_seconds)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    _wait_for_depth(scheduler, 1)
+    time.sleep(0.1)
+    scheduler.release()
+    thread.join(5)
+    assert 0.1 <= waits[0] < 1.0
+
+
+# --- TEST: CALLBACKS STILL REACH THE SCHEDULED CLIENT ---
+class _StreamingStub(BaseHTTPRequestHandler):
+    """Minimal Ollama /api/generate that streams three tokens."""
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        lines = [{"response": word, "done": False} for word in ("Twenty", " days", ".")]
+        body = "\n".join(json.dumps(line) for line in lines + [{"response": "", "done": True}]).encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class _TokenRecorder(BaseCallbackHandler):
+    def __init__(self):
+        self.tokens = []
+
+    def on_llm_new_token(self, token, **kwargs):
+        self.tokens.append(token)
+
+
+def test_scheduled_ollama_passes_callbacks(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StreamingStub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    pool = OllamaPool([f"http://127.0.0.1:{server.server_port}"])
+    monkeypatch.setattr(llm_models, "get_ollama_pool", lambda: pool)
+    monkeypatch.setattr(llm_models, "get_llm_scheduler", lambda: LLMScheduler(1, 1, 5))
+    try:
+        llm = ScheduledOllama(model="llama3", base_url=pool.endpoints[0].base_url)
+        recorder = _TokenRecorder()
+
+        # invoke() goes through _generate, which only gets a run_manager if its signature declares one
+        assert llm.invoke("How many leave days?", config={"callbacks": [recorder]}) == "Twenty days."
+        assert "".join(recorder.tokens) == "Twenty days." and len(recorder.tokens) >= 3
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+# --- TEST: A CANCELLED ASYNC WAITER DOES NOT LEAK ITS SLOT ---
+def test_cancelled_agenerate_releases_slot(monkeypatch):
+    scheduler = LLMScheduler(max_concurrent=1, max_queue=4, queue_timeout=5)
+    monkeypatch.setattr(llm_models, "get_llm_scheduler", lambda: scheduler)
+    llm = ScheduledOllama(model="llama3")
+    scheduler.acquire("holder")
+
+    async def cancel_while_queued():
+        task = asyncio.create_task(llm._agenerate(["How many leave days?"]))
+        while scheduler.stats()["queue_depth"] < 1:
+            await asyncio.sleep(0.005)
+        task.cancel()
+        # Holding the traceback keeps the request frame alive: garbage collection cannot close the slot
+        with pytest.raises(asyncio.CancelledError) as cancelled:
+            await task
+        scheduler.release()  # The queued thread now gets the slot and must hand it back
+        for _ in range(200):
+            if scheduler.stats()["active"] == 0:
+                break
+            await asyncio.sleep(0.005)
+        return cancelled
+
+    assert asyncio.run(cancel_while_queued()) is not None
+    assert scheduler.stats()["active"] == 0
+    assert scheduler.stats()["queue_depth"] == 0
@@ -0,0 +1,78 @@
+# tests/unit/test_numpy_vector_store.py
+
+import pytest
+from rag_pipeline.numpy_vector_store import NumpyVectorStore, export_snapshot, snapshot_version
+
+
+class _FakeChroma:
+    """Minimal stand-in for Chroma.get(include=[...]) used by the exporter."""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def get(self, include=None):
+        return {
+            "ids": [r[0] for r in self.rows],
+            "embeddings": [r[1] for r in self.rows],
+            "documents": [r[2] for r in self.rows],
+            "metadatas": [{"role": r[3], "source": f"{r[0]}.pdf"} for r in self.rows],
+        }
+
+
+class _AxisEmbeddings:
+    """Embeds a query as the vector stored under its text."""
+
+    def __init__(self, vectors):
+        self.vectors = vectors
+
+    def embed_query(self, text):
+        return self.vectors[text]
+
+
+# --- TEST: SNAPSHOT EXPORT + ROLE-SCOPED BRUTE-FORCE SEARCH ---
+@pytest.mark.parametrize("dtype", ["float32", "float16"])
+def test_numpy_backend_search(tmp_path, dtype):
+    chroma = _FakeChroma([
+        ("leave", [1.0, 0.0, 0.0], "Annual leave is 20 days.", "HR_Employee"),
+        ("sick", [0.8, 0.6, 0.0], "Sick leave is 12 days.", "HR_Employee"),
+        ("vpn", [1.0, 0.0, 0.0], "Use the VPN.", "IT_Tech"),
+    ])
+    root = str(tmp_path / "numpy_vectors")
+    export_snapshot(chroma, root, "v1", dtype=dtype)
+    assert snapshot_version(root) == "v1"
+
+    store = NumpyVectorStore(_AxisEmbeddings({"leave": [2.0, 0.0, 0.0]}), root)
+    docs = store.similarity_search("leave", k=2, filter={"role": "HR_Employee"})
+    assert [d.id for d in docs] == ["leave", "sick"]
+    # Other roles' vectors are never scored
+    assert [d.id for d in store.similarity_search("leave", k=5, filter={"role": "IT_Tech"})] == ["vpn"]
+
+    fetched = store.get(ids=["sick", "missing"])
+    assert fetched["ids"] == ["sick"] and fetched["documents"] == ["Sick leave is 12 days."]
+
+def test_numpy_backend_picks_up_new_snapshot(tmp_path):
+    root = str(tmp_path / "numpy_vectors")
+    export_snapshot(_FakeChroma([("a", [1.0, 0.0], "old", "IT_Tech")]), root, "v1")
+    store = NumpyVectorStore(_AxisEmbeddings({"q": [1.0, 0.0]}), root)
+    assert store.similarity_search("q", k=1)[0].page_content == "old"
+
+    export_snapshot(_FakeChroma([("a", [1.0, 0.0], "new", "IT_Tech")]), root, "v2")
+    assert store.similarity_search("q", k=1)[0].page_content == "new"
+
+
+def test_search_results_come_from_one_snapshot(tmp_path):
+    root = str(tmp_path / "numpy_vectors")
+    export_snapshot(_FakeChroma([("leave", [1.0, 0.0], "Annual leave is 20 days.", "HR_Employee")]), root, "v1")
+
+    class _IngestWhileEmbedding(_AxisEmbeddings):
+        def embed_query(self, text):
+            # A concurrent ingest swaps the snapshot after the search captured it
+            export_snapshot(_FakeChroma([("dress", [0.0, 1.0], "Business casual.", "HR_Employee"),
+                                         ("leave", [1.0, 0.0], "Annual leave is 25 days.", "HR_Employee")]),
+                            root, "v2")
+            store.get(ids=["leave"])  # Any call loads the new snapshot
+            return super().embed_query(text)
+
+    store = NumpyVectorStore(_IngestWhileEmbedding({"leave": [1.0, 0.0]}), root)
+    docs = store.similarity_search("leave", k=1)
+    assert [(d.id, d.page_content) for d in docs] == [("leave", "Annual leave is 20 days.")]
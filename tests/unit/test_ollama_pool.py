@@ -0,0 +1,155 @@
+# tests/unit/test_ollama_pool.py
+
+import json
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from rag_pipeline.ollama_pool import OllamaPool, NoHealthyBackendError, OPEN, CLOSED
+
+
+class StubOllama:
+    """Local HTTP server answering /api/generate with two streamed lines (or hanging)."""
+
+    def __init__(self, name, hang_seconds=0.0):
+        self.name = name
+        self.hang_seconds = hang_seconds
+        self.generate_calls = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, body):
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                self._reply(b'{"models": []}')
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers["Content-Length"]))
+                stub.generate_calls += 1
+                time.sleep(stub.hang_seconds)
+                lines = [{"response": stub.name, "done": False}, {"response": "", "done": True}]
+                self._reply("\n".join(json.dumps(line) for line in lines).encode())
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stubs():
+    servers = []
+
+    def make(name, hang_seconds=0.0):
+        server = StubOllama(name, hang_seconds)
+        servers.append(server)
+        return server
+
+    yield make
+    for server in servers:
+        server.close()
+
+
+def _dead_url():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return f"http://127.0.0.1:{s.getsockname()[1]}"  # Nothing listens here once closed
+
+
+def _generate(pool):
+    lines = list(pool.stream_lines("/api/generate", {"prompt": "hi"}))
+    return json.loads(lines[0])["response"]
+
+
+# --- TEST: LEAST-OUTSTANDING BALANCING ---
+def test_routes_to_least_loaded_endpoint(stubs):
+    a, b = stubs("a"), stubs("b")
+    pool = OllamaPool([a.url, b.url])
+
+    held = pool.stream_lines("/api/generate", {"prompt": "long answer"})  # Still being read
+    busy = json.loads(next(held))["response"]
+    idle = "b" if busy == "a" else "a"
+    assert _generate(pool) == idle
+    assert _generate(pool) == idle
+    held.close()
+
+    assert [e["outstanding"] for e in pool.stats()] == [0, 0]
+
+
+def test_concurrent_close_releases_endpoint_once(stubs):
+    pool = OllamaPool([stubs("a").url])
+    for _ in range(20):
+        lines = pool.stream_lines("/api/generate", {"prompt": "hi"})
+        barrier = threading.Barrier(4)
+
+        def finish():
+            barrier.wait()
+            lines.close()  # Reader EOF, event-loop close and __del__ all end up here
+
+        threads = [threading.Thread(target=finish) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+    assert pool.stats()[0]["outstanding"] == 0
+
+
+# --- TEST: FAILOVER + CIRCUIT BREAKER ---
+def test_dead_endpoint_fails_over_and_opens_circuit(stubs):
+    live = stubs("live")
+    pool = OllamaPool([_dead_url(), live.url], failure_threshold=2, reset_seconds=60)
+
+    for _ in range(4):
+        assert _generate(pool) == "live"
+
+    dead_stats, live_stats = pool.stats()
+    assert dead_stats["state"] == OPEN
+    assert dead_stats["failures"] == 2  # Skipped once the circuit opened
+    assert live_stats["state"] == CLOSED
+
+
+def test_hung_endpoint_times_out_fast(stubs):
+    hung, live = stubs("hung", hang_seconds=1.0), stubs("live")
+    pool = OllamaPool([hung.url, live.url], failure_threshold=1, read_timeout=0.2)
+
+    started = time.monotonic()
+    answers = {_generate(pool) for _ in range(3)}
+    assert answers == {"live"}
+    assert time.monotonic() - started < 1.0
+    assert hung.generate_calls == 1  # Circuit open after the first timeout
+    assert pool.stats()[0]["state"] == OPEN
+
+
+def test_probes_drive_the_breaker(stubs):
+    live = stubs("live")
+    pool = OllamaPool([_dead_url(), live.url], failure_threshold=3)
+
+    assert pool.probe_all() is True
+    assert [e["state"] for e in pool.stats()] == [OPEN, CLOSED]
+
+    pool.endpoints[0].base_url = live.url  # The host comes back
+    assert pool.probe(pool.endpoints[0]) is True
+    assert pool.stats()[0]["state"] == CLOSED
+
+
+def test_all_endpoints_down():
+    pool = OllamaPool([_dead_url(), _dead_url()], failure_threshold=1)
+    with pytest.raises(NoHealthyBackendError):
+        _generate(pool)
+    with pytest.raises(NoHealthyBackendError):
+        _generate(pool)  # Both circuits open: fails without any network call
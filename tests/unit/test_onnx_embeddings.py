@@ -0,0 +1,42 @@
+# tests/unit/test_onnx_embeddings.py
+
+import pytest
+import numpy as np
+from rag_pipeline.embedding_models import OnnxEmbeddings
+
+
+class _Encoding:
+    def __init__(self, ids, mask):
+        self.ids = ids
+        self.attention_mask = mask
+
+
+class _FakeTokenizer:
+    def encode_batch(self, texts):
+        # Second text is shorter and padded
+        return [_Encoding([1, 2], [1, 1]), _Encoding([3, 0], [1, 0])][:len(texts)]
+
+
+class _FakeSession:
+    """Returns token vectors: real tokens point along x, padding along y."""
+
+    def run(self, output_names, feeds):
+        mask = feeds["attention_mask"]
+        hidden = np.zeros(mask.shape + (2,), dtype=np.float32)
+        hidden[..., 0] = 3.0 * mask
+        hidden[..., 1] = 5.0 * (1 - mask)
+        return [hidden]
+
+
+# --- TEST: MEAN POOLING IGNORES PADDING AND OUTPUTS UNIT VECTORS ---
+def test_onnx_pooling_matches_sentence_transformers():
+    model = OnnxEmbeddings.__new__(OnnxEmbeddings)
+    model.batch_size = 32
+    model.tokenizer = _FakeTokenizer()
+    model.session = _FakeSession()
+    model.input_names = {"input_ids", "attention_mask", "token_type_ids"}
+    model.output_name = "last_hidden_state"
+
+    vectors = model.embed_documents(["annual leave", "vpn"])
+    assert vectors == [[1.0, 0.0], [1.0, 0.0]]
+    assert model.embed_query("annual leave") == [1.0, 0.0]
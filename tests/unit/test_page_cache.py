@@ -0,0 +1,24 @@
+# tests/unit/test_page_cache.py
+
+import pytest
+from langchain_core.documents import Document
+from rag_pipeline.page_cache import PageTextCache
+
+
+# --- TEST: PAGES ROUND-TRIP, KEYED BY FILE HASH + LOADER VERSION ---
+def test_page_cache_round_trip(tmp_path):
+    path = str(tmp_path / "pages.sqlite3")
+    cache = PageTextCache(path, loader_version="pypdf-1")
+    assert cache.get_pages("filehash", "data/HR_Policy.pdf") is None
+
+    cache.put_pages("filehash", [
+        Document(page_content="Annual leave is 20 days.", metadata={"page": 0, "source": "old/HR_Policy.pdf"}),
+        Document(page_content="Probation lasts 3 months.", metadata={"page": 1}),
+    ])
+
+    pages = cache.get_pages("filehash", "data/HR_Policy.pdf")
+    assert [p.page_content for p in pages] == ["Annual leave is 20 days.", "Probation lasts 3 months."]
+    assert pages[0].metadata == {"page": 0, "source": "data/HR_Policy.pdf"}
+
+    # A different parser version must re-parse
+    assert PageTextCache(path, loader_version="pypdf-2").get_pages("filehash", "data/HR_Policy.pdf") is None
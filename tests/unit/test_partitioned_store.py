@@ -0,0 +1,62 @@
+# tests/unit/test_partitioned_store.py
+
+import pytest
+from langchain_core.documents import Document
+from rag_pipeline.partitioned_store import PartitionedChromaStore, role_filter, roles_from_filter
+
+
+class _FakePartition:
+    def __init__(self, hits):
+        self.hits = hits
+        self.searched = 0
+
+    def similarity_search_by_vector_with_relevance_scores(self, vector, k):
+        self.searched += 1
+        return self.hits[:k]
+
+
+class _FakeEmbeddings:
+    def embed_query(self, text):
+        return [1.0, 0.0]
+
+
+def _store(partitions):
+    store = PartitionedChromaStore.__new__(PartitionedChromaStore)
+    store.embeddings = _FakeEmbeddings()
+    store.partition = lambda role: partitions[role]
+    store.roles = lambda: sorted(partitions)
+    return store
+
+
+# --- TEST: ROLE FILTERS ROUND-TRIP ---
+def test_role_filter_round_trip():
+    assert role_filter(["IT_Tech"]) == {"role": "IT_Tech"}
+    assert roles_from_filter(role_filter(["IT_Tech", "General_Employee"])) == ["IT_Tech", "General_Employee"]
+    assert roles_from_filter(None) == []
+
+# --- TEST: FAN-OUT ONLY TOUCHES ALLOWED PARTITIONS AND MERGES BY DISTANCE ---
+def test_fan_out_search_merges_partitions():
+    doc = lambda name: Document(page_content=name, metadata={}, id=name)
+    partitions = {
+        "IT_Tech": _FakePartition([(doc("vpn"), 0.2), (doc("mfa"), 0.9)]),
+        "General_Employee": _FakePartition([(doc("gdpr"), 0.5)]),
+        "HR_Employee": _FakePartition([(doc("salary"), 0.1)]),
+    }
+    store = _store(partitions)
+
+    docs = store.similarity_search("q", k=2, filter=role_filter(["IT_Tech", "General_Employee"]))
+    assert [d.id for d in docs] == ["vpn", "gdpr"]
+    assert partitions["HR_Employee"].searched == 0
+
+
+# --- TEST: UNKNOWN ROLES FIND NOTHING AND CREATE NOTHING ---
+def test_unknown_role_creates_no_collection(tmp_path):
+    store = PartitionedChromaStore(_FakeEmbeddings(), str(tmp_path), "kb")
+    store.upsert(ids=["1"], embeddings=[[1.0, 0.0]], documents=["VPN guide"], metadatas=[{"role": "IT_Tech"}])
+
+    # A JWT role with no documents, and one Chroma would reject as a collection name
+    assert store.similarity_search("vpn", k=2, filter=role_filter(["Contractor"])) == []
+    assert store.similarity_search("vpn", k=2, filter=role_filter(["bad role!"])) == []
+    assert [d.page_content for d in store.similarity_search("vpn", k=2, filter=role_filter(["IT_Tech", "Contractor"]))] \
+        == ["VPN guide"]
+    assert store.roles() == ["IT_Tech"]
@@ -0,0 +1,62 @@
+# tests/unit/test_retrieval_cache.py
+
+import pytest
+from langchain_core.documents import Document
+from rag_pipeline import retrieval_chain
+from rag_pipeline.retrieval_chain import CachedRoleRetriever
+
+
+class FakeVectorStore:
+    """Counts searches; get() returns chunks in storage order, like Chroma."""
+
+    # Ranking differs from storage order, so fetched chunks must be re-sorted
+    RANKING = ["c3", "c1", "c2"]
+
+    def __init__(self, chunks):
+        self.chunks = dict(chunks)
+        self.searches = 0
+
+    def similarity_search(self, query, k=4, filter=None):
+        self.searches += 1
+        ids = [i for i in self.RANKING if i in self.chunks][:k]
+        return [Document(page_content=self.chunks[i], metadata={"role": "General_Employee"}, id=i) for i in ids]
+
+    def get(self, ids=None, include=None):
+        found = [i for i in sorted(self.chunks) if i in ids]
+        return {"ids": found, "documents": [self.chunks[i] for i in found],
+                "metadatas": [{"role": "General_Employee"} for _ in found]}
+
+
+@pytest.fixture
+def store(monkeypatch):
+    monkeypatch.setattr(retrieval_chain, "get_kb_version", lambda: "v1")
+    retrieval_chain.retrieval_cache.clear()
+    yield FakeVectorStore({"c1": "Annual leave is 20 days.", "c2": "Sick leave is 10 days.",
+                           "c3": "Leave requests go to HR."})
+    retrieval_chain.retrieval_cache.clear()
+
+
+# --- TEST: A REPEATED QUERY IS SERVED FROM THE CACHED IDS ---
+def test_second_identical_query_skips_vector_search(store):
+    retriever = CachedRoleRetriever(vector_store=store, user_role="General_Employee", k=3)
+
+    first = retriever.invoke("How many leave days do I get?")
+    second = retriever.invoke("  how many LEAVE days do i get?  ")
+
+    assert store.searches == 1
+    assert [d.id for d in second] == [d.id for d in first] == ["c3", "c1", "c2"]
+    assert [d.page_content for d in second] == [d.page_content for d in first]
+
+
+# --- TEST: A MISSING CHUNK FALLS BACK TO A REAL SEARCH ---
+def test_missing_cached_id_searches_again(store):
+    retriever = CachedRoleRetriever(vector_store=store, user_role="General_Employee", k=2)
+    retriever.invoke("How many leave days do I get?")
+
+    del store.chunks["c1"]  # Re-ingestion removed a chunk the cache still points at
+    docs = retriever.invoke("How many leave days do I get?")
+
+    assert store.searches == 2
+    assert [d.id for d in docs] == ["c3", "c2"]
+    assert [d.id for d in retriever.invoke("How many leave days do I get?")] == ["c3", "c2"]
+    assert store.searches == 2  # The fresh IDs were cached
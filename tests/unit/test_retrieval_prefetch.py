@@ -0,0 +1,51 @@
+# tests/unit/test_retrieval_prefetch.py
+
+import threading
+
+from rag_pipeline.retrieval_prefetch import RetrievalPrefetch
+
+
+class FakeEmbeddings:
+    VECTORS = {
+        "how many leave days do i get?": [1.0, 0.0],
+        "annual leave days": [0.95, 0.1],
+        "vpn setup": [0.0, 1.0],
+    }
+
+    def embed_query(self, text):
+        return self.VECTORS[text.lower()]
+
+
+class FakeRetriever:
+    def __init__(self):
+        self.queries = []
+        self.release = threading.Event()
+
+    def invoke(self, query):
+        self.release.wait(5)
+        self.queries.append(query)
+        return [f"doc for {query}"]
+
+
+# --- TEST: A SIMILAR ACTION INPUT REUSES THE PREFETCHED HITS ---
+def test_prefetch_reused_for_similar_query():
+    retriever = FakeRetriever()
+    prefetch = RetrievalPrefetch("How many leave days do I get?", retriever, FakeEmbeddings(), threshold=0.9).start()
+    retriever.release.set()  # The search finishes while the "LLM" is still thinking
+
+    assert prefetch.take("annual leave days") == ["doc for How many leave days do I get?"]
+    assert prefetch.take("  how many LEAVE days do i get?  ") == ["doc for How many leave days do I get?"]
+    assert retriever.queries == ["How many leave days do I get?"]
+    assert prefetch.hits == 2
+
+
+# --- TEST: A DIFFERENT ACTION INPUT DROPS THE PREFETCH ---
+def test_prefetch_dropped_for_unrelated_query():
+    retriever = FakeRetriever()
+    prefetch = RetrievalPrefetch("How many leave days do I get?", retriever, FakeEmbeddings(), threshold=0.9).start()
+
+    assert prefetch.take("VPN setup") is None
+    retriever.release.set()
+    # Once dropped, even a matching query searches normally
+    assert prefetch.take("annual leave days") is None
+    assert prefetch.misses == 1
@@ -0,0 +1,94 @@
+# tests/unit/test_run_budget.py
+
+import time
+from typing import Any, List, Optional
+
+import pytest
+from langchain_core.language_models.llms import LLM
+from rag_pipeline.run_budget import (
+    RunBudget, RunBudgetExceeded, RunCancelledError, AGENT_STOPPED_OUTPUT, PARTIAL_ANSWER_PREFIX, STOPPED_MESSAGE
+)
+
+
+class WordStreamLLM(LLM):
+    """Reports every word through on_llm_new_token, like Ollama's streaming generate."""
+
+    text: str
+    words_generated: int = 0
+    seconds_per_word: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "word-stream"
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> str:
+        out = []
+        for word in self.text.split(" "):
+            token = word if not out else " " + word
+            self.words_generated += 1
+            time.sleep(self.seconds_per_word)
+            run_manager.on_llm_new_token(token)
+            out.append(token)
+        return "".join(out)
+
+
+# --- TEST: TOKEN LIMIT STOPS THE GENERATION ITSELF ---
+def test_token_limit_aborts_generation_with_partial_answer():
+    llm = WordStreamLLM(text="Thought: I know it. Final Answer: Employees get twenty days of annual leave per year")
+    budget = RunBudget(max_seconds=60, max_tokens=9)
+
+    with pytest.raises(RunBudgetExceeded):
+        llm.invoke("q", config={"callbacks": [budget]})
+
+    assert llm.words_generated == 9  # Nothing generated past the limit
+    assert budget.stopped_early
+    assert budget.partial_answer() == "Employees get twenty …"
+
+
+def test_time_limit():
+    llm = WordStreamLLM(text="Twenty days of annual leave", seconds_per_word=0.03)
+    budget = RunBudget(max_seconds=0.05, max_tokens=100, answer_marker=None)
+    with pytest.raises(RunBudgetExceeded):
+        llm.invoke("q", config={"callbacks": [budget]})
+    assert llm.words_generated == 2
+    assert budget.partial_answer() == "Twenty days …"
+
+
+# --- TEST: THE CLOCK ONLY COUNTS GENERATION TIME ---
+def test_time_before_first_generation_and_queue_wait_are_free():
+    budget = RunBudget(max_seconds=0.05, max_tokens=100, answer_marker=None)
+    time.sleep(0.1)  # Memory loading, retrieval, ... before the first LLM call
+    assert WordStreamLLM(text="a b c").invoke("q", config={"callbacks": [budget]}) == "a b c"
+
+    queued = [0.0]
+    budget.queued_seconds = lambda: queued[0]
+    time.sleep(0.1)  # Waiting for a scheduler slot between two agent steps
+    queued[0] = 0.1
+    assert WordStreamLLM(text="d e").invoke("q", config={"callbacks": [budget]}) == "d e"
+
+    queued[0] = 0.0  # The same pause spent working does count
+    with pytest.raises(RunBudgetExceeded):
+        WordStreamLLM(text="f").invoke("q", config={"callbacks": [budget]})
+    assert budget.partial_answer() == STOPPED_MESSAGE
+
+
+# --- TEST: CANCELLATION ---
+def test_cancel_stops_next_call_unless_kept_alive():
+    llm = WordStreamLLM(text="a b c")
+    budget = RunBudget(max_seconds=60, max_tokens=100)
+    waiters = [1]
+    budget.keep_alive = lambda: bool(waiters)
+    budget.cancel()
+
+    assert llm.invoke("q", config={"callbacks": [budget]}) == "a b c"  # Someone still needs the answer
+    waiters.clear()
+    with pytest.raises(RunCancelledError):
+        llm.invoke("q", config={"callbacks": [budget]})
+
+
+# --- TEST: EXECUTOR STOP MESSAGE BECOMES A PARTIAL ANSWER ---
+def test_finish_uses_last_observation():
+    budget = RunBudget()
+    budget.on_tool_end("Annual leave: 20 days per year.")
+    assert budget.finish("20 days.") == "20 days."
+    assert budget.finish(AGENT_STOPPED_OUTPUT) == PARTIAL_ANSWER_PREFIX + "Annual leave: 20 days per year."
@@ -0,0 +1,141 @@
+# tests/unit/test_single_flight.py
+
+import threading
+import time
+import pytest
+from app.services.single_flight_service import SingleFlight, coalescing_key
+
+
+def _run_concurrently(flight, key, fn, callers):
+    results = [None] * callers
+
+    def call(i):
+        try:
+            results[i] = flight.do(key, fn)
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(callers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    return results
+
+
+# --- TEST: IDENTICAL IN-FLIGHT CALLS SHARE ONE RUN ---
+def test_concurrent_calls_run_once():
+    flight = SingleFlight(wait_timeout=5)
+    runs = []
+
+    def slow_answer():
+        runs.append(1)
+        time.sleep(0.2)  # Long enough for every caller to join
+        return "42 days"
+
+    results = _run_concurrently(flight, ("employee", "leave days"), slow_answer, callers=5)
+
+    assert len(runs) == 1
+    assert [answer for answer, _ in results] == ["42 days"] * 5
+    assert sorted(shared for _, shared in results) == [False, True, True, True, True]
+    assert flight.stats() == {"in_flight": 0, "leaders": 1, "coalesced": 4}
+
+    # The flight has landed: the next call runs again
+    assert flight.do(("employee", "leave days"), lambda: "fresh") == ("fresh", False)
+
+
+def test_errors_reach_every_waiter():
+    flight = SingleFlight(wait_timeout=5)
+
+    def failing():
+        time.sleep(0.2)
+        raise RuntimeError("LLM down")
+
+    results = _run_concurrently(flight, "k", failing, callers=3)
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+# --- TEST: FOLLOWERS THAT LEAVE STOP COUNTING AS WAITERS ---
+def _start_leader(flight, release):
+    leader = threading.Thread(target=lambda: flight.do("k", lambda: release.wait(5) and "slow"))
+    leader.start()
+    time.sleep(0.05)
+    return leader
+
+
+def test_follower_timeout_runs_separately():
+    flight = SingleFlight(wait_timeout=0.05)
+    release = threading.Event()
+    leader = _start_leader(flight, release)
+
+    assert flight.do("k", lambda: "lead", fallback=lambda: "own") == ("own", False)
+    assert flight.waiting("k") == 0  # The leader's run is no longer kept alive for it
+    release.set()
+    leader.join(5)
+
+
+def test_cancelled_follower_stops_waiting():
+    flight = SingleFlight(wait_timeout=5)
+    release, client_left = threading.Event(), threading.Event()
+    leader = _start_leader(flight, release)
+
+    def check():
+        if client_left.is_set():
+            raise RuntimeError("client disconnected")
+
+    errors = []
+
+    def follow():
+        try:
+            flight.do("k", lambda: "own", check=check)
+        except RuntimeError as e:
+            errors.append(e)
+
+    follower = threading.Thread(target=follow)
+    follower.start()
+    time.sleep(0.05)
+    assert flight.waiting("k") == 1
+    started = time.monotonic()
+    client_left.set()
+    follower.join(5)
+    assert errors and time.monotonic() - started < 1.0  # Noticed without waiting for the leader
+    assert flight.waiting("k") == 0
+    release.set()
+    leader.join(5)
+
+
+# --- TEST: KEYS ---
+def test_coalescing_key():
+    key = coalescing_key("employee", "  What is the LEAVE policy? ", "rag")
+    assert key[0] == "employee" and key[-1] == "what is the leave policy?"
+    assert key == coalescing_key("employee", "what is the leave policy?", "rag")
+    assert coalescing_key("employee", "x", "rag") != coalescing_key("manager", "x", "rag")
+    # An agent caller never receives a single-shot RAG answer
+    assert coalescing_key("employee", "x", "rag") != coalescing_key("employee", "x", "agent")
+    # Side-effecting requests never share a run
+    assert coalescing_key("employee", "Apply for leave from 2025-12-01 to 2025-12-05", "agent") is None
+    assert coalescing_key("employee", "please reset my password", "agent") is None
+
+
+def test_sessions_with_different_history_do_not_share_a_run():
+    flight = SingleFlight(wait_timeout=5)
+    release = threading.Event()
+    history_a = "User: I asked for leave on 2025-12-01.\nAgent: Done."
+    history_b = "User: What is the VPN address?\nAgent: vpn.corp.com"
+    key_a = coalescing_key("employee", "what about my second request?", "agent", history_a)
+    key_b = coalescing_key("employee", "what about my second request?", "agent", history_b)
+    assert key_a != key_b
+
+    results = {}
+    leader = threading.Thread(target=lambda: results.update(
+        a=flight.do(key_a, lambda: release.wait(5) and "answer from session A")))
+    leader.start()
+    time.sleep(0.05)
+    # Session B runs on its own instead of waiting for session A's private answer
+    results["b"] = flight.do(key_b, lambda: "answer from session B")
+    release.set()
+    leader.join(5)
+
+    assert results["b"] == ("answer from session B", False)
+    assert results["a"] == ("answer from session A", False)
+    assert flight.stats()["coalesced"] == 0
@@ -0,0 +1,44 @@
+# tests/unit/test_stream_service.py
+
+import asyncio
+import pytest
+from app.services.stream_service import FinalAnswerFilter, format_sse, stream_rag_events
+
+
+# --- TEST: ONLY FINAL-ANSWER TOKENS ARE STREAMED ---
+def test_final_answer_filter_hides_reasoning():
+    answer_filter = FinalAnswerFilter()
+    chunks = ["Thought: I now know", " the answer.\nFinal", " Answer: You get ", "20 days", "."]
+
+    visible = "".join(answer_filter.feed(c) for c in chunks)
+
+    assert visible == "You get 20 days."
+
+def test_final_answer_filter_reset_between_generations():
+    answer_filter = FinalAnswerFilter()
+    assert answer_filter.feed("Action: search_knowledge_base") == ""
+
+    answer_filter.reset()
+    assert answer_filter.feed("Final Answer: Hello") == "Hello"
+
+def test_format_sse_frame():
+    frame = format_sse({"type": "token", "content": "Hi"})
+    assert frame.startswith("event: token\ndata: ")
+    assert frame.endswith("\n\n")
+
+# --- TEST: SINGLE-SHOT RAG STREAMS EVERY TOKEN ---
+class FakeRagChain:
+    async def astream(self, inputs, config=None):
+        for chunk in ["You get ", "", "20 days."]:
+            yield chunk
+
+def test_stream_rag_events_emits_tokens_then_final():
+    async def collect():
+        return [event async for event in stream_rag_events(FakeRagChain(), "How many leave days?")]
+
+    events = asyncio.run(collect())
+    assert events == [
+        {"type": "token", "content": "You get "},
+        {"type": "token", "content": "20 days."},
+        {"type": "final", "answer": "You get 20 days."},
+    ]
@@ -0,0 +1,25 @@
+# tests/unit/test_ttl_cache.py
+
+import time
+import pytest
+from rag_pipeline.ttl_cache import TTLCache
+
+
+# --- TEST: LRU ORDER, SIZE BOUND AND TTL ---
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(max_size=2, ttl_seconds=60)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # 'b' is now least recently used
+
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+    assert cache.stats()["size"] == 2
+
+def test_ttl_cache_expires_entries():
+    cache = TTLCache(max_size=10, ttl_seconds=0.01)
+    cache.put("query", [0.1, 0.2])
+    time.sleep(0.02)
+    assert cache.get("query") is None
+    assert cache.stats()["misses"] == 1